@@ -1 +1,23 @@
-from . import intervals, qualities, notes, chords, scales, keys, progressions, guitar, conversion, util, parsing
+# submodules are loaded lazily, on first attribute access (e.g. src.keys.Key),
+# so that importing one part of the library does not pull in all the others:
+# in particular, the music theory modules should never have to import the audio stack.
+import importlib
+
+_submodules = ['intervals', 'qualities', 'notes', 'chords', 'scales', 'keys', 'progressions',
+               'guitar', 'conversion', 'util', 'parsing', 'numerals', 'harmony', 'display',
+               'tuning', 'audio', 'rhythm', 'snapshots', 'caching', 'midi']
+
+# 'from orpyus import *' imports the modules that used to be imported eagerly here (i.e. not audio):
+__all__ = ['intervals', 'qualities', 'notes', 'chords', 'scales', 'keys', 'progressions',
+           'guitar', 'conversion', 'util', 'parsing']
+
+# cache introspection, which only reports on the caches of modules already imported:
+from .caching import cache_stats, reset_cache_stats, clear_caches
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def __dir__():
+    return sorted(list(globals()) + _submodules)
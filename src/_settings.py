@@ -170,3 +170,44 @@ PRE_CACHE_SCALES = True   # applies to both Scales and Keys
 # is strongly recommended for any kind of high-throughput musical number crunching,
 # and should significantly improve both run-speed and memory efficiency.
 DYNAMIC_CACHING = True
+
+### SNAPSHOT_REGISTRIES determines whether the large lookup tables built at import
+### (such as the chord registry of names, factors and intervals, and the pre-cached
+### chords) are saved to disk after they are first built, and loaded from there on
+### subsequent imports instead of being rebuilt from scratch. snapshots are keyed by
+### a hash of the source code that defines them, so editing chord or quality
+### definitions simply causes them to be rebuilt (and re-saved) on next import.
+SNAPSHOT_REGISTRIES = True
+### SNAPSHOT_DIR is the directory those snapshots live in. if None, they are kept in
+### a '_snapshots' folder inside the library itself; set this to somewhere writable
+### if the library is installed somewhere that isn't.
+SNAPSHOT_DIR = None
+
+### the dynamic caches above are bounded, so that long-running processes don't
+### grow their memory use without limit. CACHE_MAX_ENTRIES is the default maximum
+### number of objects kept in each cache, beyond which the least recently used
+### (CACHE_POLICY='LRU') or least frequently used (CACHE_POLICY='LFU') are evicted.
+### set CACHE_MAX_ENTRIES to None to let caches grow without limit, as before.
+CACHE_POLICY = 'LRU'
+CACHE_MAX_ENTRIES = 20000
+### CACHE_LIMITS overrides those defaults for individual caches, by name, with any of
+### the keys 'max_entries', 'max_bytes' and 'policy'. synthesised waveforms (and the gain
+### curves applied to them) are large, so their caches are limited by memory use instead:
+CACHE_LIMITS = {
+    'wave_bank': {'max_entries': None, 'max_bytes': 256 * 2**20}, # 256 MiB
+    'gain_curves': {'max_entries': None, 'max_bytes': 64 * 2**20},
+    }
+### SAMPLE_BANK_DURATION is the length (in seconds) at which the sample bank synthesises
+### each note, so that any shorter note can be served from it without synthesising
+### again. longer notes are synthesised (and banked) at their own length.
+SAMPLE_BANK_DURATION = 4
+
+### SYNTHESIS_WORKERS enables parallel synthesis of the notes in chords and melodies:
+### if an integer > 1, the waves of distinct notes are synthesised concurrently by that many
+### threads (SYNTHESIS_BACKEND='thread') or processes (SYNTHESIS_BACKEND='process').
+### None synthesises them one by one, as before.
+SYNTHESIS_WORKERS = None
+SYNTHESIS_BACKEND = 'thread'
+### SYNTHESIS_SEED makes synthesised audio reproducible, and identical between serial
+### and parallel synthesis. if None, notes are synthesised from the global numpy RNG.
+SYNTHESIS_SEED = None
@@ -3,21 +3,24 @@
 
 from .notes import OctaveNote
 from .util import log
+from .caching import Cache
+from . import _settings
 
 import threading
 
 import math
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import plot, show
-# from matplotlib import ticker as mticker
-from scipy.fft import fft, ifft
-from scipy.ndimage import gaussian_filter
-import sounddevice as sd
+# matplotlib, scipy and sounddevice are heavyweight (and sounddevice fails outright
+# on machines without PortAudio), so they are imported lazily inside the
+# functions that need them, rather than here at module level
 
 # global sampling frequency:
 fs = 44100
 
+# envelopes and falloffs are applied by multiplying a wave by a gain curve of the same length,
+# which only depends on the envelope and that length, so we compute each curve once and reuse it:
+gain_curves = Cache('gain_curves')
+
 
 class AmplitudeEnvelope:
     """class that can be called on sound waves to apply attack/onset/decay parameters"""
@@ -42,23 +45,21 @@ class AmplitudeEnvelope:
         self.amplitudes = [np.max([pair[1],0]) for pair in spec] # floor at 0
         assert self.keypoints == sorted(self.keypoints), "keypoints must be in increasing order"
 
-    def __call__(self, wave):
-        """applies this envelope to a desired 1d wave"""
-        size = len(wave)
+    def __call__(self, wave, out=None):
+        """applies this envelope to a desired 1d wave,
+        writing the result to the array 'out' if given (which can be the wave itself)"""
+        return np.multiply(wave, self.gain_curve(len(wave)), out=out)
+
+    def gain_curve(self, size):
+        """the (cached, read-only) amplitude profile of this envelope over a wave of some length"""
+        key = (self, size)
+        if key in gain_curves:
+            return gain_curves[key]
         keypoint_idxs = [int(size * frac) for frac in self.keypoints]
-        amp_profile = np.ones(size)
-        output_segments = []
         # loop over segments of the envelope, i.e. the edges between keypoints:
-        for s in range(1, len(self.keypoints)):
-            start_idx, end_idx = keypoint_idxs[s-1], keypoint_idxs[s]
-            segment_size = end_idx - start_idx
-            amp_start, amp_end = self.amplitudes[s-1], self.amplitudes[s]
-
-            amp_values = np.linspace(amp_start, amp_end, segment_size)
-
-            segment = wave[start_idx : end_idx]
-            output_segments.append(segment * amp_values)
-        return np.concatenate(output_segments)
+        curve = np.concatenate([np.linspace(self.amplitudes[s-1], self.amplitudes[s], keypoint_idxs[s] - keypoint_idxs[s-1])
+                                for s in range(1, len(self.keypoints))])
+        return cache_gain_curve(key, curve)
 
 LinearEnv = AmplitudeEnvelope([])
 TriangleEnv = AmplitudeEnvelope([(0,0), (.5, 1), (1,0)])
@@ -68,6 +69,7 @@ ExpEnv = AmplitudeEnvelope([(i/20, -1.6*math.exp(((i/20)-1.1)*2)+1.18) for i in
 
 
 def smooth(wave, ratio=500):
+    from scipy.ndimage import gaussian_filter # lazy import
     sd = len(wave) / ratio
     return gaussian_filter(wave, sd)
 
@@ -79,6 +81,7 @@ def show(*arrs, fix_ylim=True, fix_xlim=True, overlay=False):
         log(f' so calling recursively on unpacked iterable of len {len(arrs[0])}, whose first type is: {type(arrs[0][0])}')
         show(*arrs[0], fix_ylim=fix_ylim, fix_xlim=fix_xlim, overlay=overlay)
     else:
+        import matplotlib.pyplot as plt # lazy import
         if not overlay:
             fig, axes = plt.subplots(len(arrs), 1, sharex=fix_xlim, sharey=fix_ylim)
             # xlims, ylims = [], []
@@ -104,6 +107,8 @@ def show_fft(arr, xlim=(25,5000), note_names=True, which_notes=['C', 'E', 'G'],
         freq = arr
         arr = synth_wave(freq, 1, type=type)
 
+    import matplotlib.pyplot as plt # lazy import
+    from scipy.fft import fft # lazy import
     N = len(arr)
     xf = np.linspace(0.0, 1.0/(2.0*(1/fs)), N//2)
     f = fft(arr)
@@ -181,32 +186,41 @@ def white_noise(duration, amplitude=1):
     return wave
 
 # pure exponential falloff function: (timbre over pure sine wave sounds harp-like, or like an electric piano)
-def exp_falloff(wave, sharpness=5, peak_at=0.05):
-    """peak_at is float, in seconds"""
-    start_samples = int(fs * peak_at)
-    start = np.copy(wave[:start_samples])
-    end = np.copy(wave[start_samples:])
-    end_samples = len(end)
+def exp_falloff(wave, sharpness=5, peak_at=0.05, out=None):
+    """peak_at is float, in seconds.
+    writes the result to the array 'out' if given (which can be the wave itself)"""
+    return np.multiply(wave, exp_falloff_curve(len(wave), sharpness, int(fs * peak_at)), out=out)
+
+def exp_falloff_curve(size, sharpness, start_samples):
+    key = ('exp_falloff', size, sharpness, start_samples)
+    if key in gain_curves:
+        return gain_curves[key]
+    start_samples = min(start_samples, size)
     # climbup at the very beginning:
     up_profile = np.linspace(0,sharpness, start_samples)
     exp_up = normalise(np.exp(up_profile))
-    start *= exp_up
-
     # falloff at the end
-    down_profile = np.linspace(sharpness, 0, end_samples)
+    down_profile = np.linspace(sharpness, 0, size - start_samples)
     exp_down = normalise(np.exp(down_profile))
-    end *= exp_down
-    return np.concatenate([start, end], axis=0)
-
-def lin_falloff(wave, start_at=0.0):
-    start_samples = int(fs * start_at)
-    end = np.copy(wave[start_samples:])
-    end_samples = len(end)
-
-    # falloff at the end
-    down_profile = np.linspace(1, 0, end_samples)
-    end *= down_profile
-    return np.concatenate([wave[:start_samples], end], axis=0)
+    return cache_gain_curve(key, np.concatenate([exp_up, exp_down]))
+
+def lin_falloff(wave, start_at=0.0, out=None):
+    """writes the result to the array 'out' if given (which can be the wave itself)"""
+    return np.multiply(wave, lin_falloff_curve(len(wave), int(fs * start_at)), out=out)
+
+def lin_falloff_curve(size, start_samples):
+    key = ('lin_falloff', size, start_samples)
+    if key in gain_curves:
+        return gain_curves[key]
+    start_samples = min(start_samples, size)
+    # full volume until start_samples, then falloff at the end:
+    curve = np.concatenate([np.ones(start_samples), np.linspace(1, 0, size - start_samples)])
+    return cache_gain_curve(key, curve)
+
+def cache_gain_curve(key, curve):
+    curve.flags.writeable = False # since it is shared by every wave of this length
+    gain_curves[key] = curve
+    return curve
 
 def amp_correct(wave, pitch=None):
     ### correct amplitude of a wave wrt its pitch.
@@ -222,7 +236,8 @@ def amp_correct(wave, pitch=None):
 def arrange_chord(waves, *args, norm=False, falloff=True, **kwargs):
     start_max = np.max([np.max(w) for w in waves])
     wave = np.sum(waves, axis=0)
-    wave = lin_falloff(wave, *args, **kwargs) if falloff else wave
+    if falloff:
+        lin_falloff(wave, *args, out=wave, **kwargs)
     if norm:
         wave = wave / start_max
     return wave
@@ -231,15 +246,14 @@ def arrange_melody(waves, *args, delay=0.5, norm=False, falloff=True, **kwargs):
     start_max = np.max([np.max(w) for w in waves])
 
     delay_frames = int(delay * fs)
-    melody_wave = lin_falloff(waves[0]) if falloff else np.copy(waves[0])
-    for i, wave in enumerate(waves[1:]):
-
-        start = delay_frames * (i+1)
+    # allocate the whole melody up front, rather than growing it as we go:
+    melody_len = max([(delay_frames * i) + len(wave) for i, wave in enumerate(waves)])
+    melody_wave = np.zeros(melody_len)
+    scratch = np.empty(max([len(wave) for wave in waves])) if falloff else None
+    for i, wave in enumerate(waves):
+        start = delay_frames * i
         end = start + len(wave)
-        if end > len(melody_wave):
-            padding = np.zeros(end - len(melody_wave))
-            melody_wave = np.concatenate([melody_wave, padding])
-        melody_wave[start : end] += lin_falloff(wave) if falloff else wave
+        melody_wave[start : end] += lin_falloff(wave, out=scratch[:len(wave)]) if falloff else wave
         # if norm:
         #     melody_wave[start : end] = normalise(melody_wave[start : end])
     if norm:
@@ -261,10 +275,129 @@ def play_melody(waves, *args, delay=0.5, falloff=True, **kwargs):
 
 ### sd solution
 def play_wave(wave, amplitude=1, block=False):
+    import sounddevice as sd # lazy import
     sd.play(wave*amplitude, fs, blocking=block)
 
+### offline rendering, for machines without a sound device:
+def render_wave(wave, path=None, amplitude=1, bit_depth=16):
+    """returns a wave as a float32 buffer (scaled by amplitude), the same as would be
+    played by play_wave, and if path is given, also writes it to a mono WAV file there"""
+    buffer = (wave * amplitude).astype(np.float32)
+    if path is not None:
+        write_wav(buffer, path, bit_depth=bit_depth)
+    return buffer
+
+def write_wav(wave, path, bit_depth=16):
+    """writes a float wave to a mono WAV file at the global sampling rate,
+    as 16- or 24-bit PCM, clipping it to the range [-1, 1] first"""
+    write_wav_stream([wave], path, bit_depth=bit_depth)
+
+def write_wav_stream(blocks, path, bit_depth=16):
+    """as write_wav, but for an iterable of consecutive blocks of audio
+    (such as the output of stream_events), which are written as they arrive"""
+    import wave as wav # (stdlib module, renamed so it doesn't clash with our args)
+    if bit_depth not in (16, 24):
+        raise ValueError(f'bit_depth must be 16 or 24, but got: {bit_depth}')
+    with wav.open(str(path), 'wb') as file:
+        file.setnchannels(1)
+        file.setsampwidth(bit_depth // 8)
+        file.setframerate(fs)
+        for block in blocks:
+            file.writeframes(pcm_bytes(block, bit_depth))
+
+def pcm_bytes(wave, bit_depth=16):
+    """converts a float wave to the little-endian PCM bytes of a WAV file"""
+    max_int = 2**(bit_depth-1) - 1
+    ints = np.round(np.clip(wave, -1, 1) * max_int).astype('<i4')
+    if bit_depth == 16:
+        return ints.astype('<i2').tobytes()
+    else:
+        # 24-bit samples are the lower three bytes of each little-endian 32-bit int:
+        return ints.view(np.uint8).reshape(-1, 4)[:,:3].tobytes()
+
+### streaming synthesis, in constant memory:
+def stream_events(events, block_size=1024, duration=None):
+    """mixes a schedule of note events into consecutive float32 blocks of block_size
+    frames each, and yields them one at a time as they are completed.
+
+    events must be an iterable of (start, wave) tuples in chronological order,
+    where start is in seconds and wave is an array, or a function that returns one
+    (which is only called once playback reaches that event). events can be a generator,
+    even an endless one: only the waves still sounding are kept, in a ring buffer
+    that is only as long as the longest wave (plus one block).
+    the stream ends when the last wave does, or after duration seconds if that is later,
+    and the final block is padded with silence to the full block size."""
+    events = iter(events)
+    next_event = next(events, None)
+    capacity = 2 * block_size
+    ring = np.zeros(capacity)
+    frame = 0 # absolute index of the first frame of the current block
+    end_frame = int(round(duration * fs)) if duration is not None else 0 # end of the latest-ending wave so far
+
+    while (next_event is not None) or (frame < end_frame):
+        # mix in every event that starts during this block:
+        while (next_event is not None) and (int(round(next_event[0] * fs)) < frame + block_size):
+            start_time, wave = next_event
+            start = int(round(start_time * fs))
+            if start < frame:
+                raise ValueError(f'events must be in chronological order, but got one at {start_time}s after reaching {frame/fs}s')
+            if callable(wave):
+                wave = wave()
+            if (start - frame) + len(wave) > capacity:
+                # grow the ring buffer (unrolled so that it starts at the current frame):
+                new_capacity = max(2*capacity, (start - frame) + len(wave) + block_size)
+                ring = np.concatenate([np.roll(ring, -(frame % capacity)), np.zeros(new_capacity - capacity)])
+                ring = np.roll(ring, frame % new_capacity)
+                capacity = new_capacity
+            ring_add(ring, start, wave)
+            end_frame = max(end_frame, start + len(wave))
+            next_event = next(events, None)
+
+        # emit the current block, and clear it from the ring for reuse:
+        idxs = np.arange(frame, frame + block_size) % capacity
+        block = ring[idxs].astype(np.float32)
+        ring[idxs] = 0
+        frame += block_size
+        yield block
+
+def ring_add(ring, start, wave):
+    """adds a wave to a ring buffer starting at absolute frame index start,
+    wrapping around the end of the buffer if necessary"""
+    capacity = len(ring)
+    pos = start % capacity
+    first_len = min(len(wave), capacity - pos)
+    ring[pos : pos + first_len] += wave[:first_len]
+    ring[:len(wave) - first_len] += wave[first_len:]
+
+def play_stream(blocks, amplitude=1, block_size=1024):
+    """plays a stream of audio blocks of block_size frames (e.g. from stream_events)
+    through an output stream as they are generated, until the stream runs out"""
+    import sounddevice as sd # lazy import
+    event = threading.Event()
+    blocks = iter(blocks)
+
+    def callback(outdata, frames, time, status):
+        if status:
+            print(status)
+        block = next(blocks, None)
+        if block is None:
+            outdata[:] = 0
+            raise sd.CallbackStop()
+        outdata[:len(block), 0] = block * amplitude
+        outdata[len(block):] = 0
+
+    stream = sd.OutputStream(samplerate = fs,
+                             device = sd.default.device[1],
+                             channels = 1,
+                             blocksize = block_size,
+                             callback = callback,
+                             finished_callback = event.set)
+    with stream:
+        event.wait()  # wait until playback is finished
+
 ### longer form solution
 def play_wave2(wave, amplitude=1):
+    import sounddevice as sd # lazy import
     event = threading.Event()
     current_frame = 0
     # try:
@@ -297,9 +430,10 @@ def play_wave2(wave, amplitude=1):
 
 
 
-def karplus_strong(freq, duration, wave_table_reso=44100):
+def karplus_strong(freq, duration, wave_table_reso=44100, seed=None):
     """synthesises sound sample of a desired frequency and duration
-    according to Karplus-Strong algorithm for guitar-pluck timbre"""
+    according to Karplus-Strong algorithm for guitar-pluck timbre.
+    the initial wave table is random, drawn from the given seed if there is one"""
 
     log(f'Desired freq is: {freq:.1f}')
     freq = int(round(freq))
@@ -308,47 +442,67 @@ def karplus_strong(freq, duration, wave_table_reso=44100):
     num_samples = int(duration * wave_table_reso)
     table_len = int(wave_table_reso // freq)
     log(f'Desired note duration of {num_samples} ({duration}*{wave_table_reso}) divides by {freq}*4 to get table length of: {table_len}')
-    wave_table = (np.random.randint(0, 2, table_len)*2 -1).astype(float)
-    n_iter = num_samples // table_len
-
-    # # calculate linear multiplication terms for exponential decay:
-    # a = np.ones(n_iter) * decay
-    # b = np.arange(n_iter)
-    # decay_schedule = pow(a,b)
+    random = np.random.RandomState(seed) if seed is not None else np.random
+    wave_table = discrete_wave_table(table_len, random)
 
-    pointer = 0
-    iter_num = 0
+    samples = karplus_strong_recurrence(wave_table, num_samples)
+    if log.verbose: # (frequency detection takes an fft, so skip it if we aren't logging)
+        log(f'Actual frequency of output is: {detect_freq(samples):.1f}')
 
-    samples = np.zeros(num_samples)
-    prev_val = samples[0]
+    return samples
 
-    for i in range(1, num_samples):
-        # print(f'{step} Averaging {wave_table[pointer]} and {prev_val} to get {(wave_table[pointer] + prev_val) * 0.5}')
-        wave_table[pointer] = ((wave_table[pointer] + samples[i-1]) * 0.5)
-        samples[i] = (wave_table[pointer]) # * decay_schedule[iter_num]
-        if pointer+1 >= table_len:
-            iter_num += 1
+def karplus_strong_recurrence(wave_table, num_samples):
+    """the Karplus-Strong plucked string recurrence, starting from silence:
+    each output sample is the average of the previous sample and the wave table entry
+    under the pointer, which is then overwritten by it. that is, for a table of length L,
+        samples[i] = 0.5*samples[i-1] + 0.5*samples[i-L]
+    where the initial wave table stands in for the samples before the first pass.
 
-        pointer = (pointer + 1) % table_len
-        # step += 1
-    log(f'Actual frequency of output is: {detect_freq(samples):.1f}')
+    rather than looping over every sample, we compute one table-length at a time:
+    all the samples in a pass depend only on the previous pass and on each other
+    through a first-order filter, which scipy can run in one call.
+    (multiplying by 0.5 is exact, so this matches the per-sample loop exactly)"""
+    from scipy.signal import lfilter # lazy import
 
+    table_len = len(wave_table)
+    samples = np.zeros(num_samples)
+    if num_samples == 0:
+        return samples
+    if table_len <= 100:
+        # for short tables (i.e. high notes) there would be too many passes to
+        # loop over, so we filter the whole recurrence at once instead.
+        # (this costs time proportional to table length, and the loop costs time
+        # proportional to the number of passes, which break even around here)
+        denominator = np.zeros(table_len + 1)
+        denominator[0] = 1
+        denominator[1] -= 0.5
+        denominator[table_len] -= 0.5
+        excitation = np.zeros(num_samples)
+        excitation[1:table_len+1] = 0.5 * wave_table[:num_samples-1]
+        return lfilter([1.], denominator, excitation)
+
+    # first pass reads the initial wave table, then each pass reads the one before:
+    prev_pass = wave_table
+    for start in range(1, num_samples, table_len):
+        end = min(start + table_len, num_samples)
+        samples[start:end], _ = lfilter([1.], [1., -0.5], 0.5 * prev_pass[:end-start], zi=[0.5 * samples[start-1]])
+        prev_pass = samples[start:end]
     return samples
 
-def sine_wave_table(table_len):
+def sine_wave_table(table_len, random=None):
     t = np.linspace(0, 2*np.pi, table_len)
     wave_table = np.sin(t)
     return wave_table
 
-def discrete_wave_table(table_len):
-    wave_table = (np.random.randint(0, 2, table_len)*2 -1).astype(float)
+def discrete_wave_table(table_len, random=np.random):
+    wave_table = (random.randint(0, 2, table_len)*2 -1).astype(float)
     return wave_table
 
-def unif_wave_table(table_len):
-    wave_table = (np.random.rand(table_len)*2 -1).astype(float)
+def unif_wave_table(table_len, random=np.random):
+    wave_table = (random.rand(table_len)*2 -1).astype(float)
     return wave_table
 
-def fast_karplus_strong(freq, duration, decay=0.99, wave_table_reso=44100, func=unif_wave_table):
+def fast_karplus_strong(freq, duration, decay=0.99, wave_table_reso=44100, func=unif_wave_table, seed=None):
     log(f'Desired freq is: {freq:.1f}')
     freq = int(round(freq))
     log(f'Rounded to: {freq}')
@@ -357,7 +511,8 @@ def fast_karplus_strong(freq, duration, decay=0.99, wave_table_reso=44100, func=
     table_len = int(wave_table_reso // freq)
     log(f'Desired note duration of {num_samples} ({duration}*{wave_table_reso}) to get table length of: {table_len}')
 
-    wave_table = func(table_len)
+    random = np.random.RandomState(seed) if seed is not None else np.random
+    wave_table = func(table_len, random)
 
     n_iter = int(num_samples // table_len)
 
@@ -400,44 +555,148 @@ def play_karplus(note, duration=2, falloff=True, fast=False, **kwargs):
             samples = lin_falloff(samples)
     play_wave(samples)
 
-wave_cache = {}
+# bank of raw (un-falloffed) note samples, each synthesised once at a generous length
+# (see _settings.SAMPLE_BANK_DURATION) and served at shorter durations as read-only views.
+# its memory budget is set by the 'wave_bank' entry of _settings.CACHE_LIMITS.
+wave_bank = Cache('wave_bank')
 
-def synth_wave(freq, duration, type='KS', falloff=True, cache=True):
+def synth_wave(freq, duration, type='KS', falloff=True, cache=True, seed=None):
     """type must be one of:
-    'sine': sine wave synthesis
+    'pure': sine wave synthesis
     'KS': (slow) karplus-strong algorithm
-    'fast': fast karplus-strong approximation"""
-    params = (freq, duration, type, falloff)
+    'fast': fast karplus-strong approximation
+
+    if cache, the raw wave is taken from the sample bank, and falloff
+    (which depends on the wave's duration) is applied afterwards to a copy.
+    the karplus-strong methods are random, unless a seed is given (see wave_seed)"""
+    if cache:
+        num_samples = int(duration * fs)
+        wave = bank_wave(freq, type, min_duration=duration, seed=seed)[:num_samples]
+    else:
+        wave = raw_wave(freq, duration, type, seed=wave_seed(seed, freq, type))
+    if falloff:
+        wave = apply_falloff(wave, type)
+    return wave
+
+def synth_waves(freqs, duration, type='KS', falloff=True, cache=True, seed=None, workers=None, backend=None):
+    """synthesises a wave for each of a list of frequencies, as synth_wave.
+    if workers is an integer > 1, the raw waves are synthesised concurrently by a pool
+    of that many threads (if backend is 'thread') or processes (if backend is 'process').
+    workers and backend default to _settings.SYNTHESIS_WORKERS and SYNTHESIS_BACKEND.
+
+    since the waves are random, running in parallel requires each one to have its own seed:
+    these are derived from the seed arg (see wave_seed) in the same way as in serial mode,
+    so for the same seed the output is identical either way. if no seed is given,
+    the parallel seeds are drawn from the global numpy RNG (in order, before synthesis),
+    but the waves are still banked as unseeded, so that later notes can reuse them."""
+    workers = workers if workers is not None else _settings.SYNTHESIS_WORKERS
+    backend = backend if backend is not None else _settings.SYNTHESIS_BACKEND
+    if workers is None or workers <= 1:
+        return [synth_wave(f, duration, type=type, falloff=falloff, cache=cache, seed=seed) for f in freqs]
+
+    # unseeded waves still need their own seeds for parallel synthesis:
+    synth_seed = seed if seed is not None else np.random.randint(2**31)
+    # work out which raw waves actually need synthesising:
     if cache:
-        if params in wave_cache:
-            return wave_cache[params]
+        min_samples = int(duration * fs)
+        keys = {bank_key(f, type, seed): f for f in freqs}
+        jobs = {key: f for key, f in keys.items()
+                    if key not in wave_bank or len(wave_bank[key]) < min_samples}
+        job_duration = max(duration, _settings.SAMPLE_BANK_DURATION)
+    else:
+        jobs = {i: f for i, f in enumerate(freqs)}
+        job_duration = duration
+
+    if backend == 'thread':
+        from concurrent.futures import ThreadPoolExecutor as Executor # lazy import
+    elif backend == 'process':
+        from concurrent.futures import ProcessPoolExecutor as Executor # lazy import
+    else:
+        raise ValueError(f"backend must be one of 'thread' or 'process', but got: {backend}")
+    job_freqs = list(jobs.values())
+    with Executor(max_workers=workers) as pool:
+        raw_waves = list(pool.map(raw_wave, job_freqs, [job_duration]*len(jobs), [type]*len(jobs),
+                                  [wave_seed(synth_seed, f, type) for f in job_freqs]))
 
+    if cache:
+        # bank the new waves, and then serve every note from the bank as usual:
+        for key, wave in zip(jobs, raw_waves):
+            wave = fit_length(wave, int(job_duration * fs))
+            wave.flags.writeable = False
+            wave_bank[key] = wave
+        return [synth_wave(f, duration, type=type, falloff=falloff, cache=True, seed=seed) for f in freqs]
+    else:
+        return [apply_falloff(wave, type) if falloff else wave for wave in raw_waves]
+
+def wave_seed(seed, freq, type='KS'):
+    """derives the random seed for synthesising one particular wave from an overall seed,
+    so that every pitch gets its own (reproducible) random initial conditions,
+    whatever order or thread it happens to be synthesised in. returns None if seed is None"""
+    if seed is None:
+        return None
+    import zlib # lazy import
+    return zlib.crc32(repr((seed,) + bank_key(freq, type)).encode())
+
+def raw_wave(freq, duration, type='KS', seed=None):
+    """synthesises a wave by one of the methods listed in synth_wave, without falloff"""
     if type == 'pure':
         wave = sine_wave(freq, duration, correct=True)
-        if falloff:
-            wave = exp_falloff(wave)
     elif type == 'KS':
-        wave = karplus_strong(freq, duration)
-        if falloff:
-            wave = lin_falloff(wave)
+        wave = karplus_strong(freq, duration, seed=seed)
     elif type == 'fast':
-        wave = fast_karplus_strong(freq, duration, decay=0.99)
-        if falloff:
-            wave = exp_falloff(wave, peak_at=0.01)
+        wave = fast_karplus_strong(freq, duration, decay=0.99, seed=seed)
     else:
-        raise Exception('type arg supplied to synth_wave must be one of: sine, KS, fast')
-    if cache:
-        if params not in wave_cache:
-            wave_cache[params] = wave
+        raise Exception('type arg supplied to synth_wave must be one of: pure, KS, fast')
+    return wave
+
+def apply_falloff(wave, type='KS'):
+    """applies the volume falloff that suits each of the synthesis methods in synth_wave"""
+    if type == 'pure':
+        return exp_falloff(wave)
+    elif type == 'KS':
+        return lin_falloff(wave)
+    elif type == 'fast':
+        return exp_falloff(wave, peak_at=0.01)
+
+def bank_key(freq, type='KS', seed=None):
+    # the karplus-strong methods round their frequency to the nearest Hz anyway,
+    # so nearby pitches (e.g. the same note in different temperaments) share a sample:
+    key = (int(round(freq)) if type in ('KS', 'fast') else freq, type)
+    return key if seed is None else key + (seed,)
+
+def bank_wave(freq, type='KS', min_duration=0, seed=None):
+    """returns a read-only raw wave at this frequency from the sample bank, synthesising it
+    if necessary, that is at least as long as min_duration (in seconds) and
+    otherwise as long as _settings.SAMPLE_BANK_DURATION"""
+    key = bank_key(freq, type, seed)
+    if key in wave_bank:
+        wave = wave_bank[key]
+        if len(wave) >= int(min_duration * fs):
+            return wave
+    # (re)synthesise at the bank duration, or longer if asked for:
+    bank_duration = max(min_duration, _settings.SAMPLE_BANK_DURATION)
+    wave = raw_wave(freq, bank_duration, type, seed=wave_seed(seed, freq, type))
+    wave = fit_length(wave, int(bank_duration * fs))
+    wave.flags.writeable = False # since every note at this pitch shares it
+    wave_bank[key] = wave
     return wave
 
+def fit_length(wave, num_samples):
+    """trims or zero-pads a wave to exactly num_samples long, since not every synthesis
+    method produces exactly as many samples as its duration asks for
+    (fast_karplus_strong stops at a whole number of wave tables)"""
+    if len(wave) > num_samples:
+        return wave[:num_samples]
+    elif len(wave) < num_samples:
+        return np.concatenate([wave, np.zeros(num_samples - len(wave))])
+    else:
+        return wave
+
 def find_peaks(arr, ret=False):
-    num_peaks = 0
-    peak_idxs = []
-    for i in range(1, len(arr)-1):
-        if arr[i-1] < arr[i] > arr[i+1]:
-            num_peaks += 1
-            peak_idxs.append(i)
+    # local maxima, i.e. samples strictly greater than both their neighbours:
+    middle = arr[1:-1]
+    peak_idxs = np.flatnonzero((middle > arr[:-2]) & (middle > arr[2:])) + 1
+    num_peaks = len(peak_idxs)
     if ret:
         return num_peaks, peak_idxs
     else:
@@ -455,6 +714,7 @@ def detect_pure_freq(arr):
 def detect_freq(arr, note=False):
     """uses fft to detect highest frequency in a composite signal.
     if note=True, returns the note name instead"""
+    from scipy.fft import fft # lazy import
     N = len(arr)
     xf = np.linspace(0.0, 1.0/(2.0*(1/fs)), N//2)
     f = fft(arr)
@@ -468,6 +728,122 @@ def detect_freq(arr, note=False):
     else:
         return OctaveNote(pitch=freq).name
 
+### chroma analysis: polyphonic pitch-class detection from audio buffers
+
+def read_wav(path):
+    """reads a PCM WAV file (of 8, 16, 24 or 32 bits) with the stdlib wave module,
+    and returns a tuple of its samples as a mono float array in the range [-1, 1]
+    (averaged across channels) and its sample rate"""
+    import wave as wav # (stdlib module, renamed so it doesn't clash with our args)
+    with wav.open(str(path), 'rb') as file:
+        num_channels, sample_width, sample_rate = file.getnchannels(), file.getsampwidth(), file.getframerate()
+        frames = np.frombuffer(file.readframes(file.getnframes()), dtype=np.uint8)
+    if sample_width == 1:
+        # 8-bit WAVs are unsigned:
+        ints = frames.astype(np.int32) - 128
+    elif sample_width == 3:
+        # pad 24-bit samples into the upper bytes of 32-bit ints, to keep their sign:
+        padded = np.zeros((len(frames)//3, 4), dtype=np.uint8)
+        padded[:,1:] = frames.reshape(-1, 3)
+        ints = padded.view('<i4').reshape(-1) >> 8
+    else:
+        ints = frames.view(f'<i{sample_width}')
+    wave = ints.reshape(-1, num_channels).mean(axis=1) / 2**(8*sample_width - 1)
+    return wave, sample_rate
+
+def frame_view(wave, frame_size, hop_size):
+    """returns a read-only (num_frames, frame_size) view of a wave's overlapping frames,
+    hop_size samples apart, without copying it"""
+    if len(wave) < frame_size:
+        wave = np.concatenate([wave, np.zeros(frame_size - len(wave))])
+    return np.lib.stride_tricks.sliding_window_view(wave, frame_size)[::hop_size]
+
+def chroma_filter(frame_size, sample_rate=fs, min_freq=55, max_freq=4200):
+    """returns a (frame_size//2 + 1, 12) matrix that sums the FFT bins of a frame
+    into the twelve pitch classes (C=0, C#=1, ..., B=11), ignoring bins outside the
+    frequency range, which are too coarse (at the bottom) or mostly overtones (at the top)"""
+    bin_freqs = np.fft.rfftfreq(frame_size, d=1/sample_rate)
+    in_range = (bin_freqs >= min_freq) & (bin_freqs <= max_freq)
+    # nearest equal-tempered semitone relative to A4, which is pitch class 9:
+    semitones = np.round(12 * np.log2(np.where(in_range, bin_freqs, 440) / _settings.A4_PITCH)).astype(int)
+    pitch_classes = (semitones + 9) % 12
+    chroma_matrix = np.zeros((len(bin_freqs), 12))
+    chroma_matrix[np.flatnonzero(in_range), pitch_classes[in_range]] = 1
+    return chroma_matrix
+
+def chromagram(wave, sample_rate=fs, frame_size=8192, hop_size=4096, min_freq=55, max_freq=4200, batch_size=256):
+    """computes a 12-bin chroma vector (pitch class profile) for each windowed frame
+    of a wave, as a (num_frames, 12) array whose rows each sum to 1 (or 0, if silent).
+    frames are transformed batch_size at a time, all at once, to bound memory use.
+    frame i starts at sample i*hop_size."""
+    frames = frame_view(np.asarray(wave, dtype=float), frame_size, hop_size)
+    window = np.hanning(frame_size)
+    chroma_matrix = chroma_filter(frame_size, sample_rate, min_freq, max_freq)
+    chroma = np.zeros((len(frames), 12))
+    for start in range(0, len(frames), batch_size):
+        spectra = np.abs(np.fft.rfft(frames[start : start + batch_size] * window, axis=1))
+        chroma[start : start + batch_size] = spectra @ chroma_matrix
+    totals = chroma.sum(axis=1, keepdims=True)
+    return np.divide(chroma, totals, out=np.zeros_like(chroma), where=totals > 0)
+
+def chroma_notes(chroma, threshold=0.5):
+    """returns the NoteList of pitch classes whose weight in a chroma vector
+    is at least threshold times that of the strongest pitch class"""
+    from .notes import NoteList, chromatic_notes # lazy import
+    if np.max(chroma) == 0:
+        return NoteList([])
+    present = np.flatnonzero(chroma >= threshold * np.max(chroma))
+    # sort strongest first, so that the likeliest root comes first:
+    present = present[np.argsort(-chroma[present], kind='stable')]
+    return NoteList([chromatic_notes[p] for p in present])
+
+def detect_chords(wave, sample_rate=fs, segment=0.5, threshold=0.5, frame_size=8192, hop_size=4096, **kwargs):
+    """detects the most likely chord in each segment (of a duration in seconds) of a wave,
+    from the average chroma over its frames. returns a list of (start time, Chord) tuples,
+    with None for segments that are silent or fit no chord, and consecutive repeats merged.
+    further kwargs are passed to chords.most_likely_chord."""
+    from .chords import most_likely_chord # lazy import
+    chroma = chromagram(wave, sample_rate=sample_rate, frame_size=frame_size, hop_size=hop_size)
+    frames_per_segment = max(1, int(round(segment * sample_rate / hop_size)))
+    chord_cache = {} # segments with the same notes get the same chord
+    detected = []
+    for start in range(0, len(chroma), frames_per_segment):
+        segment_chroma = chroma[start : start + frames_per_segment].mean(axis=0)
+        notes = chroma_notes(segment_chroma, threshold=threshold)
+        note_key = tuple(n.position for n in notes)
+        if note_key not in chord_cache:
+            chord_cache[note_key] = most_likely_chord(notes, **kwargs) if len(notes) >= 2 else None
+        chord = chord_cache[note_key]
+        # (compared by name, since Chords can't be compared to None)
+        chord_name = chord.name if chord is not None else None
+        if len(detected) == 0 or chord_name != prev_name:
+            detected.append(((start * hop_size) / sample_rate, chord))
+        prev_name = chord_name
+    return detected
+
+def transcribe(audio, segment=0.5, threshold=0.5, **kwargs):
+    """transcribes a recording (a WAV file path, or a wave array at the global sampling rate)
+    into a ChordProgression of the chords detected in each segment, by detect_chords"""
+    from .progressions import ChordProgression # lazy import
+    if isinstance(audio, np.ndarray):
+        wave, sample_rate = audio, fs
+    else:
+        wave, sample_rate = read_wav(audio)
+    detected = detect_chords(wave, sample_rate=sample_rate, segment=segment, threshold=threshold, **kwargs)
+    chords = [chord for start, chord in detected if chord is not None]
+    return ChordProgression(chords)
+
+def detect_keys(audio, threshold=0.2, **kwargs):
+    """detects the likely keys of a recording (a WAV file path, or a wave array)
+    from its overall chroma, by passing its most prominent notes to keys.matching_keys"""
+    from .keys import matching_keys # lazy import
+    if isinstance(audio, np.ndarray):
+        wave, sample_rate = audio, fs
+    else:
+        wave, sample_rate = read_wav(audio)
+    overall_chroma = chromagram(wave, sample_rate=sample_rate).mean(axis=0)
+    return matching_keys(notes=chroma_notes(overall_chroma, threshold=threshold), **kwargs)
+
 # def rms(wave):
 #     """returns root mean squared deviation (i.e. std dev)
 #     of a sound wave or other 1d array"""
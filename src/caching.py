@@ -0,0 +1,259 @@
+### bounded caches for the library's dynamic object caches (see _settings.DYNAMIC_CACHING),
+### which would otherwise keep growing for as long as the interpreter runs.
+
+### a Cache is a dict that holds at most some number of entries (and/or some approximate
+### number of bytes), evicting the least recently or least frequently used entries beyond that,
+### and that counts its own hits, misses and evictions. limits and eviction policies are
+### configured per cache in _settings.CACHE_LIMITS.
+
+### cache_stats() summarises every cache that has been created so far (i.e. those of
+### the modules that have been imported), and reset_cache_stats() zeroes their counters,
+### e.g. to measure the hit rates of a particular workload after import-time pre-caching.
+
+from . import _settings
+from collections import OrderedDict
+import sys
+
+# every Cache registers itself here by name, so they can be inspected and reset together:
+registered_caches = {}
+
+class Cache(dict):
+    """dict subclass that evicts entries beyond a maximum number of entries or bytes.
+    lookups by the usual 'if key in cache: return cache[key]' idiom are counted as
+    hits (on __getitem__) and misses (on a failed __contains__).
+
+    policy must be 'LRU' (evict the least recently used entry) or
+    'LFU' (evict the least frequently used entry, and the oldest of those if tied)."""
+    def __init__(self, name, items=None, max_entries=None, max_bytes=None, policy=None):
+        super().__init__()
+        self.name = name
+        # fall back on the settings for this cache, and then the global defaults:
+        limits = _settings.CACHE_LIMITS.get(name, {})
+        self.max_entries = max_entries if max_entries is not None else limits.get('max_entries', _settings.CACHE_MAX_ENTRIES)
+        self.max_bytes = max_bytes if max_bytes is not None else limits.get('max_bytes', None)
+        self.policy = (policy if policy is not None else limits.get('policy', _settings.CACHE_POLICY)).upper()
+        if self.policy not in ('LRU', 'LFU'):
+            raise ValueError(f"Cache policy must be one of: 'LRU', 'LFU', but got: {self.policy}")
+
+        self.hits = self.misses = self.evictions = 0
+        self.key_hits = {} # number of hits on each key currently in the cache
+        self.num_bytes = 0
+        self._sizes = {} # approximate size of each value, only tracked if max_bytes is set
+        self._recency = OrderedDict() # keys from least to most recently used (for LRU)
+        self._counts = {} # number of uses of each key (for LFU)
+        self._count_keys = {} # keys with each number of uses, from oldest to newest (for LFU)
+
+        if items is not None:
+            self.update(items)
+        registered_caches[name] = self
+
+    ### lookups:
+    def __contains__(self, key):
+        found = super().__contains__(key)
+        if not found:
+            self.misses += 1
+        return found
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.hits += 1
+        self.key_hits[key] = self.key_hits.get(key, 0) + 1
+        self._touch(key)
+        return value
+
+    def get(self, key, default=None):
+        if super().__contains__(key):
+            return self[key]
+        else:
+            self.misses += 1
+            return default
+
+    ### insertion and removal:
+    def __setitem__(self, key, value):
+        if super().__contains__(key):
+            self._forget(key)
+        super().__setitem__(key, value)
+        self._remember(key, value)
+        self._evict()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        # dict's in-place union would bypass eviction and bookkeeping:
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if not super().__contains__(key):
+            self[key] = default
+        return super().__getitem__(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._forget(key)
+
+    def pop(self, key, *default):
+        if super().__contains__(key):
+            self._forget(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._forget(key)
+        return key, value
+
+    def clear(self):
+        super().clear()
+        self.key_hits.clear()
+        self._sizes.clear()
+        self._recency.clear()
+        self._counts.clear()
+        self._count_keys.clear()
+        self.num_bytes = 0
+
+    def resize(self, max_entries=None, max_bytes=None):
+        """change this cache's limits, evicting entries immediately if necessary"""
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        if max_bytes is not None and len(self._sizes) < len(self):
+            # start tracking sizes of existing entries:
+            for key, value in self.items():
+                if key not in self._sizes:
+                    self._sizes[key] = sizeof(value)
+            self.num_bytes = sum(self._sizes.values())
+        self._evict()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+        self.key_hits.clear()
+
+    def memory_size(self):
+        """approximate memory footprint of this cache's values in bytes"""
+        if self.max_bytes is not None:
+            return self.num_bytes # already being tracked
+        else:
+            return sum(sizeof(value) for value in self.values())
+
+    def top_keys(self, num=3):
+        """returns the keys in this cache that have been hit most often
+        (since the last reset), as a list of (key, hits) tuples"""
+        return sorted(self.key_hits.items(), key=lambda kv: -kv[1])[:num]
+
+    def stats(self, num_top_keys=3):
+        """returns a dict summarising this cache's size and usage"""
+        lookups = self.hits + self.misses
+        return {'entries': len(self),
+                'bytes': self.memory_size(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups > 0 else None,
+                'evictions': self.evictions,
+                'top_keys': self.top_keys(num_top_keys)}
+
+    def __reduce__(self):
+        # caches are pickled (e.g. into snapshots) as plain dicts of their contents:
+        return (dict, (dict(self),))
+
+    ### eviction bookkeeping:
+    def _remember(self, key, value):
+        if self.max_bytes is not None:
+            self._sizes[key] = sizeof(value)
+            self.num_bytes += self._sizes[key]
+        if self.policy == 'LRU':
+            self._recency[key] = None
+        else:
+            self._counts[key] = 1
+            self._count_keys.setdefault(1, OrderedDict())[key] = None
+
+    def _forget(self, key):
+        self.key_hits.pop(key, None)
+        if key in self._sizes:
+            self.num_bytes -= self._sizes.pop(key)
+        if self.policy == 'LRU':
+            del self._recency[key]
+        else:
+            count = self._counts.pop(key)
+            del self._count_keys[count][key]
+            if len(self._count_keys[count]) == 0:
+                del self._count_keys[count]
+
+    def _touch(self, key):
+        if self.policy == 'LRU':
+            self._recency.move_to_end(key)
+        else:
+            count = self._counts[key]
+            del self._count_keys[count][key]
+            if len(self._count_keys[count]) == 0:
+                del self._count_keys[count]
+            self._counts[key] = count + 1
+            self._count_keys.setdefault(count + 1, OrderedDict())[key] = None
+
+    def _over_limit(self):
+        return (((self.max_entries is not None) and (len(self) > self.max_entries))
+             or ((self.max_bytes is not None) and (self.num_bytes > self.max_bytes)))
+
+    def _evict(self):
+        while len(self) > 0 and self._over_limit():
+            if self.policy == 'LRU':
+                key = next(iter(self._recency))
+            else:
+                key = next(iter(self._count_keys[min(self._count_keys)]))
+            del self[key]
+            self.evictions += 1
+
+    def __repr__(self):
+        return f'Cache({self.name}: {len(self)} entries, {self.policy})'
+
+def sizeof(obj):
+    """approximate memory footprint of a cached object in bytes:
+    the buffer size of numpy arrays, or the size of anything else
+    plus that of its attribute dict (but not the attributes themselves)"""
+    if hasattr(obj, 'nbytes'):
+        return obj.nbytes
+    elif hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+    else:
+        return sys.getsizeof(obj)
+
+def cache_stats(display=True, num_top_keys=3):
+    """summarises the size and usage of every cache created so far.
+    if display, prints a table of them, otherwise returns a dict
+    mapping each cache's name to the dict returned by its .stats() method"""
+    stats = {name: cache.stats(num_top_keys) for name, cache in registered_caches.items()}
+    if display:
+        from .display import DataFrame # lazy import
+        df = DataFrame(['Cache', 'Entries', 'Memory', 'Hits', 'Misses', 'Hit rate', 'Evict.', 'Top keys'])
+        for name, s in stats.items():
+            hit_rate = f"{s['hit_rate']:.1%}" if s['hit_rate'] is not None else '-'
+            top_keys = ', '.join([f'{short_key(k)} ({h})' for k,h in s['top_keys']])
+            df.append([name, s['entries'], format_bytes(s['bytes']), s['hits'], s['misses'], hit_rate, s['evictions'], top_keys])
+        df.show(margin=' ')
+    else:
+        return stats
+
+def reset_cache_stats():
+    """zeroes the hit, miss and eviction counters of every cache, without clearing them"""
+    for cache in registered_caches.values():
+        cache.reset_stats()
+
+def clear_caches():
+    """empties every cache (including anything pre-cached at import) and zeroes its counters"""
+    for cache in registered_caches.values():
+        cache.clear()
+        cache.reset_stats()
+
+def format_bytes(num_bytes):
+    for unit in ['B', 'KiB', 'MiB']:
+        if num_bytes < 1024:
+            return f'{num_bytes:.0f}{unit}' if unit == 'B' else f'{num_bytes:.1f}{unit}'
+        num_bytes /= 1024
+    return f'{num_bytes:.1f}GiB'
+
+def short_key(key, max_len=24):
+    """cache keys are often long tuples padded with Nones, so we only show their non-None parts"""
+    if isinstance(key, tuple):
+        key_str = ','.join([str(k) for k in key if not (k is None or (isinstance(k, tuple) and len(k) == 0))])
+    else:
+        key_str = str(key)
+    return key_str if len(key_str) <= max_len else key_str[:max_len-1] + '…'
@@ -1,9 +1,10 @@
 from .notes import Note, NoteList
 from .intervals import Interval, IntervalList, P5, default_degree_intervals
-from .util import log, precision_recall, rotate_list, check_all, all_equal, sign, reverse_dict, unpack_and_reverse_dict, reduce_aliases
+from .util import log, precision_recall, rotate_list, check_all, all_equal, sign, reverse_dict, unpack_and_reverse_dict, reduce_aliases, unpickle_list, pitch_class_mask, mask_normal_form, rotate_mask
 from .qualities import Quality, ChordModifier, parse_chord_modifiers
 from .parsing import sh, fl, nat
-from . import notes, parsing, qualities, tuning, _settings
+from . import notes, parsing, qualities, tuning, snapshots, _settings
+from .caching import Cache
 
 from collections import defaultdict, UserDict, Counter
 import itertools
@@ -751,6 +752,12 @@ class AbstractChord:
         assert isinstance(other, AbstractChord)
         return self.factors - other.factors
 
+    @property
+    def pitch_class_mask(self):
+        """bitmask of the (flattened) intervals in this chord, relative to its bass,
+        see util.pitch_class_mask"""
+        return self.intervals.pitch_class_mask
+
     def __contains__(self, item):
         """AbstractChords can contain degrees (as integers), or intervals (as Intervals)"""
         if isinstance(item, Interval):
@@ -777,7 +784,7 @@ class AbstractChord:
         by this definition, m7/1 is enharmonic to maj6, maj7add4 is enharmonic to maj7add11, etc."""
 
         if isinstance(other, AbstractChord) and not isinstance(other, Chord):
-            return set(self.intervals.flatten().unique()) == set(other.intervals.flatten().unique())
+            return self.pitch_class_mask == other.pitch_class_mask
         else:
             raise TypeError(f'Enharmonic equivalence operator & not defined between AbstractChord and: {type(other)}')
 
@@ -1142,6 +1149,12 @@ class Chord(AbstractChord):
         """returns notes inside self, all with flat preference"""
         return NoteList([Note.from_cache(n.chroma, prefer_sharps=False) for n in self.notes])
 
+    @property
+    def pitch_class_mask(self):
+        """bitmask of the notes in this chord by absolute pitch class (C=0),
+        see util.pitch_class_mask"""
+        return self.notes.pitch_class_mask
+
     def __contains__(self, item):
         """Chords can contain degrees (as integers), intervals (as Intervals),
         or notes (as Notes, or strings that cast to Notes)"""
@@ -1171,7 +1184,7 @@ class Chord(AbstractChord):
         which is: do they contain the exact same unique notes? (if not in the same order)"""
 
         if isinstance(other, Chord):
-            return set(self.notes.unique()) == set(other.notes.unique())
+            return self.pitch_class_mask == other.pitch_class_mask
         else:
             raise TypeError(f'Enharmonic equivalence operator & not defined between Chord and: {type(other)}')
 
@@ -1468,6 +1481,13 @@ class Chord(AbstractChord):
     def play(self, *args, **kwargs):
         self.notes.play(*args, **kwargs)
 
+    def render(self, *args, **kwargs):
+        return self.notes.render(*args, **kwargs)
+
+    def to_midi(self, path=None, delay=None, **kwargs):
+        # (notes are played together by default, rather than as an arpeggio)
+        return self.notes.to_midi(path, delay=delay, **kwargs)
+
 
     #### display methods:
 
@@ -1764,72 +1784,109 @@ factors_to_chord_names, intervals_to_chord_names = {}, {}
 chord_name_rarities = unpack_and_reverse_dict(chord_names_by_rarity)
 tweak_name_rarities = unpack_and_reverse_dict(tweak_names_by_rarity)
 
-new_rarities = {i: [] for i in range(max_rarity +1)}
-for rarity, chord_names in chord_names_by_rarity.items():
-    log(f'Handling base chords for rarity={rarity}, chords={chord_names}')
+def _build_chord_registry():
+    """fills factors_to_chord_names and intervals_to_chord_names with every base chord
+    and its valid tweaks, and extends chord_names_by_rarity (in place) with those tweaked chords.
+    called once at import, unless an up-to-date registry snapshot is found on disk"""
+    new_rarities = {i: [] for i in range(max_rarity +1)}
+    for rarity, chord_names in chord_names_by_rarity.items():
+        log(f'Handling base chords for rarity={rarity}, chords={chord_names}')
 
-    for chord_name in chord_names:
-        base_chord = AbstractChord(chord_name)
-        log(f'Handling base chord: r:{rarity} {chord_name}')
+        for chord_name in chord_names:
+            base_chord = AbstractChord(chord_name)
+            log(f'Handling base chord: r:{rarity} {chord_name}')
 
-        if base_chord.factors in factors_to_chord_names or base_chord.intervals in intervals_to_chord_names:
-            log(f'  {chord_name} clash with {intervals_to_chord_names[base_chord.intervals]}')
-        else:
-            factors_to_chord_names[base_chord.factors] = chord_name
-            intervals_to_chord_names[base_chord.intervals] = chord_name
+            if base_chord.factors in factors_to_chord_names or base_chord.intervals in intervals_to_chord_names:
+                log(f'  {chord_name} clash with {intervals_to_chord_names[base_chord.intervals]}')
+            else:
+                factors_to_chord_names[base_chord.factors] = chord_name
+                intervals_to_chord_names[base_chord.intervals] = chord_name
+
+    # handle the modifiers of base chords in a new loop:
+    for rarity, chord_names in chord_names_by_rarity.items():
+        log(f'Handling modifiers for rarity={rarity}, chords={chord_names}')
+
+        for chord_name in chord_names:
+            if chord_name not in unmodifiable_chords:
+                base_chord = AbstractChord(chord_name)
+                # now: add chord tweaks to each base chord as well, increasing rarity accordingly
+                for tweak_name in ordered_tweak_names:
+                    tweak = qualities.chord_tweaks[tweak_name] # fetch ChordModifier object by name
+                    # add a tweak if it does not already exist by name and is valid on this base chord:
+                    if tweak.valid_on(base_chord.factors):
+                        # (we check if base chord is major because the tweaks on their own apply to major chords,
+                        #  i.e. the chord 'sus2' implies ['' + 'sus2'])
+                        if not ((tweak in ind_tweaks) and (base_chord.quality.minor)):
+                            altered_name = chord_name + tweak_name
+
+                            altered_factors = base_chord.factors + tweak
+                            altered_intervals = altered_factors.to_intervals()
+                            # avoid double counting: e.g. this ensures that '9sus4' and 'm9sus4' are treated as one chord, '9sus4', despite both being a valid chord init
+                            if altered_factors not in factors_to_chord_names and altered_intervals not in intervals_to_chord_names:
+                                factors_to_chord_names[altered_factors] = altered_name
+                                intervals_to_chord_names[altered_intervals] = altered_name
+
+                                # figure out the rarity of this tweak and add it to the rarity dict:
+                                tweak_rarity = tweak_name_rarities[tweak_name]
+                                altered_rarity = chord_name_rarities[chord_name] + tweak_rarity
+                                new_rarities[altered_rarity].append(altered_name)
+
+                                # finally: do the same again, but one level deeper!
+                                for tweak_name2 in ordered_tweak_names:
+                                    tweak2 = qualities.chord_tweaks[tweak_name] # fetch ChordModifier object by name
+                                    # do not apply the same tweak twice, and do so only if valid:
+                                    if (tweak2 is not tweak) and tweak2.valid_on(altered_factors):
+                                        if not ((tweak2 in ind_tweaks) and (base_chord.quality.minor)):
+                                            # and, special case, not if (no5) is the first tweak, since it always comes last:
+                                            if tweak_name != '(no5)':
+                                                altered2_name = altered_name + tweak2_name
+
+                                                altered2_factors = altered_factors + tweak2
+                                                altered2_intervals = altered2_factors.to_intervals()
+                                                # avoid the lower triangular: (e.g. m(no5)add9 vs madd9(no5))
+                                                if altered2_factors not in factors_to_chord_names and altered2_intervals not in intervals_to_chord_names:
+                                                    factors_to_chord_names[altered2_factors] = altered2_name
+                                                    intervals_to_chord_names[altered2_intervals] = altered2_name
+
+                                                    # these are all rarity 7, the 'legendary chords'
+                                                    new_rarities[max_rarity].append(altered2_name)
+
+    # update chord_names_by_rarity with new rarities:
+    for r, names in new_rarities.items():
+        chord_names_by_rarity[r].extend(names)
+
+
+def _pre_cache_chords():
+    """initialise common chord objects in cache for faster access later"""
+    # cache abstract chords by name up to a certain rarity:
+    cached_abstract_chords.update({(chord_name,None,None,None,None): AbstractChord(chord_name) for chord_name, rarity in chord_name_rarities.items() if rarity <= 1}) # not currently used
+    # let the cache point to them by their factors as well:
+    cached_abstract_chords.update({(None,c.factors,None,None,None): c for c in cached_abstract_chords.values()})
+    cached_abstract_chords[(None, None, (), None, None)] = AbstractChord() # major triad
+    cached_abstract_chords[(None, None, (ChordModifier('minor'),), None, None)] = AbstractChord('m') # minor triad
 
-# handle the modifiers of base chords in a new loop:
-for rarity, chord_names in chord_names_by_rarity.items():
-    log(f'Handling modifiers for rarity={rarity}, chords={chord_names}')
+    # cache rooted chords by name up to a certain rarity:
+    cached_chords.update({(tonic+chord_name,None,None,None,None,None): Chord(tonic+chord_name) for tonic in parsing.common_note_names for chord_name, rarity in chord_name_rarities.items() if rarity <= 1})
+    # and by factors:
+    cached_chords.update({(None,c.factors,None,c.root.chroma,None,None): c for c in cached_chords.values()})
 
-    for chord_name in chord_names:
-        if chord_name not in unmodifiable_chords:
-            base_chord = AbstractChord(chord_name)
-            # now: add chord tweaks to each base chord as well, increasing rarity accordingly
-            for tweak_name in ordered_tweak_names:
-                tweak = qualities.chord_tweaks[tweak_name] # fetch ChordModifier object by name
-                # add a tweak if it does not already exist by name and is valid on this base chord:
-                if tweak.valid_on(base_chord.factors):
-                    # (we check if base chord is major because the tweaks on their own apply to major chords,
-                    #  i.e. the chord 'sus2' implies ['' + 'sus2'])
-                    if not ((tweak in ind_tweaks) and (base_chord.quality.minor)):
-                        altered_name = chord_name + tweak_name
-
-                        altered_factors = base_chord.factors + tweak
-                        altered_intervals = altered_factors.to_intervals()
-                        # avoid double counting: e.g. this ensures that '9sus4' and 'm9sus4' are treated as one chord, '9sus4', despite both being a valid chord init
-                        if altered_factors not in factors_to_chord_names and altered_intervals not in intervals_to_chord_names:
-                            factors_to_chord_names[altered_factors] = altered_name
-                            intervals_to_chord_names[altered_intervals] = altered_name
-
-                            # figure out the rarity of this tweak and add it to the rarity dict:
-                            tweak_rarity = tweak_name_rarities[tweak_name]
-                            altered_rarity = chord_name_rarities[chord_name] + tweak_rarity
-                            new_rarities[altered_rarity].append(altered_name)
-
-                            # finally: do the same again, but one level deeper!
-                            for tweak_name2 in ordered_tweak_names:
-                                tweak2 = qualities.chord_tweaks[tweak_name] # fetch ChordModifier object by name
-                                # do not apply the same tweak twice, and do so only if valid:
-                                if (tweak2 is not tweak) and tweak2.valid_on(altered_factors):
-                                    if not ((tweak2 in ind_tweaks) and (base_chord.quality.minor)):
-                                        # and, special case, not if (no5) is the first tweak, since it always comes last:
-                                        if tweak_name != '(no5)':
-                                            altered2_name = altered_name + tweak2_name
-
-                                            altered2_factors = altered_factors + tweak2
-                                            altered2_intervals = altered2_factors.to_intervals()
-                                            # avoid the lower triangular: (e.g. m(no5)add9 vs madd9(no5))
-                                            if altered2_factors not in factors_to_chord_names and altered2_intervals not in intervals_to_chord_names:
-                                                factors_to_chord_names[altered2_factors] = altered2_name
-                                                intervals_to_chord_names[altered2_intervals] = altered2_name
-
-                                                # these are all rarity 7, the 'legendary chords'
-                                                new_rarities[max_rarity].append(altered2_name)
-
-# update chord_names_by_rarity with new rarities:
-for r, names in new_rarities.items():
-    chord_names_by_rarity[r].extend(names)
+    # intonation = tuning.get_intonation()
+    # cached_consonances_by_suffix.update({(intonation, ac.suffix): ac.consonance for ac in cached_abstract_chords.values()}) # does this perform a double update if _settings.DYNAMIC_CACHING is on?
+
+
+# the registry tables above (and the pre-cached chords below) take a while to build,
+# so we try to load them from an on-disk snapshot first, which is only valid for
+# the exact chord/quality definitions (and settings) that it was built from:
+registry_snapshot_key = snapshots.definitions_hash('_settings', 'util', 'parsing', 'qualities', 'intervals', 'notes', 'chords',
+                                                   extra=(_settings.PRE_CACHE_CHORDS, _settings.PREFER_UNICODE_ACCIDENTALS, _settings.DEFAULT_SHARPS))
+registry_snapshot = snapshots.load_snapshot('chords', registry_snapshot_key)
+
+if registry_snapshot is not None:
+    factors_to_chord_names.update(registry_snapshot['factors_to_chord_names'])
+    intervals_to_chord_names.update(registry_snapshot['intervals_to_chord_names'])
+    chord_names_by_rarity.update(registry_snapshot['chord_names_by_rarity'])
+else:
+    _build_chord_registry()
 
 # re-instantiate the reverse dict since we've added to the forward one (but we still needed it earlier:)
 chord_name_rarities = unpack_and_reverse_dict(chord_names_by_rarity)
@@ -1846,28 +1903,74 @@ major_triads = {n: Chord(n.chroma) for n in notes.major_tonics}
 minor_triads = {n: Chord(n.chroma + 'm') for n in notes.minor_tonics}
 
 # empty caches to be filled later, by pre-caching and/or dynamic caching:
-cached_abstract_chords = {}
-cached_chords = {}
-cached_consonances_by_suffix = {}
-
-if _settings.PRE_CACHE_CHORDS: # initialise common chord objects in cache for faster access later
-    # cache abstract chords by name up to a certain rarity:
-    cached_abstract_chords.update({(chord_name,None,None,None,None): AbstractChord(chord_name) for chord_name, rarity in chord_name_rarities.items() if rarity <= 1}) # not currently used
-    # let the cache point to them by their factors as well:
-    cached_abstract_chords.update({(None,c.factors,None,None,None): c for c in cached_abstract_chords.values()})
-    cached_abstract_chords[(None, None, (), None, None)] = AbstractChord() # major triad
-    cached_abstract_chords[(None, None, (ChordModifier('minor'),), None, None)] = AbstractChord('m') # minor triad
-
-    # cache rooted chords by name up to a certain rarity:
-    cached_chords.update({(tonic+chord_name,None,None,None,None,None): Chord(tonic+chord_name) for tonic in parsing.common_note_names for chord_name, rarity in chord_name_rarities.items() if rarity <= 1})
-    # and by factors:
-    cached_chords.update({(None,c.factors,None,c.root.chroma,None,None): c for c in cached_chords.values()})
-
-    # intonation = tuning.get_intonation()
-    # cached_consonances_by_suffix.update({(intonation, ac.suffix): ac.consonance for ac in cached_abstract_chords.values()}) # does this perform a double update if _settings.DYNAMIC_CACHING is on?
-
+cached_abstract_chords = Cache('abstract_chords')
+cached_chords = Cache('chords')
+cached_consonances_by_suffix = Cache('chord_consonances')
+
+if registry_snapshot is not None:
+    cached_abstract_chords.update(registry_snapshot['cached_abstract_chords'])
+    cached_chords.update(registry_snapshot['cached_chords'])
+else:
+    if _settings.PRE_CACHE_CHORDS:
+        _pre_cache_chords()
+    snapshots.save_snapshot('chords', registry_snapshot_key,
+                            {'factors_to_chord_names': factors_to_chord_names,
+                             'intervals_to_chord_names': intervals_to_chord_names,
+                             'chord_names_by_rarity': chord_names_by_rarity,
+                             'cached_abstract_chords': cached_abstract_chords,
+                             'cached_chords': cached_chords})
+del registry_snapshot # no need to keep a second reference to these tables around
 cache_initialised = True
 
+#### pitch-class set index for exact chord matching:
+# maps the transposition-normalised pitch-class mask of every registered chord
+# (see util.mask_normal_form) to a list of (root offset, chord name, no5, interval pitch classes)
+# tuples that realise it, where 'root offset' is the chord's root within the normalised mask,
+# so that the chords fitting a set of notes can be found with one dict lookup.
+# built lazily, and rebuilt if any new chords have been registered since.
+pitch_class_chord_index = {}
+pitch_class_index_size = 0 # number of registered chords that the index was built from
+
+def build_pitch_class_chord_index():
+    global pitch_class_index_size
+    pitch_class_chord_index.clear()
+    for intervals, chord_name in intervals_to_chord_names.items():
+        interval_pcs = tuple(iv.value % 12 for iv in intervals)
+        if len(set(interval_pcs)) < len(interval_pcs):
+            # degenerate chords with repeated pitch classes (like 9sus2) can only be told apart by voicing
+            continue
+        _add_to_pitch_class_index(interval_pcs, chord_name, no5=False)
+        # chords with a perfect fifth are also realised by their notes without the fifth,
+        # unless those notes are a registered chord in their own right:
+        if 7 in [iv.value for iv in intervals]:
+            no5_intervals = IntervalList([iv for iv in intervals if iv.value != 7])
+            if no5_intervals not in intervals_to_chord_names:
+                _add_to_pitch_class_index(tuple(iv.value % 12 for iv in no5_intervals), chord_name, no5=True)
+    pitch_class_index_size = len(intervals_to_chord_names)
+
+def _add_to_pitch_class_index(interval_pcs, chord_name, no5):
+    normal_mask, (root_offset, *_) = mask_normal_form(pitch_class_mask(interval_pcs))
+    if normal_mask not in pitch_class_chord_index:
+        pitch_class_chord_index[normal_mask] = []
+    pitch_class_chord_index[normal_mask].append((root_offset, chord_name, no5, interval_pcs))
+
+def chords_with_pitch_classes(mask, search_no5s=True):
+    """returns a list of (root position, chord name, interval pitch classes) tuples
+    for all registered chords (on any root) whose notes are exactly the pitch classes in mask.
+    if search_no5s, also returns chords that would fit if a perfect fifth were added,
+        with '(no5)' appended to their names."""
+    if pitch_class_index_size != len(intervals_to_chord_names):
+        build_pitch_class_chord_index()
+    normal_mask, rotations = mask_normal_form(mask)
+    matches = []
+    for root_offset, chord_name, no5, interval_pcs in pitch_class_chord_index.get(normal_mask, []):
+        if no5 and not search_no5s:
+            continue
+        name = chord_name + '(no5)' if no5 else chord_name
+        # rotate the chord root back from the normalised mask to the input mask:
+        matches.extend([((root_offset - steps) % 12, name, interval_pcs) for steps in rotations])
+    return matches
+
 ######################################################
 
 
@@ -1936,6 +2039,10 @@ class ChordList(list):
     def __repr__(self):
         return str(self)
 
+    def __reduce__(self):
+        # bypass our own append when unpickling:
+        return (unpickle_list, (self.__class__, list(self), self.__dict__))
+
     def append(self, c):
         """appends an item to self, ensuring it is a Chord or AbstractChord"""
         if isinstance(c, Chord):
@@ -2110,6 +2217,36 @@ class ChordList(list):
         # prog_wave = arrange_melody(chord_waves, delay=delay, **kwargs)
         # play_wave(prog_wave, block=block)
 
+    def render(self, path=None, chord_delay=1, note_delay=0, duration=2.5, octave=None, falloff=True, type='fast', bit_depth=16, **kwargs):
+        """renders the audio that ChordList.play would play, without needing a sound device:
+        returns it as a float32 buffer, and writes it to a WAV file if path is given"""
+        chord_waves = [c._melody_wave(duration=duration, delay=note_delay, octave=octave, type=type, **kwargs) for c in self]
+        from .audio import arrange_melody, render_wave
+        prog_wave = arrange_melody(chord_waves, delay=chord_delay, falloff=falloff)
+        return render_wave(prog_wave, path, bit_depth=bit_depth)
+
+    def stream(self, chord_delay=1, note_delay=0, duration=2.5, octave=None, falloff=True, type='fast', block_size=1024, **kwargs):
+        """yields the audio that ChordList.play would play in float32 blocks of block_size frames,
+        synthesising each chord only when it is reached, so that long progressions
+        can be played or written to file (see audio.write_wav_stream) in constant memory"""
+        from .audio import stream_events, lin_falloff, fs
+        delay_frames = int(chord_delay * fs)
+        def chord_wave(c):
+            wave = c._melody_wave(duration=duration, delay=note_delay, octave=octave, type=type, **kwargs)
+            return lin_falloff(wave) if falloff else wave
+        events = (((delay_frames * i) / fs, lambda c=c: chord_wave(c)) for i, c in enumerate(self))
+        return stream_events(events, block_size=block_size)
+
+    def to_midi(self, path=None, chord_delay=1, note_delay=0, duration=2.5, octave=None, velocity=100, tempo=120):
+        """exports this chordlist as a MIDI file, timed as ChordList.play would play it,
+        or returns the file's bytes if no path is given"""
+        from .midi import note_events, export_midi
+        events = []
+        for i, c in enumerate(self):
+            events.extend(note_events(c.notes.force_octave(start_octave=octave), start=i*chord_delay,
+                                      delay=note_delay, duration=duration, velocity=velocity))
+        return export_midi([events], path, tempo=tempo)
+
     @property
     def fretboard(self):
         """wrapper around Guitar.standard.show_chord for each chord in this list"""
@@ -2142,45 +2279,24 @@ def matching_chords(notes, display=True, return_scores=False,
                     search_no5s=True,
                     min_recall=0.9, min_precision=0.85,
                     min_likelihood=0.5, min_consonance=0.35,
-                    allow_fuzzy=True, size_cutoff=5,
+                    allow_fuzzy=True,
                     whitelist=None, blacklist=None,
                     max_results=10, **kwargs):
     # re-cast input:
     if not isinstance(notes, NoteList):
         notes = NoteList(notes)
 
-    # for chords with 5(?) notes or less, we can efficiently search all their permutations:
-    if len(notes) <= size_cutoff:
-        note_permutations = [NoteList(ns) for ns in itertools.permutations(notes)]
-        interval_permutations = [nl.ascending_intervals() for nl in note_permutations]
-    else:
-        # # otherwise we'll search only the inversions instead of all permutations
-        # #  which is faster but less complete:
-        # note_permutations = [notes.rotate(i) for i in range(len(notes))]
-        # interval_permutations = {notes[i]: note_permutations[i].ascending_intervals() for i in range(len(notes))}
-        print(f'{len(notes)} is too many for exact permutation searching')
-        if not exact:
-            print(f'So falling back on fuzzy matching')
-            if 'require_root' not in kwargs:
-                kwargs['require_root'] = invert
-            return fuzzy_matching_chords(notes, display=display, invert=invert, assume_root=invert, # require_root=invert,
-                                         min_likelihood=min_likelihood, max_results=max_results, **kwargs)
-        else:
-            raise Exception(f'Set exact=False for notelists exceeding size_cutoff, or set size_cutoff higher than {size_cutoff}')
-
-
-    candidate_names = []
-    for notes_p, intervals_p in zip(note_permutations, interval_permutations):
-        root = notes_p[0]
-        if intervals_p in intervals_to_chord_names:
-            candidate_names.append(f'{root.name}{intervals_to_chord_names[intervals_p]}')
-        elif (search_no5s) and (P5 not in intervals_p):
-            # this potential candidate lacks a 5, would it fit a named chord if it had one?
-            added5_intervals = IntervalList(intervals_p)
-            added5_intervals.append(P5)
-            added5_intervals = added5_intervals.sorted()
-            if added5_intervals in intervals_to_chord_names:
-                candidate_names.append(f'{root.name}{intervals_to_chord_names[added5_intervals]}(no5)')
+    # look up every registered chord whose notes are exactly the input notes, on any root:
+    note_indices = {}
+    for i, n in enumerate(notes):
+        note_indices.setdefault(n.position, i)
+    candidates = []
+    for root_position, chord_name, interval_pcs in chords_with_pitch_classes(notes.pitch_class_mask, search_no5s=search_no5s):
+        root = notes[note_indices[root_position]]
+        # rank ties between candidates by the order that their notes appear in the input:
+        input_order = tuple(note_indices[(root_position + pc) % 12] for pc in interval_pcs)
+        candidates.append((input_order, f'{root.name}{chord_name}'))
+    candidate_names = [name for order, name in sorted(candidates)]
 
     if invert:
         note_list_root = notes[0]
@@ -2247,6 +2363,87 @@ def matching_chords(notes, display=True, return_scores=False,
         # neither scores or display, just return bare list
         return sorted_cands
 
+#### vectorised fuzzy chord matching:
+# fuzzy_matching_chords scores every registered chord on every root by precision and recall,
+# which it does all at once by holding each chord as a vector of note counts by pitch class,
+# relative to its root, and rotating the input notes onto each possible root.
+
+cached_chord_templates = Cache('chord_templates')
+cached_inverted_consonances = Cache('inverted_chord_consonances')
+
+def chord_template_table():
+    """returns a dict describing every chord in chord_names_by_rarity (in that order):
+        'names', 'factors': lists of each chord's name and ChordFactors
+        'counts': (chords, 12) int array, how many of each chord's notes lie on each pitch class above the root
+        'thirds': (chords,) int array, the pitch class of each chord's third (or -1 if it has none)
+        'perfect_fifths': (chords,) bool array, True where a chord has a perfect fifth
+        'likelihood', 'consonance': lists of each chord's (root position) scores.
+    the table is cached, and rebuilt only if more chords have been registered since."""
+    # (some chords are listed under more than one rarity, but only the first counts)
+    names = list(dict.fromkeys([name for rarity, chord_names in chord_names_by_rarity.items() for name in chord_names]))
+    if len(names) in cached_chord_templates:
+        return cached_chord_templates[len(names)]
+
+    import numpy as np
+    counts = np.zeros((len(names), 12), dtype=int)
+    thirds = np.full(len(names), -1, dtype=int)
+    perfect_fifths = np.zeros(len(names), dtype=bool)
+    factors, likelihoods, consonances = [], [], []
+    for t, name in enumerate(names):
+        chord = AbstractChord.from_cache(factors=chord_names_to_factors[name])
+        for iv in chord.intervals:
+            counts[t, iv.value % 12] += 1
+        if 3 in chord.factors:
+            thirds[t] = chord.factor_intervals[3].value % 12
+        perfect_fifths[t] = (5 in chord.factors) and (chord.factor_intervals[5] == 7)
+        factors.append(chord.factors)
+        likelihoods.append(chord.likelihood)
+        consonances.append(chord.consonance)
+
+    table = {'names': names, 'factors': factors, 'counts': counts, 'thirds': thirds,
+             'perfect_fifths': perfect_fifths, 'likelihood': likelihoods, 'consonance': consonances}
+    cached_chord_templates.clear()
+    cached_inverted_consonances.clear() # (since these are keyed by template index)
+    cached_chord_templates[len(names)] = table
+    return table
+
+def inverted_template_consonance(t, bass_pc):
+    """consonance of the chord at index t of the chord_template_table,
+    inverted over the note that lies bass_pc semitones above its root"""
+    if (t, bass_pc) not in cached_inverted_consonances:
+        table = chord_template_table()
+        chord = Chord(factors=table['factors'][t], root='C')
+        # (via the AbstractChord, whose suffix names its inversion by degree rather than by bass note)
+        inverted_chord = chord.invert(bass=Note.from_cache(position=bass_pc)).abstract()
+        cached_inverted_consonances[(t, bass_pc)] = inverted_chord.consonance
+    return cached_inverted_consonances[(t, bass_pc)]
+
+def score_chord_templates(table, notes, upweight_third=True, downweight_fifth=True):
+    """given a chord_template_table and a NoteList of unique notes, returns the
+    weighted precision and recall of every chord in the table, rooted on each of those notes,
+    as two (notes, chords) arrays. the same as util.precision_recall would give,
+    with weight 2 on chord thirds and 0.5 on perfect fifths if upweight_third/downweight_fifth."""
+    import numpy as np
+    weights = np.ones(table['counts'].shape)
+    if upweight_third:
+        has_third = table['thirds'] >= 0
+        weights[has_third, table['thirds'][has_third]] = 2
+    if downweight_fifth:
+        weights[table['perfect_fifths'], 7] = 0.5
+    in_chord = table['counts'] > 0
+
+    # input pitch classes relative to each possible root:
+    input_mask = np.zeros(12)
+    input_mask[[n.position for n in notes]] = 1
+    roots = np.array([n.position for n in notes])
+    relative_inputs = input_mask[(np.arange(12)[None,:] + roots[:,None]) % 12]
+
+    # (these weights are all multiples of 0.5, so their sums are exact in any order)
+    total_weight_retrieved = (table['counts'] * weights).sum(axis=1)
+    total_weight_relevant = relative_inputs @ weights.T
+    relevant_weight_retrieved = relative_inputs @ (weights * in_chord).T
+    return relevant_weight_retrieved / total_weight_retrieved[None,:], relevant_weight_retrieved / total_weight_relevant
+
 # old/deprecated function, but still useful if no exact matches for chords are found:
 def fuzzy_matching_chords(note_list, display=True,
                     assume_root=False, require_root=False, invert=False,
@@ -2291,63 +2488,61 @@ def fuzzy_matching_chords(note_list, display=True,
     else:
         blacklist_factors = [AbstractChord(b).factors if type(b) is not AbstractChord else b.factors for b in blacklist]
 
-    candidates = {} # we'll build a list of Chord object candidates as we go
-    # keying candidate chord objs to (rec, prec, likelihood, consonance) tuples
-
     # we'll try building notes starting on every unique note in the note_list
     # (this implicitly means that we require the tonic to be in the input, which is fine)
     unique_notes = note_list.unique()
-
-    for n in unique_notes:
-        for rarity, chord_names in chord_names_by_rarity.items():
-
-            # (no5) is already a missing degree, so we don't search chords that include it:
-            # names_to_try = [n for n in chord_names if '(no5)' not in n]
-            names_to_try = chord_names
-
-            for chord_name in names_to_try:
-                # init chord more efficiently than by name:
-                cand_factors = chord_names_to_factors[chord_name]
-                candidate = Chord(factors=cand_factors, root=n, prefer_sharps=prefer_sharps)
-
-                likelihood = candidate.likelihood # float from 0.3 to 1.0
-
-                # if candidate doesn't share the 'root', we can invert it:
-                if (candidate.root != note_list[0]):
-                    if invert and (note_list[0] in candidate.notes):
-                        candidate = candidate.invert(bass=note_list[0])
-                        # or otherwise just assume the note_list's root and make the non-inversion slightly less likely:
-                    elif assume_root:
-                        likelihood -= 0.15 # increase rarity by one-and-a-half steps
-
-                weights = {}
-                # upweight the third if asked for:
-                if (upweight_third) and (3 in candidate.factors):
-                    weights[candidate.factor_notes[3]] = 2
-                # only downweight perfect fifths:
-                if (downweight_fifth) and (5 in candidate.factors) and (candidate.factor_intervals[5]==7):
-                    weights[candidate.factor_notes[5]] = 0.5
-                # if require root, we only accept chords that share the bass note with the note_list:
-                if (not require_root) or (candidate.bass == note_list[0]):
-                    scores = precision_recall(unique_notes, candidate.notes, weights=weights)
-                    precision, recall = scores['precision'], scores['recall']
-                    consonance = candidate.consonance # float from ~0.4 to ~0.9, in principle
-
-                    if recall >= min_recall and precision >= min_precision:
-                        if (likelihood >= min_likelihood and consonance >= min_consonance) or (candidate.factors in whitelist_factors):
-                            if candidate.factors not in blacklist_factors:
-                                candidates[candidate] = {   'recall': round(recall,    2),
-                                                         'precision': round(precision, 2),
-                                                        'likelihood': round(likelihood,2),
-                                                        'consonance': round(consonance,3)}
+    first_note = note_list[0]
+
+    # score every registered chord on every possible root at once:
+    table = chord_template_table()
+    precisions, recalls = score_chord_templates(table, unique_notes, upweight_third, downweight_fifth)
+    import numpy as np
+    is_match = (recalls >= min_recall) & (precisions >= min_precision)
+
+    candidate_args = {} # we'll build a dict of the arguments that define each candidate chord as we go,
+    # keying (root note, template index, inverted) tuples to (rec, prec, likelihood, consonance) dicts
+    for i, t in zip(*np.nonzero(is_match)):
+        n = unique_notes[i]
+        likelihood = table['likelihood'][t] # float from 0.3 to 1.0
+        consonance = table['consonance'][t] # float from ~0.4 to ~0.9, in principle
+        inverted = False
+        # if candidate doesn't share the 'root', we can invert it:
+        if n != first_note:
+            bass_pc = (first_note.position - n.position) % 12
+            if invert and (table['counts'][t, bass_pc] > 0):
+                inverted = True
+                consonance = inverted_template_consonance(t, bass_pc)
+                # or otherwise just assume the note_list's root and make the non-inversion slightly less likely:
+            elif assume_root:
+                likelihood -= 0.15 # increase rarity by one-and-a-half steps
+        # if require root, we only accept chords that share the bass note with the note_list:
+        if require_root and (n != first_note) and not inverted:
+            continue
+
+        cand_factors = table['factors'][t]
+        if (likelihood >= min_likelihood and consonance >= min_consonance) or (cand_factors in whitelist_factors):
+            if cand_factors not in blacklist_factors:
+                candidate_args[(n, t, inverted)] = {'recall': round(float(recalls[i,t]),    2),
+                                                 'precision': round(float(precisions[i,t]), 2),
+                                                'likelihood': round(likelihood,2),
+                                                'consonance': round(consonance,3)}
+
+    # only the best-scoring candidates are initialised as Chord objects:
+    sorted_args = sorted(candidate_args,
+                          key=lambda c: (candidate_args[c]['recall'],
+                                         candidate_args[c]['precision'],
+                                         candidate_args[c]['likelihood'],
+                                         candidate_args[c]['consonance']),
+                          reverse=True)[:max_results]
+    candidates = {}
+    for n, t, inverted in sorted_args:
+        candidate = Chord(factors=table['factors'][t], root=n, prefer_sharps=prefer_sharps)
+        if inverted:
+            candidate = candidate.invert(bass=first_note)
+        candidates[candidate] = candidate_args[(n, t, inverted)]
 
     # return sorted candidates dict:
-    sorted_cands = sorted(candidates,
-                          key=lambda c: (candidates[c]['recall'],
-                                         candidates[c]['precision'],
-                                         candidates[c]['likelihood'],
-                                         candidates[c]['consonance']),
-                          reverse=True)[:max_results]
+    sorted_cands = list(candidates.keys())
 
     if display:
         from .display import DataFrame
@@ -3,8 +3,9 @@ from .notes import Note, OctaveNote, NoteList
 from .chords import AbstractChord, Chord, ChordList, most_likely_chord, matching_chords
 from .scales import Scale
 from .keys import Key, matching_keys
-from .util import log, reverse_dict
+from .util import log, reverse_dict, popcount
 from .display import Fretboard
+from .caching import Cache
 from . import parsing, _settings
 
 ### TBI: special cases for other stringed instruments?
@@ -33,6 +34,13 @@ tuning_note_names = {   # names/aliases for common tunings:
 tuning_strings = {name: tuple([String(nt) for nt in notes]) for name, notes in tuning_note_names.items()}
 tuning_aliases = reverse_dict(tuning_strings)
 
+# numpy fret grids, keyed by (tuned string values, capo, max fret),
+cached_fret_grids = Cache('fret_grids')
+# chord voicings, keyed by (open string values, chord and search parameters):
+cached_voicings = Cache('guitar_voicings')
+# most likely chords of fret shapes, keyed by (open string values, frets, kwargs):
+cached_shape_chords = Cache('shape_chords')
+
 class Guitar:
     def __init__(self, tuning='standard', strings=6, capo=0, verbose=False):
         """tuning can be one of:
@@ -212,10 +220,39 @@ class Guitar:
         notelist = self[frets]
         return matching_chords(notelist, *args, **kwargs)
 
-    def most_likely_chord(self, frets, *args, **kwargs):
+    def most_likely_chord(self, frets, stats=False, **kwargs):
         """returns the most likely chord detected for this set of frets"""
-        notelist = self[frets]
-        return most_likely_chord(notelist, *args, **kwargs)
+        return self.analyse_shapes([frets], stats=stats, **kwargs)[0]
+
+    def analyse_shapes(self, shapes, stats=False, **kwargs):
+        """accepts an iterable of fret shapes (e.g. from a corpus of tabs), and returns
+        the list of the most likely chord for each, as in most_likely_chord.
+        each distinct shape is only parsed and analysed once, and the results are
+        memoized by tuning, capo and shape, so repeated shapes across calls are near-free."""
+        string_values = tuple([s.value for s in self.open_strings])
+        kwargs_key = tuple(sorted(kwargs.items()))
+        try:
+            hash(kwargs_key)
+        except TypeError:
+            # unhashable kwargs (like whitelist lists) are deduplicated within this call but not memoized:
+            kwargs_key = None
+
+        shape_results = {}
+        results = []
+        for shape in shapes:
+            shape_key = shape if isinstance(shape, str) else tuple(shape)
+            if shape_key not in shape_results:
+                frets = tuple(parsing.parse_out_integers(shape, expected_len=self.num_strings))
+                key = (string_values, frets, kwargs_key)
+                if kwargs_key is not None and key in cached_shape_chords:
+                    shape_results[shape_key] = cached_shape_chords[key]
+                else:
+                    shape_results[shape_key] = most_likely_chord(self.fret(frets), stats=True, **kwargs)
+                    if kwargs_key is not None:
+                        cached_shape_chords[key] = shape_results[shape_key]
+            chord, match_params = shape_results[shape_key]
+            results.append((chord, match_params) if stats else chord)
+        return results
 
     def query(self, frets, return_notes=False, return_chord=True):
         """parses the frets passed, displays the sounded notes, the auto-detected chord,
@@ -238,37 +275,87 @@ class Guitar:
             return sounded_chord
 
 
+    def fret_grid(self, max_fret=24):
+        """returns a pair of (num_strings x max_fret+1) numpy arrays, of the note value
+        and the pitch class (i.e. note position) sounded by each fret on each string, counted from the nut.
+        frets below the capo sound the capo'd open string instead.
+        grids are cached by tuning and capo, so changing either one gets a fresh grid."""
+        import numpy as np # lazy import
+        key = (tuple([s.value for s in self.tuned_strings]), self.capo, max_fret)
+        if key in cached_fret_grids:
+            return cached_fret_grids[key]
+        frets = np.maximum(np.arange(max_fret + 1), self.capo)
+        values = np.array([s.value for s in self.tuned_strings])[:,None] + frets
+        pitch_classes = (np.array([s.position for s in self.tuned_strings])[:,None] + frets) % 12
+        for grid in values, pitch_classes:
+            grid.setflags(write=False) # (since they are shared through the cache)
+        cached_fret_grids[key] = values, pitch_classes
+        return values, pitch_classes
+
+    def locate_notes(self, notes, match_octave=False, min_fret=0, max_fret=13):
+        """accepts an iterable of Note objects (or, if match_octave, OctaveNote objects)
+        and finds everywhere any of them appear on the fretboard between min_fret and max_fret
+        in a single array query, returning a dict that maps each (string,fret) location
+        (with strings counted from 1) to the note found there"""
+        import numpy as np # lazy import
+        values, pitch_classes = self.fret_grid(max_fret)
+        if match_octave:
+            grid, grid_notes = values, {n.value: n for n in notes}
+        else:
+            grid, grid_notes = pitch_classes, {n.position: n for n in notes}
+        found = np.isin(grid, list(grid_notes))
+        found[:, :max(min_fret, self.capo)] = False # (can't fret beneath the capo)
+        strings, frets = np.nonzero(found)
+        located = grid[strings, frets]
+        return {(s+1, f): grid_notes[n] for s, f, n in zip(strings.tolist(), frets.tolist(), located.tolist())}
+
     def locate_note(self, note, match_octave=False, min_fret=0, max_fret=13):
         """accepts a Note object, (or, if match_octave, an OctaveNote object)
         and returns a list of tuple (string,fret) locations where that note appears"""
-        # keep a list of locations:
-        note_locs = []
         assert isinstance(note, OctaveNote if match_octave else Note), "arg to locate_note must be a Note or OctaveNote object"
-        for s, string in enumerate(self.open_strings):
-            # if this open/capo'd string corresponds to that note:
-            if string.chroma == note.chroma:
-                # add (s,0) or (s,capo) to the list:
-                if not (match_octave and (string.value != note.value)):
-                    # (i.e. if match_octave is true, only add this note if its value is exactly what is desired)
-                    note_locs.append((s+1,self.capo))
-                # add (s,12) or (s,capo+12 to the list as well if it fits):
-                if max_fret >= 12:
-                    if not (match_octave and ((string.value + 12) != note.value)):
-                        note_locs.append((s+1, self.capo+12))
+        return list(self.locate_notes([note], match_octave=match_octave, min_fret=min_fret, max_fret=max_fret))
+
+    ### voicing search:
+    def voicings(self, chord, max_span=4, max_fret=12, min_strings=3, max_fingers=4, omit_fifth=True, num=None):
+        """enumerates the playable fingerings of a Chord (or string that casts to one)
+        on this guitar, as a list of fret tuples (with None for muted strings)
+        relative to the capo, from best to worst.
+
+        a fingering is playable if it sounds every note of the chord on at least min_strings
+        strings, without muting strings in between sounded ones, with its fretted notes
+        within max_span frets of each other, and needing at most max_fingers fingers
+        (where the lowest fretted notes can be barred with a single finger).
+        inverted chords must also have their bass note in the bass.
+        if omit_fifth, chords of four or more notes may leave out their perfect fifth,
+        as is common practice on guitar (e.g. C7 as x32310).
+
+        fingerings are ranked with the root in the bass first, and then by a difficulty
+        score that grows with stretch (fret span), number of fingers and position on the neck,
+        and shrinks with the number of sounded strings and of open strings near the nut."""
+        if isinstance(chord, str):
+            chord = Chord(chord)
+        string_values = tuple([s.value for s in self.open_strings])
+        key = (string_values, chord.pitch_class_mask, chord.root.position, chord.bass.position,
+               chord.inversion != 0, max_span, max_fret, min_strings, max_fingers, omit_fifth)
+        if key in cached_voicings:
+            found = cached_voicings[key]
+        else:
+            # the search counts frets from the capo, over plain nested lists of the fret grid:
+            values, pitch_classes = self.fret_grid(self.capo + max_fret)
+            values, pitch_classes = values[:, self.capo:].tolist(), pitch_classes[:, self.capo:].tolist()
+            chord_mask = chord.pitch_class_mask
+            # the notes that must be sounded:
+            fifth = (chord.root.position + 7) % 12
+            if omit_fifth and len(chord) > 3 and chord.bass.position != fifth:
+                required_mask = chord_mask & ~(1 << fifth)
             else:
-                next_chosen_note = string.next(note.chroma)
-                distance_up = next_chosen_note - string # distance along the fretboard in intervals
-                next_loc = int(distance_up + self.capo)
-                if next_loc >= min_fret:
-                    if not ((match_octave) and (string.value+next_loc) != note.value):
-                        # if the note on this string isn't in the right octave (and we have asked to match octave), ignore it
-                        note_locs.append((s+1, next_loc))
-                    # if the NEXT highest is within our max fret, append that too:
-                    if next_loc + 12 <= max_fret:
-                        if not ((match_octave) and (string.value+next_loc+12) != note.value):
-                            # if the note on this string isn't in the right octave, ignore it
-                            note_locs.append((s+1, next_loc+12))
-        return note_locs
+                required_mask = chord_mask
+            found = search_voicings(values, pitch_classes, chord_mask, required_mask,
+                                    root=chord.root.position, bass=chord.bass.position,
+                                    require_bass=(chord.inversion != 0), max_span=max_span,
+                                    min_strings=min_strings, max_fingers=max_fingers)
+            cached_voicings[key] = found
+        return found if num is None else found[:num]
 
 
     ### various methods for displaying various orpyus objects as frets:
@@ -304,10 +391,8 @@ class Guitar:
     def show_notes(self, notes, show_octave=True, max_fret=15, min_fret=0, title=None, **kwargs):
         if not isinstance(notes, NoteList):
             notes = NoteList(notes)
-        # make list of all the places where all these notes occur:
-        note_locs = []
-        for nt in notes:
-            note_locs.extend(self.locate_note(nt, min_fret=min_fret, max_fret=max_fret))
+        # find all the places where all these notes occur:
+        note_locs = self.locate_notes(notes, min_fret=min_fret, max_fret=max_fret)
         # populate dict of cells:
         cells = {}
         for loc in note_locs:
@@ -334,9 +419,8 @@ class Guitar:
         note_space = 2 if (sum([not n.is_natural() for n in chord.notes]) > 0) else 1
 
         #### determine cell values:
-        root_locs = self.locate_note(chord.root, min_fret=min_fret, max_fret=max_fret)
-        cells = {}
-        # loop across all the notes in chord, find all their locations:
+        # label each note in chord, then find all their locations at once:
+        note_labels = {}
         for iv, note in zip(chord.intervals, chord.notes):
             if intervals_only:
                 cell_val = f'{iv.factor_name:>{interval_space}}'
@@ -344,8 +428,10 @@ class Guitar:
                 cell_val = f'{note.name:<2}'
             else: # both
                 cell_val = f'{iv.factor_name:>{interval_space}}:{note.name:<2}'
-            note_cells = {loc: cell_val for loc in self.locate_note(note, min_fret=min_fret, max_fret=max_fret)}
-            cells.update(note_cells)
+            note_labels[note.position] = cell_val
+        note_locs = self.locate_notes(chord.notes, min_fret=min_fret, max_fret=max_fret)
+        cells = {loc: note_labels[note.position] for loc, note in note_locs.items()}
+        root_locs = [loc for loc, note in note_locs.items() if note.position == chord.root.position]
 
         #### determine index / string labels:
         if show_index:
@@ -396,22 +482,26 @@ class Guitar:
         if isinstance(key, str):
                 key = Key(key)
 
+        # find the locations of every note in the key at once:
+        note_locs = self.locate_notes(key.notes, max_fret=max_fret)
+
         #### determine highlighted frets
         # highlight tonics:
-        highlights = self.locate_note(key.tonic, max_fret=max_fret)
+        highlight_notes = [key.tonic]
         if not highlight_pentatonic:
             # and, optionally, fifths:
             if highlight_fifths:
                 if (5 in key.factors):
-                    highlights.extend(self.locate_note(key.factor_notes[5], max_fret=max_fret))
+                    highlight_notes.append(key.factor_notes[5])
         elif highlight_pentatonic and not key.is_pentatonic():
             # pick out the pentatonic notes to highlight
             this_pentatonic = key.pentatonic
-            for n in this_pentatonic.notes[1:]:
-                highlights.extend(self.locate_note(n, max_fret=max_fret))
+            highlight_notes.extend(this_pentatonic.notes[1:])
+        highlight_positions = {n.position for n in highlight_notes}
+        highlights = [loc for loc, note in note_locs.items() if note.position in highlight_positions]
 
         #### determine cell values:
-        cells = {}
+        note_labels = {}
         for iv, note in zip(key.intervals.pad(), key.notes):
             if intervals_only: # then as notes
                 cell_val = iv.factor_name
@@ -419,8 +509,8 @@ class Guitar:
                 cell_val = note.name
             else:
                 cell_val = f'{iv.factor_name:>3}:{note.name}'
-            note_cells = {loc: cell_val for loc in self.locate_note(note, max_fret=max_fret)}
-            cells.update(note_cells)
+            note_labels[note.position] = cell_val
+        cells = {loc: note_labels[note.position] for loc, note in note_locs.items()}
 
         #### determine index / string labels
         if show_index:
@@ -565,6 +655,81 @@ class Guitar:
     _brackets = _settings.BRACKETS['Guitar']
 
 
+def search_voicings(values, pitch_classes, chord_mask, required_mask, root, bass, require_bass=False,
+                    max_span=4, min_strings=3, max_fingers=4):
+    """depth-first search over the strings of a fretboard (as nested lists of the
+    note values and pitch classes on each string, counted from the capo; see Guitar.fret_grid)
+    for every fingering that sounds only the pitch classes in chord_mask,
+    and at least those in required_mask.
+    candidate frets on each string are pruned in advance by chord_mask,
+    and partial fingerings are abandoned as soon as their fretted notes exceed max_span,
+    or there are too few strings left to cover the rest of the chord.
+    returns the list of fret tuples, sorted as described in Guitar.voicings"""
+    num_strings = len(pitch_classes)
+    # frets on each string that sound a note in the chord:
+    candidates = [[f for f, pc in enumerate(string_pcs) if (chord_mask >> pc) & 1]
+                  for string_pcs in pitch_classes]
+    ranked = []
+    frets = [None] * num_strings
+
+    def search(s, covered, low, high, muted_after):
+        if s == num_strings:
+            if covered & required_mask == required_mask:
+                ranking = rank_voicing(frets, values, pitch_classes, root, bass, require_bass, min_strings, max_fingers)
+                if ranking is not None:
+                    ranked.append((ranking, tuple(frets)))
+            return
+        # prune if the strings left can't sound the notes still missing:
+        if popcount(required_mask & ~covered) > (num_strings - s):
+            return
+        # mute this string:
+        frets[s] = None
+        search(s+1, covered, low, high, muted_after or (low is not None))
+        if muted_after:
+            # (no sounded strings after a muted one, once we have started sounding strings)
+            return
+        for f in candidates[s]:
+            if f == 0:
+                new_low, new_high = (low if low is not None else 0), (high if high is not None else 0)
+            else:
+                new_low = f if (low is None or low == 0 or f < low) else low
+                new_high = f if (high is None or f > high) else high
+                if new_high - new_low >= max_span:
+                    continue
+            frets[s] = f
+            search(s+1, covered | (1 << pitch_classes[s][f]), new_low, new_high, False)
+        frets[s] = None
+
+    search(0, 0, None, None, False)
+    ranked.sort(key=lambda rv: rv[0])
+    return [voicing for ranking, voicing in ranked]
+
+def rank_voicing(frets, values, pitch_classes, root, bass, require_bass, min_strings, max_fingers):
+    """returns the sort key of a complete fingering (lower is better),
+    or None if it is not playable"""
+    sounded = [(s, f) for s, f in enumerate(frets) if f is not None]
+    if len(sounded) < min_strings:
+        return None
+    fretted = [f for s, f in sounded if f != 0]
+    if len(fretted) > 0:
+        lowest = min(fretted)
+        # one finger bars the lowest fret, and the others fret a note each:
+        fingers = 1 + len([f for f in fretted if f != lowest])
+        if fingers > max_fingers:
+            return None
+        stretch = max(fretted) - lowest
+    else:
+        lowest = stretch = fingers = 0
+    bass_string, bass_fret = min(sounded, key=lambda sf: values[sf[0]][sf[1]])
+    bass_pc = pitch_classes[bass_string][bass_fret]
+    if require_bass and bass_pc != bass:
+        return None
+    # open strings are only easy to ring out when the rest of the shape is near the nut:
+    num_open = len(sounded) - len(fretted) if lowest <= stretch + 2 else 0
+    difficulty = stretch + fingers - num_open - len(sounded) + (lowest / 2)
+    return (bass_pc != bass, difficulty, lowest, -len(sounded))
+
+
 # some predefined common tunings:
 standard = eadgbe = Guitar()
 dadgad = Guitar('DADGAD')
@@ -612,5 +777,7 @@ lick1 = '40 53 52 50'
 lick2 = '64 23 21 20 32'
 lick3 = '42 32 30 42 32 30'
 
-for lick in [lick1, lick2, lick3]:
-    play_alves(lick)
+if __name__ == '__main__':
+    # (demo only: playing audio at import would pull in sounddevice for every user of this module)
+    for lick in [lick1, lick2, lick3]:
+        play_alves(lick)
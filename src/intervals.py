@@ -1,13 +1,14 @@
 from .qualities import Quality #, Major, Minor, Perfect, Augmented, Diminished
 from .parsing import degree_names, span_names, multiple_names, num_suffixes, offset_accidentals
-from .util import ModDict, rotate_list, least_common_multiple, euclidean_gcd, numeral_subscript, log
+from .util import ModDict, rotate_list, least_common_multiple, euclidean_gcd, numeral_subscript, log, unpickle_list, pitch_class_mask, value_mask
 from .conversion import value_to_pitch
 from . import _settings, tuning
+from .caching import Cache
 import math
 from functools import cached_property
 
 # interval instances are cached for fast init, since they get called a lot:
-cached_intervals = {}
+cached_intervals = Cache('intervals')
 
 class Interval:
     """a signed distance between notes, defined in semitones and degrees (whole-tones).
@@ -698,31 +699,72 @@ class IntervalList(list):
         self.values_cached = True # used to determine if cache needs to be cleared by mutation
         return set([s.value for s in self])
 
+    @cached_property
+    def pitch_class_mask(self):
+        """12-bit integer with bit N set if this list contains an interval of N semitones
+        (mod 12). used for efficient subset/overlap/transposition checks, see util.pitch_class_mask"""
+        self.values_cached = True
+        return pitch_class_mask([s.value for s in self])
+
+    @cached_property
+    def value_mask(self):
+        """as pitch_class_mask, but with a separate bit for each interval value, i.e.
+        including the octave, so that a major 9th is distinguished from a major 2nd"""
+        self.values_cached = True
+        return value_mask([s.value for s in self])
+
+    def _clear_cached_values(self):
+        """clear value_set and the bitmasks so they can be recomputed after mutation"""
+        for attr in ('value_set', 'pitch_class_mask', 'value_mask'):
+            self.__dict__.pop(attr, None)
+        self.values_cached = False
+
     @property
     def octave_span(self):
         """an IntervalList's octave span is the octave span between its min and max members"""
         span = max(self) - min(self)
         return span.octave_span
 
+    def __reduce__(self):
+        # restore values_cached flag before the intervals themselves, since append needs it:
+        return (unpickle_list, (self.__class__, list(self), self.__dict__))
+
     def append(self, item):
         """as list.append, but updates our set object as well"""
         super().append(item)
         if self.values_cached:
-            del self.value_set # clear value_set cache so it can be recomputed again later
-            self.values_cached = False
+            self._clear_cached_values()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        if self.values_cached:
+            self._clear_cached_values()
+
+    def __setitem__(self, index, item):
+        super().__setitem__(index, item)
+        if self.values_cached:
+            self._clear_cached_values()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        if self.values_cached:
+            self._clear_cached_values()
+
+    def extend(self, items):
+        super().extend(items)
+        if self.values_cached:
+            self._clear_cached_values()
 
     def remove(self, item):
         super().remove(item)
         if self.values_cached:
-            del self.value_set # clear value_set cache so it can be recomputed again later
-            self.values_cached = False
+            self._clear_cached_values()
 
     def pop(self, item):
         popped_item = self[-1]
         del self[-1]
         if self.values_cached:
-            del self.value_set # clear value_set cache so it can be recomputed again later
-            self.values_cached = False
+            self._clear_cached_values()
 
     def unique(self):
         """returns a new IntervalList, where repeated notes are dropped after the first"""
@@ -1104,7 +1146,7 @@ allowable_degree_intervals = ModDict({
                 7: [9,10,11],
                 }, index=1, raise_values=True, raise_by=12)
 
-cached_consonances = {}
+cached_consonances = Cache('interval_consonances')
 
 # interval aliases:
 Unison = PerfectFirst = Perfect1st = Perfect1 = Per1 = Per1st = P1 = Rt = Interval(0)
@@ -1165,11 +1207,11 @@ AugmentedThirteenth = AugThirteenth = Augmented13th = Aug13th = Aug13 = A13 = In
 
 common_intervals = [P1, m2, M2, m3, M3, P4, d5, P5, m6, M6, m7, M7, P8, m9, M9, m10, M10, P11, P12, m13, M13]
 # cache common intervals by semitone value and scale degree for efficiency:
-cached_intervals = {(iv.value, iv.extended_degree):iv for iv in common_intervals}
+cached_intervals.update({(iv.value, iv.extended_degree):iv for iv in common_intervals})
 # None is also a valid degree index for the default/common intervals:
 cached_intervals.update({(iv.value, None):iv for iv in common_intervals})
 # also cache interval init by degree, plus one of quality or offset
-cached_intervals_by_degree = {(iv.extended_degree, None, iv.offset_from_default):iv for iv in common_intervals}
+cached_intervals_by_degree = Cache('intervals_by_degree', {(iv.extended_degree, None, iv.offset_from_default):iv for iv in common_intervals})
 cached_intervals_by_degree.update({(iv.extended_degree, iv.quality, None):iv for iv in common_intervals})
 
 # consonances are cached by tuning system as well as interval width:
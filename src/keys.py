@@ -4,7 +4,8 @@ from .intervals import Interval, IntervalList
 from .notes import Note, NoteList, chromatic_notes
 from .scales import Scale, ScaleFactors, ScaleDegree, ScaleChord, common_scales, scale_extensions, scale_contractions
 from .chords import Chord, AbstractChord, ChordList
-from .util import ModDict, check_all, precision_recall, reverse_dict, unpack_and_reverse_dict, log
+from .util import ModDict, check_all, precision_recall, reverse_dict, unpack_and_reverse_dict, log, is_submask
+from .caching import Cache
 
 from collections import Counter
 from functools import cached_property
@@ -270,7 +271,7 @@ class Key(Scale):
     @cached_property
     def scale(self):
         """returns the abstract Scale associated with this key"""
-        return Scale(factors=self.factors)
+        return Scale.from_cache(factors=self.factors)
 
     @property
     def members(self):
@@ -364,7 +365,7 @@ class Key(Scale):
         # check if a pentatonic scale is defined under this scale's canonical name:
         naive_pentatonic_name = f'{self.scale_name} pentatonic'
         if naive_pentatonic_name in scales.all_scale_name_factors:
-            return Scale(naive_pentatonic_name).on_tonic(self.tonic)
+            return Scale.from_cache(naive_pentatonic_name).on_tonic(self.tonic)
         else:
             # this will already be a Key due to inheritance of compute_pentatonics:
             return self.compute_best_pentatonic(preserve_character=True)
@@ -419,7 +420,7 @@ class Key(Scale):
             if not self_is_base:
                 mode_idx_of_base = (self.order+2) - mode_idx_of_base
             relative_tonic = self.degree_notes[mode_idx_of_base]
-            return Scale(parallel_scale_name).on_tonic(relative_tonic)
+            return Scale.from_cache(parallel_scale_name).on_tonic(relative_tonic)
 
         else:
             raise Exception(f'{self.name} has no defined relative key')
@@ -427,7 +428,7 @@ class Key(Scale):
     @property
     def parallel(self):
         if self.has_parallel():
-            return Scale(scales.parallel_scale_names[self.scale_name]).on_tonic(self.tonic)
+            return Scale.from_cache(scales.parallel_scale_names[self.scale_name]).on_tonic(self.tonic)
         else:
             raise Exception(f'Parallel major/minor not defined for {self.name}')
 
@@ -507,6 +508,12 @@ class Key(Scale):
         else:
             return self.fractional_note_degrees[nt]
 
+    @property
+    def pitch_class_mask(self):
+        """bitmask of the notes in this key by absolute pitch class (C=0),
+        unlike Scale.pitch_class_mask which is relative to the tonic"""
+        return self.notes.pitch_class_mask
+
     def __contains__(self, item):
         """if item is an Interval, does it fit in our list of degree-intervals plus chromatic-intervals?
         if it is a Chord, can it be made using the notes in this key?"""
@@ -522,10 +529,7 @@ class Key(Scale):
             return item in self.notes
         elif type(item) in (Chord, KeyChord):
             # chord is 'in' this Key if all of its notes are:
-            for note in item.notes:
-                if note not in self.notes:
-                    return False
-            return True
+            return is_submask(item.pitch_class_mask, self.pitch_class_mask)
 
         elif isinstance(item, AbstractChord):
             if not isinstance(item, ScaleChord):
@@ -606,7 +610,53 @@ class Key(Scale):
 
     def __hash__(self):
         """Keys hash by their Factors and their tonic"""
-        return hash((self.factors, self.tonic))
+        if self._hash is None:
+            self._hash = hash((self.factors, self.tonic))
+        return self._hash
+
+    @staticmethod
+    def from_cache(name=None, factors=None, tonic=None):
+        # efficient key init by cache lookup of a key name, or of a tonic plus a scale name or ScaleFactors.
+        # as with Scale.from_cache, keys are interned by their factors and the spelling of their notes,
+        # so identical keys share one Key object (which should never be modified in-place)
+        # but enharmonic keys like B and Cb (or keys that respell their tonic) do not
+        if isinstance(name, Key):
+            return name
+        elif isinstance(name, Scale):
+            name, factors = None, name.factors
+        elif isinstance(name, (list, tuple, NoteList, IntervalList)):
+            # keys of note or interval lists are not cached:
+            return Key(name, factors=factors, tonic=tonic)
+
+        if tonic is None and name is not None:
+            cache_key = (name, None, None)
+        elif tonic is not None and (name is not None or factors is not None):
+            if name is not None:
+                # the name of a scale on this tonic:
+                name, factors = None, Scale.from_cache(name).factors
+            elif not isinstance(factors, ScaleFactors):
+                factors = ScaleFactors(factors)
+            # a Note tonic's chroma does not tell us its spelling (Note('Cb').chroma is 'B'), so include its sharp preference:
+            tonic_spelling = (tonic.chroma, tonic.prefer_sharps) if isinstance(tonic, Note) else tonic
+            cache_key = (None, scales.ScaleCatalogue._factors_key(factors.items(), factors.chromatic), tonic_spelling)
+        else:
+            raise TypeError(f'Key init from cache must include one of: "name", or "tonic" plus "name" or "factors"')
+
+        if cache_key in cached_keys:
+            return cached_keys[cache_key]
+        else:
+            key_obj = Key(name=name, factors=factors, tonic=tonic)
+            if _settings.DYNAMIC_CACHING:
+                spelling_key = ('spelling', scales.ScaleCatalogue._factors_key(key_obj.factors.items(), key_obj.factors.chromatic),
+                                tuple([n.chroma for n in key_obj.notes]), tuple([n.chroma for n in key_obj.chromatic_notes]), key_obj.prefer_sharps)
+                if spelling_key in cached_keys:
+                    # the same key, spelled the same way, already exists under another name:
+                    key_obj = cached_keys[spelling_key]
+                else:
+                    log(f'Registering key by key {spelling_key} to cache')
+                    cached_keys[spelling_key] = key_obj
+                cached_keys[cache_key] = key_obj
+            return key_obj
 
     def show(self, tuning='EADGBE', **kwargs):
         """just a wrapper around the Guitar.show method, which is generic to most musical classes,
@@ -626,6 +676,13 @@ class Key(Scale):
         # played_notes.play(*args, **kwargs)
         Scale.play(self, *args, on=f'{self.tonic.name}3', **kwargs)
 
+    def render(self, *args, **kwargs):
+        # as Key.play, starting on the tonic:
+        return Scale.render(self, *args, on=f'{self.tonic.name}3', **kwargs)
+
+    def to_midi(self, *args, **kwargs):
+        return Scale.to_midi(self, *args, on=f'{self.tonic.name}3', **kwargs)
+
     def progression(self, *degrees, order=3):
         """accepts a sequence of (integer) degrees,
             and produces a ChordProgression in this key rooted on those degrees.
@@ -818,6 +875,125 @@ def matching_diatonic_keys(chords=None, notes=None,
     ... # TBC
 
 
+#### vectorised key matching:
+# matching_keys scores every candidate scale on every possible tonic by the same
+# weighted precision/recall as util.precision_recall, but all at once with numpy:
+# each candidate scale's note weights are computed once (relative to its tonic),
+# then rotated through all 12 tonics into a (scales x 12 tonics x 12 pitch classes)
+# tensor that an input note-weight vector can be scored against in one go.
+
+cached_keys = Cache('keys')
+cached_key_weight_tables = Cache('key_weight_tables')
+
+def key_weight_table(candidate_scales, scale_factor_weights, scale_chord_weights):
+    """returns a dict of numpy arrays describing the weights that matching_keys
+    places on each pitch class of each candidate scale, relative to its tonic:
+        'entry':  (scales, 12) bool, True where the scale places any weight on that pitch class
+        'key':    (scales, 12) bool, True where that pitch class is a (non-chromatic) scale note
+        'weight': (scales, 12) float, the unscaled weight placed on that pitch class
+        'order':  (scales, max_len) int, the scale's notes (then chromatic notes) in order, padded with -1
+        'length': (scales,) int, how many notes each scale has including chromatic notes
+    and 'rotation', a (12 tonics, 12 pitch classes) index array mapping absolute to relative pitch classes.
+    tables are cached, since the same candidate scales are searched over and over."""
+    cache_key = (tuple(s.name for s in candidate_scales),
+                 tuple(scale_factor_weights.items()), tuple(scale_chord_weights.items()))
+    if cache_key in cached_key_weight_tables:
+        return cached_key_weight_tables[cache_key]
+
+    import numpy as np
+    num_scales = len(candidate_scales)
+    entry = np.zeros((num_scales, 12), dtype=bool)
+    key = np.zeros((num_scales, 12), dtype=bool)
+    weight = np.zeros((num_scales, 12), dtype=float)
+    scale_orders = []
+    for s, scale in enumerate(candidate_scales):
+        scale_intervals, chrom_intervals = scales.canonical_scale_name_intervals[scale.name]
+        key_pcs = [iv.value % 12 for iv in scale_intervals]
+        chrom_pcs = [iv.value % 12 for iv in chrom_intervals] if chrom_intervals is not None else []
+        factors = [scale.degree_factors[d+1] for d in range(len(key_pcs))]
+        # weight each scale note by its factor, then overwrite by the notes of the scale's chords,
+        # exactly as the note-by-note weighting used to do:
+        pc_weights = {pc: scale_factor_weights[factors[i]] if factors[i] in scale_factor_weights  else 1  for i,pc in enumerate(key_pcs)}
+        for root_degree, degree_weight in scale_chord_weights.items():
+            root_chord = scale.chord(root_degree, order=3)
+            pc_weights.update({iv.value % 12: degree_weight for iv in root_chord.intervals})
+        for pc, w in pc_weights.items():
+            entry[s, pc] = True
+            weight[s, pc] = w
+        key[s, key_pcs] = True
+        scale_orders.append(key_pcs + chrom_pcs)
+
+    length = np.array([len(o) for o in scale_orders], dtype=int)
+    order = np.full((num_scales, max(length, default=0)), -1, dtype=int)
+    for s, scale_order in enumerate(scale_orders):
+        order[s, :len(scale_order)] = scale_order
+
+    # rotation[t, a] is the pitch class of absolute pitch class a, relative to tonic t:
+    rotation = (np.arange(12)[None,:] - np.arange(12)[:,None]) % 12
+
+    table = {'entry': entry, 'key': key, 'weight': weight,
+             'order': order, 'length': length, 'rotation': rotation}
+    if _settings.DYNAMIC_CACHING:
+        cached_key_weight_tables[cache_key] = table
+    return table
+
+def score_key_candidates(table, input_note_weights, scale_scale=1):
+    """given a key_weight_table and a dict (or Counter) mapping input Notes to weights,
+    returns weighted and unweighted precision/recall scores of every candidate
+    scale on every tonic, as a dict of (scales, 12 tonics) numpy arrays.
+    scores are identical (to the bit) with those of util.precision_recall, because
+    weights are summed in the same order: input notes in their given order,
+    and candidate notes in scale order followed by chromatic notes."""
+    import numpy as np
+    input_positions = [n.position for n in input_note_weights.keys()]
+    input_weights = np.zeros(12)
+    is_input = np.zeros(12, dtype=bool)
+    for pos, w in zip(input_positions, input_note_weights.values()):
+        input_weights[pos] = w
+        is_input[pos] = True
+
+    # candidate scales' own weights, scaled relative to the input weights and rounded as
+    # python rounds them (chromatic notes that only occur in scale chords carry zero weight):
+    scale_weights = np.zeros(table['weight'].shape)
+    for w in np.unique(table['weight'][table['key']]):
+        scale_weights[table['key'] & (table['weight'] == w)] = round(1*scale_scale * float(w), 2)
+
+    # rotate into (scales, tonics, absolute pitch classes):
+    rotation = table['rotation']
+    entry = table['entry'][:, rotation]
+    is_candidate = np.zeros(table['key'].shape, dtype=bool)
+    for s, l in enumerate(table['length']):
+        is_candidate[s, table['order'][s, :l]] = True
+    is_candidate = is_candidate[:, rotation]
+    # the weight of each pitch class is the scale weight plus the input weight where the
+    # scale places any weight on it, or otherwise the input weight (or 1, if not input):
+    weights = np.where(entry, scale_weights[:, rotation] + input_weights,
+                              np.where(is_input, input_weights, 1.))
+
+    num_scales = len(table['length'])
+    relevant_weight_retrieved = np.zeros((num_scales, 12))
+    total_weight_relevant = np.zeros((num_scales, 12))
+    relevant_num_retrieved = np.zeros((num_scales, 12), dtype=int)
+    for pos in input_positions:
+        retrieved = is_candidate[:,:,pos]
+        relevant_weight_retrieved += np.where(retrieved, weights[:,:,pos], 0.)
+        total_weight_relevant += weights[:,:,pos]
+        relevant_num_retrieved += retrieved
+
+    total_weight_retrieved = np.zeros((num_scales, 12))
+    tonics = np.arange(12)
+    for j in range(table['order'].shape[1]):
+        rel_pcs = table['order'][:, j]
+        abs_pcs = (rel_pcs[:,None] + tonics[None,:]) % 12
+        col_weights = np.take_along_axis(weights, abs_pcs[:,:,None], axis=2)[:,:,0]
+        total_weight_retrieved += np.where((rel_pcs >= 0)[:,None], col_weights, 0.)
+
+    return {'precision': relevant_weight_retrieved / total_weight_retrieved,
+            'recall': relevant_weight_retrieved / total_weight_relevant,
+            'unweighted precision': relevant_num_retrieved / table['length'][:,None],
+            'unweighted recall': relevant_num_retrieved / len(input_positions)}
+
+
 def matching_keys(chords=None, notes=None, tonic=None, tonic_guess=None, assume_tonic=False,
                   exact=False, exhaustive=None, modes=False, scale_lengths=None,
                   min_precision=0, min_recall=0.9,
@@ -970,48 +1146,23 @@ def matching_keys(chords=None, notes=None, tonic=None, tonic_guess=None, assume_
     log(f'Searching key tonics: {possible_tonics}')
 
     ###############################
-    ###### main search loop: ######
+    ###### main search: ######
+    # score every candidate scale on every tonic at once, then keep the possible tonics:
+    scale_scale = len(chords)**0.5 if chords is not None else 1 # i.e. how much to weight the scale weights relative to the chord weights
+    weight_table = key_weight_table(candidate_scales, scale_factor_weights, scale_chord_weights)
+    all_scores = score_key_candidates(weight_table, input_note_weights, scale_scale)
+    tonic_positions = [t.position for t in possible_tonics]
+    is_match = (all_scores['precision'] >= min_precision) & (all_scores['recall'] >= min_recall)
+
     shortlist_scores = {}
-    for scale in candidate_scales:
+    for i, scale in enumerate(candidate_scales):
         scale_name = scale.name
-        scale_intervals, chrom_intervals = scales.canonical_scale_name_intervals[scale_name]
-        for key_tonic in possible_tonics:
-            candidate_key_notes = [key_tonic + iv for iv in scale_intervals] # equiv. to degree_notes (from 0, not 1)
-
-            ### determine weights for the notes in this key:
-            scale_scale = len(chords)**0.5 if chords is not None else 1 # i.e. how much to weight the scale weights relative to the chord weights
-            key_weights = Counter({n: 1*scale_scale for n in candidate_key_notes})
-            # scale_degree_weights = [scale.degree_factors[d+1] for d,n in enumerate(candidate_key_notes)
-            factors = [scale.degree_factors[d+1] for d in range(len(candidate_key_notes))]
-
-            # update note weightings by scale factors:
-            scale_note_weights = {n:scale_factor_weights[factors[i]] if factors[i] in scale_factor_weights  else 1  for i,n in enumerate(candidate_key_notes)}
-            # and by scale chord notes:
-            for root_degree, degree_weight in scale_chord_weights.items():
-                root_chord = scale.chord(root_degree, order=3)
-                chord_notes = [key_tonic + iv for iv in root_chord.intervals]
-                chord_note_weights = {n: degree_weight for n in chord_notes}
-                scale_note_weights.update(chord_note_weights)
-
-            for n,w in scale_note_weights.items():
-                key_weights[n] = round(key_weights[n] * w, 2)
-            # now add input weights on top:
-            # print(f' Key weights for candidate: {key_tonic.name} {scale_name}')
-            # print(key_weights)
-
-            key_weights.update(input_note_weights)
-            # print(f'  Updated by input note weights to:')
-            # print('  ' + str(key_weights))
-
-            candidate_chrom_notes = [key_tonic + iv for iv in chrom_intervals] if chrom_intervals is not None else []
-            candidate_notes = candidate_key_notes + candidate_chrom_notes
-            ### main matching call:
-            scores = precision_recall(input_notes, candidate_notes, weights=key_weights, return_unweighted_scores=True)
-
+        for key_tonic, t in zip(possible_tonics, tonic_positions):
             # add a candidate to shortlist if it beats the minimum prec/rec requirements:
-            if scores['precision'] >= min_precision and scores['recall'] >= min_recall:
+            if is_match[i,t]:
+                scores = {score_name: float(score_array[i,t]) for score_name, score_array in all_scores.items()}
                 log(f'Found shortlist match ({key_tonic.chroma} {scale_name}) with precision {scores["precision"]:.2f} and recall {scores["recall"]:.2f}')
-                candidate = Scale(scale_name).on_tonic(key_tonic)
+                candidate = Scale.from_cache(scale_name).on_tonic(key_tonic)
                 # add to shortlist dict:
                 shortlist_scores[candidate] = scores
 
@@ -0,0 +1,283 @@
+### Standard MIDI File export and import, with no dependencies beyond the library itself.
+
+### musical objects are exported as lists of NoteEvents (timed OctaveNotes), which are
+### encoded as one MIDI track each (after a 'conductor' track holding the tempo and
+### time signature). MIDI files are read back into the same NoteEvents, in seconds,
+### from which chords can be detected again by grouping notes that start together.
+
+from .notes import OctaveNote, NoteList
+from .util import log
+
+# MIDI note numbers are offset from our OctaveNote values, which count piano keys from A0=1:
+midi_note_offset = 20
+default_ticks_per_beat = 480
+
+class NoteEvent:
+    """a single timed note: an OctaveNote starting at some time and lasting for some duration
+    (both in seconds), at a given MIDI velocity (0-127) and on a given MIDI channel (0-15)"""
+    def __init__(self, start, duration, note, velocity=100, channel=0):
+        self.start = start
+        self.duration = duration
+        self.note = note if isinstance(note, OctaveNote) else OctaveNote(note)
+        self.velocity = velocity
+        self.channel = channel
+
+    @property
+    def midi_note(self):
+        return self.note.value + midi_note_offset
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    def __eq__(self, other):
+        return ((self.start, self.duration, self.note.value, self.velocity, self.channel)
+             == (other.start, other.duration, other.note.value, other.velocity, other.channel))
+
+    def __repr__(self):
+        return f'NoteEvent({self.note} at {self.start:.3f}s for {self.duration:.3f}s, vel={self.velocity})'
+
+def note_events(notes, start=0, delay=0.2, duration=3, velocity=100, channel=0):
+    """returns a NoteEvent for each OctaveNote in an iterable, starting at 'start' seconds
+    and each 'delay' seconds after the last (or all at once, if delay is None)"""
+    delay = delay if delay is not None else 0
+    return [NoteEvent(start + (i * delay), duration, n, velocity, channel) for i, n in enumerate(notes)]
+
+
+#### encoding:
+
+def encode_midi(tracks, tempo=120, time_signature=(4,4), ticks_per_beat=default_ticks_per_beat):
+    """encodes a list of tracks, each a list of NoteEvents, as the bytes of a
+    format 1 Standard MIDI File at the given tempo (in bpm) and time signature"""
+    # conductor track with tempo and time signature meta-events:
+    upper, lower = time_signature
+    conductor = (b'\x00\xff\x51\x03' + int(round(60_000_000 / tempo)).to_bytes(3, 'big')
+               + b'\x00\xff\x58\x04' + bytes([upper, lower.bit_length() - 1, 24, 8])
+               + b'\x00\xff\x2f\x00')
+    chunks = [track_chunk(conductor)]
+    for track in tracks:
+        chunks.append(track_chunk(encode_track(track, tempo, ticks_per_beat)))
+    header = b'MThd' + (6).to_bytes(4, 'big') + (1).to_bytes(2, 'big') + len(chunks).to_bytes(2, 'big') + ticks_per_beat.to_bytes(2, 'big')
+    return header + b''.join(chunks)
+
+def encode_track(events, tempo, ticks_per_beat):
+    """encodes a list of NoteEvents as the body of a MIDI track chunk"""
+    ticks_per_second = ticks_per_beat * tempo / 60
+    messages = []
+    for e in events:
+        start_tick = int(round(e.start * ticks_per_second))
+        end_tick = max(int(round(e.end * ticks_per_second)), start_tick)
+        # note-offs sort before note-ons at the same tick, so repeated notes don't cut each other off:
+        messages.append((start_tick, 1, bytes([0x90 | e.channel, e.midi_note, e.velocity])))
+        messages.append((end_tick, 0, bytes([0x80 | e.channel, e.midi_note, 0])))
+    messages.sort(key=lambda m: (m[0], m[1]))
+    body = []
+    prev_tick = 0
+    for tick, order, message in messages:
+        body.append(encode_varlen(tick - prev_tick) + message)
+        prev_tick = tick
+    body.append(b'\x00\xff\x2f\x00') # end of track
+    return b''.join(body)
+
+def track_chunk(body):
+    return b'MTrk' + len(body).to_bytes(4, 'big') + body
+
+def encode_varlen(value):
+    """encodes a non-negative integer as a MIDI variable-length quantity:
+    7 bits per byte, most significant first, with the top bit set on all but the last"""
+    groups = [value & 0x7f]
+    value >>= 7
+    while value > 0:
+        groups.append((value & 0x7f) | 0x80)
+        value >>= 7
+    return bytes(reversed(groups))
+
+def write_midi(tracks, path, **kwargs):
+    """writes a list of tracks (each a list of NoteEvents) to a MIDI file at path,
+    with kwargs as encode_midi"""
+    with open(path, 'wb') as file:
+        file.write(encode_midi(tracks, **kwargs))
+    log(f'Wrote {len(tracks)} MIDI tracks to {path}')
+
+def export_midi(tracks, path=None, **kwargs):
+    """writes tracks to a MIDI file if a path is given, or returns their encoded bytes if not"""
+    if path is not None:
+        write_midi(tracks, path, **kwargs)
+    else:
+        return encode_midi(tracks, **kwargs)
+
+
+#### decoding:
+
+class MidiFile:
+    """the contents of a decoded MIDI file: a list of NoteEvents sorted by start time
+    (across all tracks), along with the file's initial tempo and time signature"""
+    def __init__(self, notes, tempo=120, time_signature=(4,4), ticks_per_beat=default_ticks_per_beat):
+        self.notes = notes
+        self.tempo = tempo
+        self.time_signature = time_signature
+        self.ticks_per_beat = ticks_per_beat
+
+    def chords(self, window=0.05, **kwargs):
+        """returns a ChordProgression of the chords detected in this file (see detect_chords)"""
+        return detect_chords(self.notes, window=window, **kwargs)
+
+    def __repr__(self):
+        upper, lower = self.time_signature
+        return f'MidiFile({len(self.notes)} notes at {self.tempo:.1f}bpm in {upper}/{lower})'
+
+def decode_midi(data):
+    """decodes the bytes of a Standard MIDI File (of format 0 or 1) into a MidiFile"""
+    if data[:4] != b'MThd':
+        raise ValueError('Not a Standard MIDI File (missing MThd header)')
+    header_len = int.from_bytes(data[4:8], 'big')
+    num_tracks = int.from_bytes(data[10:12], 'big')
+    ticks_per_beat = int.from_bytes(data[12:14], 'big')
+    if ticks_per_beat & 0x8000:
+        raise ValueError('MIDI files with SMPTE time division are not supported')
+
+    pos = 8 + header_len
+    tempo_changes = [] # list of (tick, microseconds per beat)
+    time_signature = None
+    raw_notes = [] # list of (start tick, end tick, midi note, velocity, channel)
+    for t in range(num_tracks):
+        if data[pos:pos+4] != b'MTrk':
+            raise ValueError(f'Expected MIDI track chunk at byte {pos}')
+        track_len = int.from_bytes(data[pos+4:pos+8], 'big')
+        track_tempos, track_time_sig, track_notes = decode_track(data[pos+8 : pos+8+track_len])
+        tempo_changes.extend(track_tempos)
+        raw_notes.extend(track_notes)
+        if time_signature is None:
+            time_signature = track_time_sig
+        pos += 8 + track_len
+
+    tempo_changes.sort()
+    to_seconds = tick_converter(tempo_changes, ticks_per_beat)
+    notes = [NoteEvent(to_seconds(start), to_seconds(end) - to_seconds(start), midi_note - midi_note_offset, velocity, channel)
+             for start, end, midi_note, velocity, channel in raw_notes]
+    notes.sort(key=lambda e: (e.start, e.note.value))
+    # (tempos are stored to the microsecond per beat, so we round off the error that introduces)
+    initial_tempo = round(60_000_000 / tempo_changes[0][1], 3) if len(tempo_changes) > 0 and tempo_changes[0][0] == 0 else 120
+    return MidiFile(notes, tempo=initial_tempo, time_signature=time_signature or (4,4), ticks_per_beat=ticks_per_beat)
+
+def decode_track(body):
+    """decodes the body of a MIDI track chunk, returning a tuple of:
+    its tempo changes as (tick, microseconds per beat) pairs, its first time signature
+    as an (upper, lower) pair (or None), and its notes as (start tick, end tick,
+    midi note, velocity, channel) tuples. everything else is skipped over."""
+    tempos, time_signature, notes = [], None, []
+    sounding = {} # maps (channel, midi note) to a list of (start tick, velocity) of notes not yet ended
+    pos, tick, status = 0, 0, None
+    while pos < len(body):
+        delta, pos = decode_varlen(body, pos)
+        tick += delta
+        if body[pos] & 0x80:
+            status = body[pos]
+            pos += 1
+        # otherwise this event has the same status as the last one ('running status')
+        if status == 0xff: # meta event
+            meta_type = body[pos]
+            length, pos = decode_varlen(body, pos+1)
+            meta_data = body[pos : pos+length]
+            if meta_type == 0x51:
+                tempos.append((tick, int.from_bytes(meta_data, 'big')))
+            elif meta_type == 0x58 and time_signature is None:
+                time_signature = (meta_data[0], 2**meta_data[1])
+            elif meta_type == 0x2f:
+                break # end of track
+            pos += length
+            status = None # meta and sysex events cancel running status
+        elif status in (0xf0, 0xf7): # sysex event
+            length, pos = decode_varlen(body, pos)
+            pos += length
+            status = None
+        elif status is None:
+            raise ValueError(f'MIDI data byte without a status at byte {pos} of track')
+        else:
+            kind, channel = status & 0xf0, status & 0x0f
+            if kind in (0xc0, 0xd0): # program change and channel pressure have one data byte
+                pos += 1
+            else:
+                data1, data2 = body[pos], body[pos+1]
+                pos += 2
+                if kind == 0x90 and data2 > 0:
+                    sounding.setdefault((channel, data1), []).append((tick, data2))
+                elif kind == 0x80 or kind == 0x90: # note-off, or note-on with zero velocity
+                    if len(sounding.get((channel, data1), [])) > 0:
+                        start, velocity = sounding[(channel, data1)].pop(0)
+                        notes.append((start, tick, data1, velocity, channel))
+    # end any notes left sounding at the end of the track:
+    for (channel, midi_note), starts in sounding.items():
+        for start, velocity in starts:
+            notes.append((start, tick, midi_note, velocity, channel))
+    return tempos, time_signature, notes
+
+def decode_varlen(data, pos):
+    """decodes a MIDI variable-length quantity starting at data[pos],
+    returning a tuple of its value and the position after it"""
+    value = 0
+    while True:
+        byte = data[pos]
+        value = (value << 7) | (byte & 0x7f)
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+
+def tick_converter(tempo_changes, ticks_per_beat):
+    """returns a function that converts MIDI ticks to seconds, given a sorted list of
+    (tick, microseconds per beat) tempo changes (and 120bpm before the first of them)"""
+    # time in seconds at which each tempo change happens:
+    segments = [(0, 0., 500_000)] # (tick, seconds, microseconds per beat)
+    for tick, us_per_beat in tempo_changes:
+        prev_tick, prev_secs, prev_tempo = segments[-1]
+        secs = prev_secs + ((tick - prev_tick) * prev_tempo / ticks_per_beat / 1e6)
+        if tick == prev_tick:
+            segments[-1] = (tick, secs, us_per_beat)
+        else:
+            segments.append((tick, secs, us_per_beat))
+    def to_seconds(tick):
+        # find the last tempo change at or before this tick:
+        for seg_tick, seg_secs, seg_tempo in reversed(segments):
+            if seg_tick <= tick:
+                return seg_secs + ((tick - seg_tick) * seg_tempo / ticks_per_beat / 1e6)
+    return to_seconds
+
+def read_midi(path):
+    """reads a MIDI file from path into a MidiFile"""
+    with open(path, 'rb') as file:
+        return decode_midi(file.read())
+
+
+#### chord detection:
+
+def group_notes(events, window=0.05):
+    """groups NoteEvents into lists of those that start within 'window' seconds
+    of the first note in each group, returning a list of (start time, NoteList) tuples
+    where each NoteList contains the group's notes from lowest to highest"""
+    groups = []
+    for e in sorted(events, key=lambda e: e.start):
+        if len(groups) == 0 or e.start - groups[-1][0] > window:
+            groups.append((e.start, []))
+        groups[-1][1].append(e.note)
+    return [(start, NoteList(sorted(group, key=lambda n: n.value), strip_octave=False)) for start, group in groups]
+
+def detect_chords(events, window=0.05, **kwargs):
+    """returns a ChordProgression of the most likely chord of each group of NoteEvents
+    that start together (see group_notes), skipping single notes and merging consecutive
+    repeats. further kwargs are passed to chords.most_likely_chord"""
+    from .chords import most_likely_chord # lazy import
+    from .progressions import ChordProgression # lazy import
+    chord_cache = {} # groups with the same pitch classes (from the bass up) get the same chord
+    chords = []
+    for start, group in group_notes(events, window):
+        # drop octave doublings, keeping the lowest of each pitch class:
+        pitch_classes = NoteList(list(dict.fromkeys([n.note for n in group])))
+        if len(pitch_classes) < 2:
+            continue
+        key = tuple(n.position for n in pitch_classes)
+        if key not in chord_cache:
+            chord_cache[key] = most_likely_chord(pitch_classes, **kwargs)
+        chord = chord_cache[key]
+        if chord is not None and (len(chords) == 0 or chord.name != chords[-1].name):
+            chords.append(chord)
+    return ChordProgression(chords)
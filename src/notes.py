@@ -5,8 +5,9 @@
 
 from .intervals import Interval, IntervalList
 from .parsing import fl, sh, nat, dfl, dsh
-from .util import log, rotate_list, check_all
+from .util import log, rotate_list, check_all, unpickle_list, pitch_class_mask, value_mask
 from . import parsing, tuning, _settings
+from .caching import Cache
 from . import conversion as conv
 
 from functools import cached_property
@@ -329,6 +330,11 @@ class Note:
         return self.in_octave(octave).play(duration=duration, type=type,
                                            falloff=falloff, temperament=temperament)
 
+    def render(self, path=None, duration=3, octave=4, type='KS', falloff=True, temperament=None, bit_depth=16):
+        """renders this Note as audio in a desired octave, 4 by default (see OctaveNote.render)"""
+        return self.in_octave(octave).render(path, duration=duration, type=type,
+                                             falloff=falloff, temperament=temperament, bit_depth=bit_depth)
+
     def __str__(self):
         # e.g. '♩C#'
         return f'{self._marker}{self.name}'
@@ -577,15 +583,16 @@ class OctaveNote(Note):
         # else:
         #     return high_cand
 
-    def _wave(self, duration, type='KS', falloff=False, temperament=None, cache=True):
+    def _wave(self, duration, type='KS', falloff=False, temperament=None, cache=True, seed=None):
         """Outputs a sine wave corresponding to this note,
         by default with exponential volume increase and falloff"""
         from .audio import synth_wave
         # get this note's pitch by desired temperament system: (default from settings)
         tuned_pitch = self.get_pitch(temperament=temperament)
+        seed = seed if seed is not None else _settings.SYNTHESIS_SEED
         # wave = sine_wave(freq=self.pitch, duration=duration)
         # use karplus-strong wave table synthesis for guitar-string timbre:
-        wave = synth_wave(freq=tuned_pitch, duration=duration, type=type, falloff=falloff, cache=cache)
+        wave = synth_wave(freq=tuned_pitch, duration=duration, type=type, falloff=falloff, cache=cache, seed=seed)
         # log(f'Adding note {self} with pitch {tuned_pitch} (temperament={temperament})', force=True, depth=6)
         return wave
 
@@ -594,6 +601,13 @@ class OctaveNote(Note):
         wave = self._wave(duration=duration, type=type, falloff=falloff, temperament=temperament)
         play_wave(wave, block=block)
 
+    def render(self, path=None, duration=2, type='KS', falloff=True, temperament=None, bit_depth=16):
+        """returns the audio that OctaveNote.play would play as a float32 buffer,
+        and writes it to a WAV file if path is given"""
+        from .audio import render_wave
+        wave = self._wave(duration=duration, type=type, falloff=falloff, temperament=temperament)
+        return render_wave(wave, path, bit_depth=bit_depth)
+
     @property
     def _marker(self):
         """unicode marker associated with this class"""
@@ -665,9 +679,62 @@ class NoteList(list):
                 note_items.append(self._recast(item))
         return note_items
 
+    def __reduce__(self):
+        # restore strip_octave before the notes themselves, since append needs it:
+        return (unpickle_list, (self.__class__, list(self), self.__dict__))
+
     def append(self, other):
         """Cast any appendands to Notes"""
         super().append(self._recast(other))
+        self._clear_cached_masks()
+
+    def insert(self, index, other):
+        super().insert(index, self._recast(other))
+        self._clear_cached_masks()
+
+    def __setitem__(self, index, other):
+        super().__setitem__(index, other)
+        self._clear_cached_masks()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._clear_cached_masks()
+
+    def remove(self, other):
+        super().remove(other)
+        self._clear_cached_masks()
+
+    def pop(self, index=-1):
+        popped = super().pop(index)
+        self._clear_cached_masks()
+        return popped
+
+    @cached_property
+    def pitch_class_mask(self):
+        """12-bit integer with bit N set if this list contains a note N semitones above C.
+        used for efficient membership/subset/overlap/transposition checks, see util.pitch_class_mask"""
+        return pitch_class_mask([n.position for n in self])
+
+    @cached_property
+    def value_mask(self):
+        """as pitch_class_mask, but including the octave if this list contains OctaveNotes,
+        with one bit for each note value (i.e. key on the piano)"""
+        return value_mask([n.value if isinstance(n, OctaveNote) else n.position for n in self])
+
+    def _clear_cached_masks(self):
+        self.__dict__.pop('pitch_class_mask', None)
+        self.__dict__.pop('value_mask', None)
+
+    def __contains__(self, item):
+        """lookup by pitch class for lists of Notes (and strings that cast to Notes),
+        otherwise falls back on list.__contains__"""
+        if self.strip_octave and isinstance(item, (Note, str)) and not isinstance(item, OctaveNote):
+            if isinstance(item, str):
+                if not parsing.is_valid_note_name(item):
+                    return super().__contains__(item)
+                item = Note.from_cache(item)
+            return bool(self.pitch_class_mask & (1 << item.position))
+        return super().__contains__(item)
 
     def extend(self, other):
         """Cast any extensions to Notes"""
@@ -716,10 +783,6 @@ class NoteList(list):
         else:
             raise Exception(f"Can't subtract {type(other)} from NoteList")
 
-    ### there was previously a __contains__ method here,
-    ### but it is not needed since list.__contains__ suffices combined with
-    ### note equivalence behaviour with strings, i.e. Note('C') == 'C'
-
     def unique(self):
         """returns a new NoteList, where repeated notes are dropped after the first"""
         unique_notes = []
@@ -833,10 +896,15 @@ class NoteList(list):
         from .keys import matching_keys
         return matching_keys(notes=self, *args, **kwargs)
 
-    def _waves(self, duration, octave, type, falloff=False, temperament=None):
+    def _waves(self, duration, octave, type, falloff=False, temperament=None, seed=None, workers=None):
+        """synthesises the wave of each note in this list, in parallel if workers > 1
+        (see audio.synth_waves; workers and seed default to the SYNTHESIS_* settings)"""
+        from .audio import synth_waves
         wave_notes = self.force_octave(start_octave=octave)
         print(f'  -synthesising notes: {wave_notes}')
-        waves = [n._wave(duration=duration, type=type, falloff=falloff, temperament=temperament) for n in wave_notes]
+        seed = seed if seed is not None else _settings.SYNTHESIS_SEED
+        freqs = [n.get_pitch(temperament=temperament) for n in wave_notes]
+        waves = synth_waves(freqs, duration=duration, type=type, falloff=falloff, seed=seed, workers=workers)
         return waves
 
     def _chord_wave(self, duration, octave, delay=None, type='KS', falloff=True, temperament=None):
@@ -859,8 +927,8 @@ class NoteList(list):
         melody_wave = arrange_melody(self._waves(duration, octave, type, temperament=temperament), delay=delay, norm=False, falloff=falloff)
         return melody_wave
 
-    def play(self, delay=0.2, duration=3, octave=None, falloff=True, block=False, temperament=None, type='KS', **kwargs):
-        from .audio import play_wave
+    def _full_wave(self, delay=0.2, duration=3, octave=None, falloff=True, temperament=None, type='KS', **kwargs):
+        """the wave played by NoteList.play, as a melody if delay is given or as a chord if not"""
         if octave is None and isinstance(self[0], OctaveNote):
             # auto infer octave if this list starts with an octavenote:
             octave = self[0].octave
@@ -873,8 +941,31 @@ class NoteList(list):
             wave = self._chord_wave(duration=duration, octave=octave,
                                     type=type, falloff=falloff,
                                     temperament=temperament, **kwargs)
+        return wave
+
+    def play(self, delay=0.2, duration=3, octave=None, falloff=True, block=False, temperament=None, type='KS', **kwargs):
+        from .audio import play_wave
+        wave = self._full_wave(delay=delay, duration=duration, octave=octave, falloff=falloff,
+                               temperament=temperament, type=type, **kwargs)
         play_wave(wave, block=block)
 
+    def render(self, path=None, delay=0.2, duration=3, octave=None, falloff=True, temperament=None, type='KS', bit_depth=16, **kwargs):
+        """renders the audio that NoteList.play would play, without needing a sound device:
+        returns it as a float32 buffer, and writes it to a WAV file if path is given"""
+        from .audio import render_wave
+        wave = self._full_wave(delay=delay, duration=duration, octave=octave, falloff=falloff,
+                               temperament=temperament, type=type, **kwargs)
+        return render_wave(wave, path, bit_depth=bit_depth)
+
+    def to_midi(self, path=None, delay=0.2, duration=3, octave=None, velocity=100, tempo=120):
+        """exports these notes as a MIDI file, timed as NoteList.play would play them,
+        or returns the file's bytes if no path is given"""
+        from .midi import note_events, export_midi
+        if octave is None and isinstance(self[0], OctaveNote):
+            octave = self[0].octave
+        events = note_events(self.force_octave(start_octave=octave), delay=delay, duration=duration, velocity=velocity)
+        return export_midi([events], path, tempo=tempo)
+
     def join(self, s, markers=False):
         """returns a string of the notes in this notelist joined by the specified char/s"""
         if markers:
@@ -929,7 +1020,7 @@ chromatic_sharp_notes = [C, Csh, D, Dsh, E, F, Fsh, G, Gsh, A, Ash, B]
 chromatic_notes = chromatic_sharp_notes if _settings.DEFAULT_SHARPS else chromatic_flat_notes
 
 # note cache by name for efficient init:
-cached_notes = {(n,s): Note(n, prefer_sharps=s) for n in parsing.common_note_names for s in [None, False, True]}
+cached_notes = Cache('notes', {(n,s): Note(n, prefer_sharps=s) for n in parsing.common_note_names for s in [None, False, True]})
 cached_notes.update({(p,s) : Note(position=p, prefer_sharps=s) for p in range(12) for s in [None, False, True]})
 
 # relative minors/majors of all chromatic notes:
@@ -363,7 +363,7 @@ def parse_out_integers(integers, expected_len=None):
     """accepts a string or list of integers, or strings of integers,
     and returns a strict list of integers (or None object for non-integers)"""
     if isinstance(integers, (list, tuple)):
-        ints_list = [int(i) if (isinstance(i, int) or i.isnumeric()) else None for i in integers]
+        ints_list = [int(i) if (isinstance(i, int) or (isinstance(i, str) and i.isnumeric())) else None for i in integers]
     elif isinstance(integers, str):
         if ((expected_len is not None) and (len(integers) == expected_len)) or (expected_len is None):
             # simply parse numbers out of string
@@ -108,7 +108,7 @@ class Progression:
             if scale is None:
                 self.scale = infer_scale(chord_degree_qualities)
             elif isinstance(scale, str):
-                self.scale = Scale(scale)
+                self.scale = Scale.from_cache(scale)
             else:
                 self.scale = scale
 
@@ -140,7 +140,7 @@ class Progression:
         elif check_all(numerals, 'isinstance', int):
             assert scale is not None, f'Progression chords given as integers but scale arg not provided'
             if isinstance(scale, str):
-                scale = Scale(scale)
+                scale = Scale.from_cache(scale)
             assert type(scale) is Scale
             self.scale = scale
             self.root_degrees = numerals
@@ -260,7 +260,7 @@ class Progression:
         """returns a ChordProgression with these chords over a specified Key object"""
         # cast to Key object:
         if isinstance(key, str):
-            key = Key(key)
+            key = Key.from_cache(key)
         assert isinstance(key, Key)
         key_chords = []
         for ch in self.chords:
@@ -478,6 +478,158 @@ def most_grammatical_progression(progressions, add_resolution=True, return_score
         return matching_progressions
 
 
+def rank_keys(chords, candidate_scales = scales.natural_scales + scales.extended_scales,
+              pad_with_tonic=False, verbose=False):
+    """the key detection routine behind ChordProgression.find_key:
+    wraps around matching_keys but additionally uses cadence information to distinguish between competing candidates.
+    returns a dict of candidate Keys and their scores, ranked from most to least likely"""
+    if not isinstance(chords, ChordList):
+        chords = ChordList(chords)
+
+    log(f'Searching for keys of {chords} with default parameters')
+    matches = matching_keys(chords=chords, min_likelihood=0.7, min_recall=0.95, candidate_scales=candidate_scales,
+                            max_results=12, display=False)
+    if verbose:
+        # display the table
+        matching_keys(chords=chords, min_likelihood=0.7, min_recall=0.95, candidate_scales=candidate_scales,
+                      max_results=12, display=True)
+
+    if len(matches) == 0:
+        # if no matches at all first, open up the min recall property:
+        log(f'No key found matching notes using default parameters, widening search')
+        matches = matching_keys(chords=chords, max_likelihood=0.6, min_likelihood=0.5, min_recall=0.8, candidate_scales=candidate_scales,
+                                max_results=12, display=False)
+        if verbose:
+            # display the table again:
+            matching_keys(chords=chords, max_likelihood=0.6, min_likelihood=0.5, min_recall=0.8, candidate_scales=candidate_scales,
+                          max_results=12, display=True)
+        if len(matches) == 0:
+            raise Exception(f'No key matches at all found for chords: {chords} \n(this should never happen!)')
+    # try ideal matches (with perfect recall) first:
+    log(f'Matches: {[k.name for k in matches]}')
+
+    ideal_matches = [(k,scores) for k,scores in matches.items() if scores['recall'] == 1.0]
+    log(f'{len(matches)} possible key matches found')
+
+    match_tuples = [(k, scores) for k,scores in matches.items()]
+
+    # if len(ideal_matches) == 0:
+    #     # no good matches, so open up to all matches that share the max recall:
+    #     # max_rec = max([scores['recall'] for k,scores in matches.items()])
+    #     # max_rec_matches = [(k,scores) for k,scores in matches.items() if scores['recall'] == max_rec]
+    #     match_tuples = max_rec_matches
+    #     log('No ideal matches with perfect recall')
+    #     # log(f'So opened up to all {len(match_tuples)} matches tied for the highest recall')
+    #     log(f'So opened up to all matches above recall threshold')
+    # else:
+    #     log(f'Found {len(ideal_matches)} candidate/s with perfect recall')
+    #     # at least one ideal match, so we'll focus on those
+    #     match_tuples = ideal_matches
+
+    if len(match_tuples) == 1:
+        log(f'Only one candidate for key: {match_tuples}')
+        # only one good match, so use it
+        return dict(match_tuples)
+
+    # # multiple good matches, see if one has better precision than the other
+    # max_prec = max([scores['precision'] for k,scores in match_tuples])
+
+    # precise_matches = [(k,scores) for k,scores in match_tuples if scores['precision'] == max_prec]
+    log(f'Multiple candidates for key: {[m[0].name for m in match_tuples]}')
+    log(f' So testing them for cadence-based grammaticity')
+    # if len(precise_matches) == 1:
+    #     # one of the perfect-recall matches is better than all the others, so use it (probably?)
+    #     key = precise_matches[0][0]
+    #     print(f'Found key: {key}')
+
+    # else:
+
+    candidate_keys = [k for k, scores in match_tuples]
+
+    log(f'Testing {len(candidate_keys)} candidate keys for grammaticity of this progression in those keys')
+    candidate_progressions = [Progression(chords.as_numerals_in(k), scale=k.scale).in_key(k) for k in candidate_keys]
+    log(f'Candidate keys: {", ".join([str(p.key) for p in candidate_progressions])}')
+    # get a dict of key: cadence_score pairs for key candidates
+    key_cadence_scores = most_grammatical_progression(candidate_progressions, add_resolution=pad_with_tonic, return_scores=True, verbose=verbose)
+    # augment match tuples with cadence scores:
+    new_scores = {}
+    for key, score in match_tuples:
+        new_score = {k:v for k,v in score.items()}
+        new_score['cadence'] = key_cadence_scores[key]
+        joint_cadence_recall = (new_score['cadence'] + new_score['recall']**2 + new_score['precision']/2) / 2.5
+        new_score['joint_cadence_recall'] = round(joint_cadence_recall, 3)
+        new_scores[key] = new_score
+
+    re_ranked_keys = sorted(candidate_keys, key=lambda k: (-new_scores[k]['joint_cadence_recall'],
+                                                       -new_scores[k]['cadence'],
+                                                       -new_scores[k]['recall'],
+                                                       -k.likelihood,
+                                                       -new_scores[k]['precision'],
+                                                       -k.consonance))
+
+    # grammatical_progressions = most_grammatical_progression(candidate_progressions, add_resolution=pad_with_tonic, verbose=log.verbose)
+    # grammatical_keys = [p.key for p in grammatical_progressions]
+
+    ranked_keys, ranked_scores = re_ranked_keys, [new_scores[k] for k in re_ranked_keys]
+
+    if verbose:
+        from .display import DataFrame
+        df = DataFrame(['Key', 'C-R score', 'Cad.',
+                        'Rec.', 'Prec.',
+                        'Likl.', 'Cons.'])
+        for k,s in zip(ranked_keys, ranked_scores):
+            df.append([str(k), s['joint_cadence_recall'], s['cadence'],
+                      round(s['recall'],2), round(s['precision'],2),
+                      round(k.likelihood,2), round(k.consonance, 3)])
+        df.show()
+
+    return {k: new_scores[k] for k in ranked_keys}
+
+def find_keys_batch(chord_lists, candidate_scales = scales.natural_scales + scales.extended_scales,
+                    contract_extended_scales=True, pad_with_tonic=False, processes=None, chunksize=64):
+    """detects the keys of many chord progressions at once, for analysing large corpora of charts.
+    accepts an iterable of chord lists (or anything that ChordList accepts, like strings of chord names),
+    and returns a list of (Key, scores) tuples, one for each input, chosen as ChordProgression.find_key would.
+    identical progressions are only analysed once, and all searches share the same key candidate tables.
+    if processes is an integer > 1, unique progressions are farmed out to a pool of that many processes."""
+    chord_lists = [cl if isinstance(cl, ChordList) else ChordList(cl) for cl in chord_lists]
+
+    # dedupe by chord sequence (order matters, because of cadences):
+    unique_progressions = {}
+    for cl in chord_lists:
+        unique_progressions.setdefault(tuple(cl), cl)
+    log(f'Detecting keys for {len(chord_lists)} progressions ({len(unique_progressions)} unique)')
+
+    if processes is not None and processes > 1:
+        from concurrent.futures import ProcessPoolExecutor # lazy import
+        # scales, keys and chords are passed between processes by name:
+        jobs = [[ch.name for ch in cl] for cl in unique_progressions.values()]
+        job_args = ([sc.name for sc in candidate_scales], contract_extended_scales, pad_with_tonic)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            job_results = list(pool.map(_find_key_by_names, jobs, [job_args]*len(jobs), chunksize=chunksize))
+        unique_results = [(Key(key_name), scores) for key_name, scores in job_results]
+    else:
+        unique_results = [_find_key(cl, candidate_scales, contract_extended_scales, pad_with_tonic)
+                          for cl in unique_progressions.values()]
+
+    results_by_progression = dict(zip(unique_progressions.keys(), unique_results))
+    return [results_by_progression[tuple(cl)] for cl in chord_lists]
+
+def _find_key(chords, candidate_scales, contract_extended_scales, pad_with_tonic):
+    """returns the best key for a ChordList, and its scores, as ChordProgression.find_key does"""
+    ranked_keys = rank_keys(chords, candidate_scales=candidate_scales, pad_with_tonic=pad_with_tonic)
+    key, scores = list(ranked_keys.items())[0]
+    if len(ranked_keys) > 1 and key.is_extended() and contract_extended_scales:
+        key = key.contraction
+    return key, scores
+
+def _find_key_by_names(chord_names, job_args):
+    # process pool worker for find_keys_batch:
+    scale_names, contract_extended_scales, pad_with_tonic = job_args
+    key, scores = _find_key(ChordList(chord_names), [Scale(name) for name in scale_names], contract_extended_scales, pad_with_tonic)
+    return key.name, scores
+
+
 class ChordProgression(Progression): # , ChordList):
     """ChordList subclass defined additionally over a specific key"""
     def __init__(self, *chords, key=None, search_natural_keys_only=True, verbose=False):
@@ -534,9 +686,9 @@ class ChordProgression(Progression): # , ChordList):
             else:
                 self.key = self.find_key(chords=base_chords, verbose=verbose)
         else:
-            self.key = key if isinstance(key, Key) else Key(key)
+            self.key = key if isinstance(key, Key) else Key.from_cache(key)
 
-        self.scale = Scale(self.key.scale)
+        self.scale = self.key.scale
         self.roots = NoteList([ch.root for ch in base_chords])
         self.basses = NoteList([ch.bass for ch in base_chords])
 
@@ -653,6 +805,15 @@ class ChordProgression(Progression): # , ChordList):
         # just a wrapper around this progression's ChordList's method:
         self.chords.play(*args, **kwargs)
 
+    def render(self, *args, **kwargs):
+        return self.chords.render(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        return self.chords.stream(*args, **kwargs)
+
+    def to_midi(self, *args, **kwargs):
+        return self.chords.to_midi(*args, **kwargs)
+
     _brackets = _settings.BRACKETS['ChordProgression']
 
     def long_str(self):
@@ -968,106 +1129,13 @@ class ChordProgression(Progression): # , ChordList):
         if chords is None:
             chords = self.chords
 
-        log(f'Searching for keys of {chords} with default parameters')
-        matches = matching_keys(chords=chords, min_likelihood=0.7, min_recall=0.95, candidate_scales=candidate_scales,
-                                max_results=12, display=False)
-        if verbose:
-            # display the table
-            matching_keys(chords=chords, min_likelihood=0.7, min_recall=0.95, candidate_scales=candidate_scales,
-                          max_results=12, display=True)
+        ranked_keys = rank_keys(chords, candidate_scales=candidate_scales, pad_with_tonic=pad_with_tonic, verbose=verbose)
+        key = list(ranked_keys.keys())[0]
 
-        if len(matches) == 0:
-            # if no matches at all first, open up the min recall property:
-            log(f'No key found matching notes using default parameters, widening search')
-            matches = matching_keys(chords=chords, max_likelihood=0.6, min_likelihood=0.5, min_recall=0.8, candidate_scales=candidate_scales,
-                                    max_results=12, display=False)
-            if verbose:
-                # display the table again:
-                matching_keys(chords=chords, max_likelihood=0.6, min_likelihood=0.5, min_recall=0.8, candidate_scales=candidate_scales,
-                              max_results=12, display=True)
-            if len(matches) == 0:
-                raise Exception(f'No key matches at all found for chords: {self} \n(this should never happen!)')
-        # try ideal matches (with perfect recall) first:
-        log(f'Matches: {[k.name for k in matches]}')
-
-        ideal_matches = [(k,scores) for k,scores in matches.items() if scores['recall'] == 1.0]
-        log(f'{len(matches)} possible key matches found')
-
-        match_tuples = [(k, scores) for k,scores in matches.items()]
-
-        # if len(ideal_matches) == 0:
-        #     # no good matches, so open up to all matches that share the max recall:
-        #     # max_rec = max([scores['recall'] for k,scores in matches.items()])
-        #     # max_rec_matches = [(k,scores) for k,scores in matches.items() if scores['recall'] == max_rec]
-        #     match_tuples = max_rec_matches
-        #     log('No ideal matches with perfect recall')
-        #     # log(f'So opened up to all {len(match_tuples)} matches tied for the highest recall')
-        #     log(f'So opened up to all matches above recall threshold')
-        # else:
-        #     log(f'Found {len(ideal_matches)} candidate/s with perfect recall')
-        #     # at least one ideal match, so we'll focus on those
-        #     match_tuples = ideal_matches
-
-        if len(match_tuples) == 1:
-            log(f'Only one candidate for key: {match_tuples}')
+        if len(ranked_keys) == 1:
             # only one good match, so use it
-            key = match_tuples[0][0]
             print(f'Found key: {key}')
-
-        elif len(match_tuples) >= 2:
-            # # multiple good matches, see if one has better precision than the other
-            # max_prec = max([scores['precision'] for k,scores in match_tuples])
-
-            # precise_matches = [(k,scores) for k,scores in match_tuples if scores['precision'] == max_prec]
-            log(f'Multiple candidates for key: {[m[0].name for m in match_tuples]}')
-            log(f' So testing them for cadence-based grammaticity')
-            # if len(precise_matches) == 1:
-            #     # one of the perfect-recall matches is better than all the others, so use it (probably?)
-            #     key = precise_matches[0][0]
-            #     print(f'Found key: {key}')
-
-            # else:
-
-            candidate_keys = [k for k, scores in match_tuples]
-
-            log(f'Testing {len(candidate_keys)} candidate keys for grammaticity of this progression in those keys')
-            candidate_progressions = [Progression(chords.as_numerals_in(k), scale=k.scale).in_key(k) for k in candidate_keys]
-            log(f'Candidate keys: {", ".join([str(p.key) for p in candidate_progressions])}')
-            # get a dict of key: cadence_score pairs for key candidates
-            key_cadence_scores = most_grammatical_progression(candidate_progressions, add_resolution=pad_with_tonic, return_scores=True, verbose=verbose)
-            # augment match tuples with cadence scores:
-            new_scores = {}
-            for key, score in match_tuples:
-                new_score = {k:v for k,v in score.items()}
-                new_score['cadence'] = key_cadence_scores[key]
-                joint_cadence_recall = (new_score['cadence'] + new_score['recall']**2 + new_score['precision']/2) / 2.5
-                new_score['joint_cadence_recall'] = round(joint_cadence_recall, 3)
-                new_scores[key] = new_score
-
-            re_ranked_keys = sorted(candidate_keys, key=lambda k: (-new_scores[k]['joint_cadence_recall'],
-                                                               -new_scores[k]['cadence'],
-                                                               -new_scores[k]['recall'],
-                                                               -k.likelihood,
-                                                               -new_scores[k]['precision'],
-                                                               -k.consonance))
-
-            # grammatical_progressions = most_grammatical_progression(candidate_progressions, add_resolution=pad_with_tonic, verbose=log.verbose)
-            # grammatical_keys = [p.key for p in grammatical_progressions]
-
-            ranked_keys, ranked_scores = re_ranked_keys, [new_scores[k] for k in re_ranked_keys]
-            key = ranked_keys[0]
-
-            if verbose:
-                from src.display import DataFrame
-                df = DataFrame(['Key', 'C-R score', 'Cad.',
-                                'Rec.', 'Prec.',
-                                'Likl.', 'Cons.'])
-                for k,s in zip(ranked_keys, ranked_scores):
-                    df.append([str(k), s['joint_cadence_recall'], s['cadence'],
-                              round(s['recall'],2), round(s['precision'],2),
-                              round(k.likelihood,2), round(k.consonance, 3)])
-                df.show()
-
+        else:
             # short_chord_names = ' - '.join([ch.name for ch in chords])
             print(f'Determining key for ChordProgression: {chords}')
             print(f'    Best guess: {key}')
@@ -1104,7 +1172,7 @@ class DegreeMotion:
         if scale is not None:
             if isinstance(scale, str):
                 # instantiate Scale object if it is not already instantiated
-                scale = Scale(scale)
+                scale = Scale.from_cache(scale)
             assert isinstance(scale, Scale), f"DegreeMotion expected a Scale object, or string that casts to Scale, but got: {type(scale)}"
         self.scale = scale
 
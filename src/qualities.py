@@ -172,6 +172,11 @@ class Quality:
     def __hash__(self):
         return hash(str(self))
 
+    def __reduce__(self):
+        # unpickling (e.g. from the chord registry snapshot) must return
+        # the existing singleton rather than calling __new__ with no args:
+        return (Quality.from_value, (self.value,))
+
 
     # interval offsets with respect to major or perfect qualities:
     @property
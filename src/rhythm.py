@@ -2,17 +2,29 @@
 
 ### but will eventually handle melodies, time signatures, swing ratios and so on
 
-from .audio import LogEnv, white_noise, smooth, fs, play_wave
+from .audio import LogEnv, white_noise, smooth, fs, play_wave, stream_events, play_stream
 from . import conversion as conv
 from . import notes
 import numpy as np
 
-# audio samples for major and minor drumbeats:
-major_beat_audio = smooth(LogEnv(white_noise(0.06)),ratio=1000)
-medium_beat_audio = smooth(LogEnv(white_noise(0.05)),ratio=1000) * 0.6
-minor_beat_audio = smooth(LogEnv(white_noise(0.04)),ratio=1000) * 0.6
+# audio samples for major and minor drumbeats,
+# synthesised on first use (by get_beat_audio) rather than at import:
+beat_audio = {}
 reference_tempo = 120.
 
+def get_beat_audio(beat):
+    """returns the drumbeat audio sample for a beat of type 'major', 'medium' or 'minor'"""
+    if beat not in beat_audio:
+        if beat == 'major':
+            beat_audio[beat] = smooth(LogEnv(white_noise(0.06)),ratio=1000)
+        elif beat == 'medium':
+            beat_audio[beat] = smooth(LogEnv(white_noise(0.05)),ratio=1000) * 0.6
+        elif beat == 'minor':
+            beat_audio[beat] = smooth(LogEnv(white_noise(0.04)),ratio=1000) * 0.6
+        else:
+            raise ValueError(f"beat must be one of 'major', 'medium' or 'minor', but got: {beat}")
+    return beat_audio[beat]
+
 class TimeSignature:
     """a time signature representing the beats of a bar at a specific tempo"""
     def __init__(self, beats_per_bar, beat_value, tempo=reference_tempo):
@@ -60,6 +72,7 @@ class TimeSignature:
         with major and minor beats of the desired time signature
         indicated with drum beats"""
         wave = np.zeros(int(self.bar_duration*fs))
+        major_beat_audio, medium_beat_audio, minor_beat_audio = [get_beat_audio(b) for b in ('major', 'medium', 'minor')]
 
         beat_idxs = [int(fs * self.beat_duration * b) for b in range(0,self.beats_per_bar)]
 
@@ -88,7 +101,49 @@ class TimeSignature:
         metronome_waves = [wave]*bars
         return np.concatenate(metronome_waves)
 
-
+    def metronome_beats(self, bars=None):
+        """yields the (start time, beat type) of each beat of the metronome above,
+        where beat type is 'major', 'medium' or 'minor',
+        for some number of bars, or endlessly if bars is None"""
+        bar_frames = int(self.bar_duration*fs)
+        beat_idxs = [int(fs * self.beat_duration * b) for b in range(0,self.beats_per_bar)]
+        beat_types = ['major'] + ['minor']*(self.beats_per_bar-1)
+        if self.beats_per_bar > 4 and self.beats_per_bar <= self.beat_value:
+            # medium beat on the half bar, as in metronome:
+            beat_types[self.beats_per_bar // 2] = 'medium'
+
+        bar = 0
+        while (bars is None) or (bar < bars):
+            for beat_idx, beat_type in zip(beat_idxs, beat_types):
+                yield ((bar * bar_frames) + beat_idx) / fs, beat_type
+            bar += 1
+
+    def metronome_events(self, bars=None):
+        """yields the (start time, beat audio) events of the metronome audio above,
+        for some number of bars, or endlessly if bars is None"""
+        for start, beat_type in self.metronome_beats(bars):
+            yield start, get_beat_audio(beat_type)
+
+    def stream(self, bars=None, block_size=1024):
+        """yields the metronome audio in blocks of block_size frames, in constant memory,
+        for some number of bars, or endlessly if bars is None"""
+        duration = (bars * int(self.bar_duration*fs)) / fs if bars is not None else None
+        return stream_events(self.metronome_events(bars), block_size=block_size, duration=duration)
+
+
+
+    def to_midi(self, path=None, bars=4, velocity=100):
+        """exports a metronome at this time signature as a MIDI file, on the General MIDI
+        percussion channel, or returns the file's bytes if no path is given"""
+        from .midi import NoteEvent, export_midi, midi_note_offset
+        # hi wood block (midi note 76) for the first beat of each bar, low wood block (77)
+        # for the others, with the medium (half-bar) beat a little louder:
+        beat_notes = {'major': (76, velocity), 'medium': (77, velocity), 'minor': (77, int(velocity * 0.6))}
+        events = []
+        for start, beat in self.metronome_beats(bars):
+            midi_note, beat_velocity = beat_notes[beat]
+            events.append(NoteEvent(start, self.beat_duration / 2, midi_note - midi_note_offset, beat_velocity, channel=9))
+        return export_midi([events], path, tempo=self.tempo, time_signature=(self.beats_per_bar, self.beat_value))
 
     def get_pitches(self):
         """finds the pitches associated with this time signature's tempo,
@@ -113,10 +168,8 @@ class TimeSignature:
             # play as many bars as requested
             play_wave(self.metronome(bars=bars), block=True)
         else:
-            # play forever
-            wave = self.metronome(bars=100)  # synthesise 100 bars of metronome audio
-            while True: # repeat them until keyboard interrupt
-                play_wave(wave, block=True)
+            # play forever (until keyboard interrupt), synthesising as we go:
+            play_stream(self.stream(bars=None))
 
 
 def bpm_to_pitches(bpm):
@@ -6,7 +6,8 @@ from .qualities import ChordModifier, Quality, Maj, Min, Dim, minor_mod, dim_mod
 from .numerals import RomanNumeral
 from .parsing import num_suffixes, numerals_roman, is_alteration, offset_accidentals, auto_split, contains_accidental, sh, fl
 from .display import chord_table
-from . import notes, _settings, parsing
+from . import notes, tuning, snapshots, _settings, parsing
+from .caching import Cache
 from math import floor, ceil
 import re
 
@@ -52,6 +53,7 @@ class Scale:
         self.quality = AbstractChord._determine_quality(self)
 
         self.cached_name = None # name retrieval is expensive, so we only do it once and cache it at that time
+        self._hash = None # likewise for hashing, which goes through the name
 
         self.scale = self # pointer to a guaranteed Scale object (that is overwritten by Key)
 
@@ -314,8 +316,15 @@ class Scale:
         return Scale(factors=self.factors.subscale(keep=keep, omit=omit))
 
     def mode(self, N, sanitise=True):
-        """Returns a new scale that is the Nth mode of this scale.
-        (where mode 1 is identical to the existing scale)"""
+        """Returns the scale that is the Nth mode of this scale.
+        (where mode 1 is identical to the existing scale)
+        modes are looked up in the memoized mode family graph (see scale_modes),
+        so the same Scale object is returned for the same mode every time."""
+        if (self.order < 8) and (1 <= N <= self.order):
+            mode_scale = scale_modes(self.factors)[N-1]
+            if mode_scale is not None:
+                return mode_scale
+        # otherwise compute it directly (and raise if the rotation is invalid):
         if N == 1:
             return Scale(self)
         else:
@@ -455,35 +464,9 @@ class Scale:
     def neighbouring_scale_names(self):
         return self.get_neighbouring_scale_names()
     def get_neighbouring_scale_names(self, ignore_chromatic=True):
-        """return a list of registered Scale objects that differ from this one by only a semitone"""
-        neighbours = []
-        for f in self.factors:
-            # loop across each factor (but not the first)
-            if f != 1:
-                val = self.factors[f]
-                # try values for this factor that differ by one accidental
-                # (i.e sharpening or flattening a natural, or natural-ing a sharp/flat)
-                if val == 0:
-                    vals_to_try = [-1, 1]
-                else:
-                    vals_to_try = [0]
-                for v in vals_to_try:
-                    new_factor_dct = dict(self.factors)
-                    new_factor_dct[f] = v
-                    try:
-                        if ignore_chromatic:
-                            new_factors = ScaleFactors(new_factor_dct)
-                        else:
-                            new_factors = ScaleFactors(new_factor_dct, chromatic=self.factors.chromatic)
-                        if new_factors in canonical_scale_factor_names:
-                            neighbour_name = canonical_scale_factor_names[new_factors]
-                            neighbours.append(new_factors)
-                    except:
-                        # failure to initialise ScaleFactors object indicates factor incompatibility
-                        # e.g. augmented 3rd and perfect 4th.
-                        # that's fine, skip this attempt and continue as normal
-                        continue
-        return neighbours
+        """return a list of the factors of registered scales that differ from this one by only a semitone"""
+        # look up each single-accidental alteration of this scale's factors in the scale catalogue:
+        return scale_catalogue().neighbour_factors(self.factors, ignore_chromatic=ignore_chromatic)
 
     @property
     def neighbouring_scales(self):
@@ -606,7 +589,7 @@ class Scale:
         #     tonic = notes.Note.from_cache(tonic)
         # lazy import to avoid circular dependencies:
         from .keys import Key
-        return Key(factors=self.factors, tonic=tonic)
+        return Key.from_cache(factors=self.factors, tonic=tonic)
 
 
 
@@ -981,59 +964,16 @@ class Scale:
             min_order = max_order = order
 
         degree = int(degree)
-        root_interval = self.get_interval_from_degree(degree)
-        degrees_above_this_degree = [d for d in range(degree, degree+14) ]  # no chords span more than 14 degrees
-        intervals_from_this_degree = IntervalList([self.get_interval_from_degree(d) for d in degrees_above_this_degree]) - root_interval
-        # intervals_set = set(intervals_from_this_degree) # for faster lookup
-        # intervals_from_this_degree = IntervalList([self.get_higher_interval(d) - root_interval for d in degrees_above_this_degree])
+        # look up (or build) the ids of the chords that fit on this degree, and their stats:
+        candidate_ids = self._valid_chord_ids(degree, inversions, no5s)
+        candidates = valid_chord_candidates()
+        consonances = valid_chord_consonances()
+        # apply statistical minimums and maximums to decide which ones to instantiate:
+        # (no5 chords' stats are only known once they have been instantiated, so they are checked below)
+        kept_ids = [i for i in candidate_ids.tolist()
+                    if (min_order <= candidates['orders'][i] <= max_order)
+                    and (candidates['no5s'][i] or (candidates['likelihoods'][i] >= min_likelihood and consonances[i] >= min_consonance))]
 
-        if len(self.chromatic_intervals) > 0:
-            # add chromatic intervals to the intervallist
-            intervals_from_this_degree = IntervalList(list(intervals_from_this_degree) + list(self.chromatic_intervals)).sorted()
-
-        # built a list of matching candidates as we go:
-        shortlist = []
-        for rarity, chord_names in chord_names_by_rarity.items():
-            # for name in [c for c in chord_names if '(no5)' not in c]: # ignore no5 chords (no longer needed, no5s are not in that list:)
-            for name in chord_names:
-
-                # this will be a one-item dict if inversions are not allowd, or contain all possible inversions if they are
-                candidate_intervals_by_inversion = {0: chord_names_to_intervals[name]}
-
-                if inversions:
-                    # invert this chord every which way and compare its intervals too
-                    # first we need to know how big the main chord is:
-                    chord_order = len(candidate_intervals_by_inversion[0])
-                    # then loop through its possible bass degrees:
-                    for i in range(1, chord_order):
-                        inversion_intervals = AbstractChord(factors=chord_names_to_factors[name], inversion=i).intervals
-                        candidate_intervals_by_inversion[i] = inversion_intervals
-
-                for inversion, candidate_intervals in candidate_intervals_by_inversion.items():
-                    is_match = True
-                    for interval in candidate_intervals[1:]: # skip the root
-                        if interval not in intervals_from_this_degree:
-                            is_match = False
-                            break
-                    if is_match:
-                        if linked:
-                            candidate = ScaleChord(factors=chord_names_to_factors[name], inversion=inversion, scale=self, degree=degree)
-                        else:
-                            candidate = AbstractChord(factors=chord_names_to_factors[name], inversion=inversion)
-                        if _root_note is not None: # for easy inheritance by Key class
-                            candidate = candidate.on_bass(_root_note)
-                        shortlist.append(candidate)
-
-                        if no5s:
-                            # also add the no5 version of this chord if it is at least a tetrad (but not for inversions)
-                            if (inversion == 0) and (candidate.order >= 4) and (5 in candidate):
-                                if linked:
-                                    no5_candidate = ScaleChord(candidate.suffix + '(no5)', scale=self, degree=degree)
-                                else:
-                                    no5_candidate = AbstractChord(candidate.suffix + '(no5)')
-                                shortlist.append(no5_candidate)
-
-        # apply statistical minimums and maximums to our shortlist to decide what to keep:
         candidate_stats = {}
         # (and initialise sets containing 'normal' chord intervals for pruning):
         if inversions:
@@ -1041,8 +981,17 @@ class Scale:
         if no5s:
             non_no5_intervals = set()
 
+        for i in kept_ids:
+            name, inversion, no5 = candidates['ids'][i]
+            if no5:
+                candidate = ScaleChord(name, scale=self, degree=degree) if linked else AbstractChord(name)
+            elif linked:
+                candidate = ScaleChord(factors=chord_names_to_factors[name], inversion=inversion, scale=self, degree=degree)
+            else:
+                candidate = AbstractChord(factors=chord_names_to_factors[name], inversion=inversion)
+            if _root_note is not None: # for easy inheritance by Key class
+                candidate = candidate.on_bass(_root_note)
 
-        for candidate in shortlist:
             if candidate.order <= max_order and candidate.order >= min_order:
                 if candidate.likelihood >= min_likelihood and candidate.consonance >= min_consonance:
                     candidate_stats[candidate] = {'order': candidate.order,
@@ -1050,7 +999,7 @@ class Scale:
                                                   'consonance': round(candidate.consonance,3)}
                     # add normal chords' intervals to the pruning comparison sets:
                     if inversions and (candidate.inversion == 0):
-                        non_inverted_intervals.add(candidate_intervals)
+                        non_inverted_intervals.add(candidate.intervals)
                     if no5s and (5 in candidate):
                         non_no5_intervals.add(candidate.intervals)
 
@@ -1086,6 +1035,44 @@ class Scale:
         else:
             return sorted_cands
 
+    def _valid_chord_ids(self, degree, inversions=False, no5s=False):
+        """returns the array of ids (into valid_chord_candidates) of every chord, and its inversions
+        if requested, whose intervals all fit into this scale from the specified degree,
+        plus their no5 versions if requested. looked up in valid_chord_table where possible."""
+        load_valid_chord_table()
+        key = (self.intervals.value_mask, self.chromatic_intervals.value_mask, degree, inversions, no5s)
+        if key in valid_chord_table:
+            return valid_chord_table[key]
+
+        import numpy as np # lazy import
+        root_interval = self.get_interval_from_degree(degree)
+        degrees_above_this_degree = [d for d in range(degree, degree+14) ]  # no chords span more than 14 degrees
+        intervals_from_this_degree = IntervalList([self.get_interval_from_degree(d) for d in degrees_above_this_degree]) - root_interval
+
+        if len(self.chromatic_intervals) > 0:
+            # add chromatic intervals to the intervallist
+            intervals_from_this_degree = IntervalList(list(intervals_from_this_degree) + list(self.chromatic_intervals)).sorted()
+        # bitmask of interval values (not flattened) for fast subset checks, with root always allowed:
+        degree_mask = intervals_from_this_degree.value_mask | 1
+
+        candidates = valid_chord_candidates()
+        fits = (candidates['masks'] & ~degree_mask) == 0
+        if not inversions:
+            fits &= (candidates['inversions'] == 0)
+        # no5 versions fit wherever their base chord does:
+        no5_fits = np.zeros_like(fits)
+        if no5s:
+            no5_fits[candidates['no5_ids'][fits & (candidates['no5_ids'] >= 0)]] = True
+        ids = np.nonzero((fits & ~candidates['no5s']) | no5_fits)[0].astype(np.int16)
+        valid_chord_table[key] = ids
+        return ids
+
+    @property
+    def pitch_class_mask(self):
+        """bitmask of this scale's intervals (including the root) relative to its tonic,
+        see util.pitch_class_mask"""
+        return self.intervals.pitch_class_mask
+
     def __contains__(self, item):
         """if item is an Interval, does it fit in our list of diatonic-degree-intervals plus chromatic-intervals?
         if it is an IntervalList, do they all fit?"""
@@ -1093,16 +1080,14 @@ class Scale:
             if item % 12 == 0:
                 return True # by definition
             else:
-                return (Interval.from_cache(item).flatten() in self.intervals)
+                value = item.value if isinstance(item, Interval) else item
+                return bool(self.intervals.pitch_class_mask & (1 << (value % 12)))
         elif isinstance(item, (list, IntervalList)):
             if type(item) == list:
                 item = IntervalList(item)
-            # for an iterable of intervals from root, check if they all belong:
-            padded_intervals = self.intervals.pad()
-            for iv in item.flatten():
-                if iv not in padded_intervals:
-                    return False
-            return True
+            # for an iterable of intervals from root, check if they all belong
+            # (the root bit is always set, since unisons/octaves belong by definition):
+            return is_submask(item.pitch_class_mask, self.intervals.pitch_class_mask | 1)
         elif isinstance(item, AbstractChord):
             if not isinstance(item, ScaleChord):
                 raise TypeError("""A Scale does not know if it contains a given AbstractChord;
@@ -1127,14 +1112,56 @@ class Scale:
             if self.degree_intervals[degree] != degree_interval:
                 return False # this subscale does not have that interval
         root_interval = self.degree_intervals[degree]
-        intervals_from_root = IntervalList([root_interval + iv for iv in abs_chord.intervals])
-        # call __contains__ on resulting iv list:
-        return intervals_from_root.flatten() in self
+        # transpose the chord's bitmask up to this degree and check it fits inside ours:
+        chord_mask_from_root = rotate_mask(abs_chord.intervals.pitch_class_mask, root_interval.value)
+        return is_submask(chord_mask_from_root, self.intervals.pitch_class_mask | 1)
 
     # scales hash according to their factors and their chromatic intervals:
     def __hash__(self):
         # return hash(tuple(self.factors, self.chromatic_intervals))
-        return hash(str(self))
+        if self._hash is None:
+            self._hash = hash(str(self))
+        return self._hash
+
+    @staticmethod
+    def from_cache(name=None, factors=None):
+        # efficient scale init by cache lookup of a scale name or ScaleFactors object.
+        # scales are interned by their factors, so identical scales share one Scale object
+        # (which should therefore never be modified in-place)
+        if isinstance(name, Scale):
+            if type(name) is Scale:
+                return name
+            # recast Keys to their Scales:
+            name, factors = None, name.factors
+        elif isinstance(name, (Factors, dict)) or (isinstance(name, str) and name[:1].isnumeric()):
+            name, factors = None, name
+        elif isinstance(name, (list, tuple)):
+            # scales of interval lists are not cached:
+            return Scale(name)
+
+        if name is not None:
+            cache_key = (name, None)
+        elif factors is not None:
+            if not isinstance(factors, ScaleFactors):
+                factors = ScaleFactors(factors)
+            cache_key = (None, ScaleCatalogue._factors_key(factors.items(), factors.chromatic))
+        else:
+            raise TypeError(f'Scale init from cache must include one of: "name" or "factors"')
+
+        if cache_key in cached_scales:
+            return cached_scales[cache_key]
+        else:
+            scale_obj = Scale(name=name, factors=factors)
+            if _settings.DYNAMIC_CACHING:
+                factors_key = (None, ScaleCatalogue._factors_key(scale_obj.factors.items(), scale_obj.factors.chromatic))
+                if factors_key in cached_scales:
+                    # the same scale already exists under another name or spelling:
+                    scale_obj = cached_scales[factors_key]
+                else:
+                    log(f'Registering scale by key {factors_key} to cache')
+                    cached_scales[factors_key] = scale_obj
+                cached_scales[cache_key] = scale_obj
+            return scale_obj
 
     def which_intervals_chromatic(self):
         """returns a boolean list of the same length as self.intervals,
@@ -1201,12 +1228,8 @@ class Scale:
         """returns True if this scale's intervals all occur in the intervals
         of some other desired scale, and False otherwise"""
         if type(other) is not Scale:
-            other = Scale(other)
-        for iv in self.intervals:
-            if iv not in other.intervals:
-                # n.b. this double loop is O(2N) and could probably be optimised if necessary
-                return False
-        return True
+            other = Scale.from_cache(other)
+        return is_submask(self.intervals.pitch_class_mask, other.intervals.pitch_class_mask)
 
     def find_possible_parent_scale_names(self, of_length=None):
         """returns a list of the names of scales that this Scale object
@@ -1226,33 +1249,34 @@ class Scale:
         else:
             raise ValueError(f"arg 'of_length' must be int, list of ints, or None, but got: {type(of_length)}")
 
-        match_names = []
         for pl in possible_parent_lengths:
             assert len(self) < pl, f"{self.name} can have no parent scales of length {pl} because it already has {len(self)} elements"
-            possible_parent_names = canonical_scale_names_by_length[pl]
-            possible_parent_name_intervals = {n:canonical_scale_name_intervals[n] for n in possible_parent_names}
-            for p_name, p_intervals in possible_parent_name_intervals.items():
-                is_match = True
-                # loop over deg/val pairs in self and check if each has a match in the parent:
-                for iv in self.intervals:
-                    if iv not in p_intervals:
-                        is_match = False
-                        break
-                if is_match:
-                    match_names.append(p_name)
-        return match_names
+        # parent must contain every interval in self:
+        return scale_catalogue().superscale_names(self.intervals.pitch_class_mask, length=possible_parent_lengths)
     @property
     def possible_parent_scale_names(self):
         return self.find_possible_parent_scale_names()
 
+    def find_possible_subscale_names(self, of_length=None):
+        """inverse of find_possible_parent_scale_names: returns a list of the names
+        of scales that could be strict subscales of this Scale object.
+        arg 'of_length' is an int or list/range of ints as in that method,
+            or if None (default), returns any scales shorter than this scale."""
+        if of_length is None:
+            of_length = range(5, len(self))
+        # subscale must not contain any interval that is not in self:
+        return scale_catalogue().subscale_names(self.intervals.pitch_class_mask, length=of_length)
+    @property
+    def possible_subscale_names(self):
+        return self.find_possible_subscale_names()
+
     def find_possible_parent_scales(self, heptatonic_only=False):
         """returns a list of Scale objects that this Scale object could be
         a strict subscale of."""
-        # just wraps around possible_parent_scale_names but casts the results
-        # to Scale objects:
-        parent_names = self.possible_parent_scale_names(heptatonic_only=heptatonic_only)
-        parent_scales = [Scale(n) for n in parent_names]
-        return parent_scales
+        # just wraps around find_possible_parent_scale_names but returns
+        # the scale catalogue's Scale objects:
+        parent_names = self.find_possible_parent_scale_names(of_length=7 if heptatonic_only else None)
+        return scale_catalogue().scales_named(parent_names)
     @property
     def possible_parent_scales(self):
         return self.find_possible_parent_scales()
@@ -1262,22 +1286,22 @@ class Scale:
             and False otherwise.
         the 'other' arg is cast to Scale if it is not already one."""
         if type(other) is not Scale:
-            other = Scale(other)
+            other = Scale.from_cache(other)
 
         if self.factors == other.factors:
             return True # trivial case 1
         elif len(self) != len(other):
             return False # trivial case 2
+        elif len(mask_transpositions(self.intervals.pitch_class_mask, other.intervals.pitch_class_mask)) == 0:
+            return False # no rotation of the other scale's intervals matches ours
         else:
             return self in other.modes
 
 
     #### audio/guitar-related methods:
 
-    def play(self, on='G3', up=True, down=True, **kwargs):
-        ## if duration is not set, use a smaller default duration than that for chords:
-        if 'duration' not in kwargs:
-            kwargs['duration'] = 0.5
+    def _played_notes(self, on='G3', up=True, down=True):
+        """the NoteList played by Scale.play, running up and/or down from the note 'on'"""
         # Scales don't have tonics, but we can just pick one arbitrarily:
         starting_note = notes.OctaveNote(on)
         assert up or down, "Scale must be played up or down or both, but not neither"
@@ -1286,7 +1310,27 @@ class Scale:
         full_notes = notes_up if up else notes.NoteList([notes_up[-1]], strip_octave=False)
         if down:
             full_notes.extend(notes_down)
-        full_notes.play(**kwargs)
+        return full_notes
+
+    def play(self, on='G3', up=True, down=True, **kwargs):
+        ## if duration is not set, use a smaller default duration than that for chords:
+        if 'duration' not in kwargs:
+            kwargs['duration'] = 0.5
+        self._played_notes(on, up, down).play(**kwargs)
+
+    def render(self, path=None, on='G3', up=True, down=True, **kwargs):
+        """returns the audio that Scale.play would play as a float32 buffer,
+        and writes it to a WAV file if path is given (see NoteList.render)"""
+        if 'duration' not in kwargs:
+            kwargs['duration'] = 0.5
+        return self._played_notes(on, up, down).render(path, **kwargs)
+
+    def to_midi(self, path=None, on='G3', up=True, down=True, **kwargs):
+        """exports the notes that Scale.play would play as a MIDI file
+        (or returns its bytes if no path is given; see NoteList.to_midi)"""
+        if 'duration' not in kwargs:
+            kwargs['duration'] = 0.5
+        return self._played_notes(on, up, down).to_midi(path, **kwargs)
 
     def show(self, tuning='EADGBE', **kwargs):
         """just a wrapper around the Guitar.show method, which is generic to most musical classes,
@@ -2593,6 +2637,9 @@ for fac,name in canonical_scale_factor_names.items():
 canonical_scale_name_factors = reverse_dict(canonical_scale_factor_names)
 canonical_scale_name_intervals = reverse_dict(canonical_scale_interval_names)
 canonical_scale_alias_names = unpack_and_reverse_dict(canonical_scale_name_aliases, include_keys=True)
+# pitch class bitmasks of each scale's full intervals (diatonic and chromatic), for fast subset checks:
+canonical_scale_name_masks = {name: (fiv.pitch_class_mask | (civ.pitch_class_mask if civ is not None else 0))
+                                for name, (fiv,civ) in canonical_scale_name_intervals.items()}
 
 # mapping of possible scale lengths to lists of scale names which have that length:
 canonical_scale_names_by_length = {}
@@ -2707,32 +2754,223 @@ canonical_scale_names_by_rarity[5] = {n for n in canonical_scale_name_factors if
 canonical_scale_names_by_rarity[6] = {n for n in canonical_scale_name_factors if contains_accidental(n)}
 
 
+#### canonical scale catalogue:
+# a single columnar table of every canonical scale, built lazily from the registration dicts above,
+# with one row per scale and secondary indexes over its columns. sets of rows are stored as
+# integer bitmaps (bit r is set if row r is in the set), so that subscale/superscale/neighbour
+# searches are a few bitwise set operations instead of scans over those dicts.
+class ScaleCatalogue:
+    """column-oriented table of all canonical scales. each column is a list indexed by row:
+        names, factors, masks (12-bit pitch class masks including chromatic intervals),
+        lengths, rarities, consonances, brightnesses, and families (the transposition-normalised
+        mask shared by all modes of a scale, see util.mask_normal_form)."""
+    def __init__(self, scale_name_factors, scale_name_masks, names_by_rarity):
+        # rows are ordered by scale length, and otherwise by order of registration:
+        self.names = sorted(scale_name_factors.keys(), key=lambda n: len(scale_name_factors[n]))
+        self.factors = [scale_name_factors[n] for n in self.names]
+        self.masks = [scale_name_masks[n] for n in self.names]
+        self.lengths = [len(f) for f in self.factors]
+        max_rarity = max(names_by_rarity.keys())
+        self.rarities = [([r for r, names in names_by_rarity.items() if n in names] + [max_rarity + 1])[0]
+                          for n in self.names]
+        self.scales = [Scale.from_cache(n) for n in self.names]
+        self.consonances = [sc.consonance for sc in self.scales]
+        self.brightnesses = [sc.brightness for sc in self.scales]
+        self.families = [mask_normal_form(m)[0] for m in self.masks]
+
+        # secondary indexes, mapping each column value to a bitmap of the rows that have it:
+        self.rows = (1 << len(self.names)) - 1
+        self.row_by_name = {n: r for r, n in enumerate(self.names)}
+        self.row_by_factors = {self._factors_key(f.items(), f.chromatic): r for r, f in enumerate(self.factors)}
+        self.rows_by_length = self._index(self.lengths)
+        self.rows_by_rarity = self._index(self.rarities)
+        self.rows_by_family = self._index(self.families)
+        # the rows whose masks do and do not contain each pitch class:
+        self.rows_with_pitch_class = {pc: sum([1 << r for r, m in enumerate(self.masks) if m & (1 << pc)]) for pc in range(12)}
+        self.rows_without_pitch_class = {pc: self.rows & ~self.rows_with_pitch_class[pc] for pc in range(12)}
+        self._mode_rows = None # mode family graph, built on first use
+
+    def _index(self, column):
+        index = {}
+        for r, value in enumerate(column):
+            index[value] = index.get(value, 0) | (1 << r)
+        return index
+
+    @staticmethod
+    def _factors_key(items, chromatic=None):
+        """hashable key of a scale's degrees and chromatic degrees, which is much
+        cheaper to look up than a ScaleFactors object (which hashes by its string)"""
+        return (frozenset(items), frozenset(chromatic.items()) if chromatic is not None else None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.row_by_name
+
+    def row(self, name):
+        """returns a dict of the column values for the named canonical scale"""
+        r = self.row_by_name[name]
+        return {'name': self.names[r], 'factors': self.factors[r], 'mask': self.masks[r],
+                'length': self.lengths[r], 'rarity': self.rarities[r], 'consonance': self.consonances[r],
+                'brightness': self.brightnesses[r], 'family': self.families[r]}
+
+    def query(self, length=None, rarity=None, family=None, contains=None, within=None):
+        """returns the bitmap of rows matching every given condition:
+            length, rarity and family must match exactly (or be in a given list/set/range of values),
+            contains is a pitch class mask that the scale must include, and
+            within is a pitch class mask that must include the scale.
+        use .names_of(rows) to turn the result into a list of scale names."""
+        rows = self.rows
+        for index, value in [(self.rows_by_length, length), (self.rows_by_rarity, rarity), (self.rows_by_family, family)]:
+            if value is not None:
+                values = value if isinstance(value, (list, tuple, set, range)) else [value]
+                value_rows = 0
+                for v in values:
+                    value_rows |= index.get(v, 0)
+                rows &= value_rows
+        if contains is not None:
+            for pc in mask_values(contains):
+                rows &= self.rows_with_pitch_class[pc]
+        if within is not None:
+            for pc in mask_values(chromatic_mask & ~within):
+                rows &= self.rows_without_pitch_class[pc]
+        return rows
+
+    def names_of(self, rows):
+        """the names of a bitmap of rows, in catalogue order"""
+        names = []
+        while rows:
+            lowest = rows & -rows
+            names.append(self.names[lowest.bit_length() - 1])
+            rows ^= lowest
+        return names
+
+    def scales_named(self, names):
+        """the catalogue's Scale objects for a list of canonical scale names"""
+        return [self.scales[self.row_by_name[n]] for n in names]
+
+    @property
+    def mode_rows(self):
+        """the mode family graph: a list that links each row to the tuple of rows of
+        its modes (from mode 1 upwards), or None for modes that are not canonical scales.
+        rows in the same family share the same value in the families column."""
+        if self._mode_rows is None:
+            self._mode_rows = []
+            for r, factors in enumerate(self.factors):
+                if len(factors) < 8:
+                    modes = scale_modes(factors)
+                    mode_keys = [self._factors_key(m.factors.items(), m.factors.chromatic) if m is not None else None for m in modes]
+                    self._mode_rows.append(tuple([self.row_by_factors.get(k) for k in mode_keys]))
+                else:
+                    self._mode_rows.append((r,))
+        return self._mode_rows
+
+    def mode_names(self, name):
+        """the names of the canonical scales that are modes of the named scale"""
+        return [self.names[r] for r in self.mode_rows[self.row_by_name[name]][1:] if r is not None]
+
+    def superscale_names(self, mask, length=None):
+        """names of the scales that contain every pitch class in mask"""
+        return self.names_of(self.query(length=length, contains=mask))
+
+    def subscale_names(self, mask, length=None):
+        """names of the scales whose pitch classes all occur in mask"""
+        return self.names_of(self.query(length=length, within=mask))
+
+    def neighbour_factors(self, factors, ignore_chromatic=True):
+        """returns the factors of the scales that differ from the given ScaleFactors by one accidental
+        on one of its degrees (other than the tonic), i.e. by sharpening or flattening a natural,
+        or by naturalising a sharp or flat. if not ignore_chromatic, neighbours must
+        also share the chromatic intervals of these factors."""
+        chromatic = None if ignore_chromatic else factors.chromatic
+        neighbours = []
+        for f, val in factors.items():
+            if f != 1:
+                for v in ([-1, 1] if val == 0 else [0]):
+                    new_items = dict(factors)
+                    new_items[f] = v
+                    if (8 in new_items) and new_items[8] == 0:
+                        del new_items[8] # as in ScaleFactors.__init__
+                    r = self.row_by_factors.get(self._factors_key(new_items.items(), chromatic))
+                    if r is not None:
+                        neighbours.append(self.factors[r])
+        return neighbours
+
+    def show(self, rows=None):
+        """prints the catalogue (or some bitmap of its rows) as a table"""
+        from .display import DataFrame # lazy import
+        df = DataFrame(['Scale', 'Len', 'Rarity', 'Cons.', 'Bright.', 'Family'])
+        for r in range(len(self)):
+            if rows is not None and not (rows >> r) & 1:
+                continue
+            df.append([self.names[r], self.lengths[r], self.rarities[r], self.consonances[r],
+                       self.brightnesses[r], bin(self.families[r])[2:].zfill(12)[::-1]])
+        df.show(margin=' ')
+
+    def __repr__(self):
+        return f'ScaleCatalogue({len(self)} scales)'
+
+_scale_catalogue = None
+
+def scale_catalogue():
+    """returns the ScaleCatalogue of all canonical scales, building it on first use"""
+    global _scale_catalogue
+    if _scale_catalogue is None:
+        _scale_catalogue = ScaleCatalogue(canonical_scale_name_factors, canonical_scale_name_masks,
+                                          canonical_scale_names_by_rarity)
+    return _scale_catalogue
+
+
+# memoized mode rotations: maps the factors of a scale to the tuple of its modes as Scale
+# objects, so that Scale.mode, get_modes and is_mode_of do not recompute rotations and
+# reconstruct Scales every time they are called on the same scale:
+cached_scale_modes = Cache('scale_modes')
+
+def scale_modes(factors):
+    """returns the tuple of Scale objects that are modes 1 to N of the scale with the given
+    ScaleFactors, where N is its order. (None in place of any mode that cannot be rotated to)"""
+    key = ScaleCatalogue._factors_key(factors.items(), factors.chromatic)
+    if key in cached_scale_modes:
+        return cached_scale_modes[key]
+    modes = [Scale.from_cache(factors=factors)]
+    for N in range(2, len(factors)+1):
+        try:
+            modes.append(Scale.from_cache(factors=factors.mode(N)))
+        except Exception:
+            # Scale.mode raises the error itself if this mode is asked for
+            modes.append(None)
+    modes = tuple(modes)
+    cached_scale_modes[key] = modes
+    return modes
+
 # initialise empty caches:
-cached_consonances = {}
-cached_pentatonics = {}
-cached_scale_chords = {}
+cached_scales = Cache('scales')
+cached_consonances = Cache('scale_consonances')
+cached_pentatonics = Cache('pentatonics')
+cached_scale_chords = Cache('scale_chords')
 
 # pre-initialised scales for efficient import by other modules instead of re-init:
-NaturalMajor = MajorScale = Ionian = IonianScale = Scale('major')
-Dorian = DorianScale = Scale('dorian')
-Phrygian = PhrygianScale = Scale('phrygian')
-Lydian = LydianScale = Scale('lydian')
-Mixolydian = MixolydianScale = Scale('mixolydian')
-NaturalMinor = MinorScale = Aeolian = AeolianScale = Scale('minor')
-Locrian = LocrianScale = Scale('locrian')
-
-HarmonicMinor = HarmonicMinorScale = Scale('harmonic minor')
-HarmonicMajor = HarmonicMajorScale = Scale('harmonic major')
-MelodicMinor = MelodicMinorScale = Scale('melodic minor')
-MelodicMajor = MelodicMajorScale = Scale('melodic major')
-
-RockMinor = RockMinorScale = Scale('rock minor')
-RockMajor = RockMajorScale = Scale('rock major')
-
-ExtendedMinor = ExtendedMinorScale = Scale('extended minor')
-FullMinor = FullMinorScale = Scale('full minor')
-ExtendedMajor = ExtendedMajorScale = Scale('extended major')
-FullMajor = FullMajorScale = Scale('full major')
+NaturalMajor = MajorScale = Ionian = IonianScale = Scale.from_cache('major')
+Dorian = DorianScale = Scale.from_cache('dorian')
+Phrygian = PhrygianScale = Scale.from_cache('phrygian')
+Lydian = LydianScale = Scale.from_cache('lydian')
+Mixolydian = MixolydianScale = Scale.from_cache('mixolydian')
+NaturalMinor = MinorScale = Aeolian = AeolianScale = Scale.from_cache('minor')
+Locrian = LocrianScale = Scale.from_cache('locrian')
+
+HarmonicMinor = HarmonicMinorScale = Scale.from_cache('harmonic minor')
+HarmonicMajor = HarmonicMajorScale = Scale.from_cache('harmonic major')
+MelodicMinor = MelodicMinorScale = Scale.from_cache('melodic minor')
+MelodicMajor = MelodicMajorScale = Scale.from_cache('melodic major')
+
+RockMinor = RockMinorScale = Scale.from_cache('rock minor')
+RockMajor = RockMajorScale = Scale.from_cache('rock major')
+
+ExtendedMinor = ExtendedMinorScale = Scale.from_cache('extended minor')
+FullMinor = FullMinorScale = Scale.from_cache('full minor')
+ExtendedMajor = ExtendedMajorScale = Scale.from_cache('extended major')
+FullMajor = FullMajorScale = Scale.from_cache('full major')
 
 # pre-packaged scale lists:
 natural_scales = [MajorScale, MinorScale]
@@ -2768,10 +3006,10 @@ scale_contractions = {ExtendedMinor: NaturalMinor,
 searchable_heptatonics = diatonic_scales + harmonic_scales + melodic_scales
 extended_searchable_heptatonics = searchable_heptatonics + extended_scales
 
-MajorPentatonic = MajorPentatonicScale = MajorPent = MajPent = Scale('major pentatonic')
-MinorPentatonic = MinorPentatonicScale = MinorPent = MinPent = Scale('minor pentatonic')
-MajorBlues = MajorBluesScale = MajBlues = Scale('major blues')
-MinorBlues = MinorBluesScale = MinBlues = Scale('minor blues')
+MajorPentatonic = MajorPentatonicScale = MajorPent = MajPent = Scale.from_cache('major pentatonic')
+MinorPentatonic = MinorPentatonicScale = MinorPent = MinPent = Scale.from_cache('minor pentatonic')
+MajorBlues = MajorBluesScale = MajBlues = Scale.from_cache('major blues')
+MinorBlues = MinorBluesScale = MinBlues = Scale.from_cache('minor blues')
 
 pentatonic_scales = [MajorPentatonic, MinorPentatonic]
 blues_scales = [MajorBlues, MinorBlues]
@@ -2804,9 +3042,9 @@ parallel_scale_names = {
 common_base_scale_names = base_scale_names.intersection(common_scale_names)
 
 # this list is important: it's the scales that get searched for matching_keys
-common_base_scales = [Scale(n) for n in common_base_scale_names]
+common_base_scales = [Scale.from_cache(n) for n in common_base_scale_names]
 
-common_modes = [Scale(n) for n in common_scale_names if n not in common_base_scale_names]
+common_modes = [Scale.from_cache(n) for n in common_scale_names if n not in common_base_scale_names]
 common_scales = list(common_base_scales) + list(common_modes)
 common_scales_by_name = {scale.name : scale for scale in common_scales} # for fast access
 
@@ -2819,7 +3057,7 @@ for name, scale in zip(common_base_scale_names, common_base_scales):
             parallel_scale_names[name] = most_consonant_mode.name
 
 # instantiate objects:
-parallel_scales = {Scale(p1): Scale(p2) for p1, p2 in parallel_scale_names.items()}
+parallel_scales = {Scale.from_cache(p1): Scale.from_cache(p2) for p1, p2 in parallel_scale_names.items()}
 # parallel scales are symmetric, so include the reverse mappings as well:
 parallel_scale_names.update(reverse_dict(parallel_scale_names))
 parallel_scales.update(reverse_dict(parallel_scales))
@@ -2827,13 +3065,140 @@ parallel_scales.update(reverse_dict(parallel_scales))
 
 
 
+# the scales that matching_scales considers by default:
+default_candidate_scales = [MajorScale, MinorScale,
+                            HarmonicMinor, MelodicMinor, ExtendedMinor, FullMinor,
+                            HarmonicMajor, MelodicMajor, ExtendedMajor, FullMajor,
+                            Lydian, Mixolydian, # note! these are the scales corresponding to adjacent major keys on the circle of fifths
+                            Dorian, Phrygian, # and these correspond to adjacent Co5 scales for minor keys
+                            Locrian]  # just for completeness although it will rarely turn up in practice
+
+# (candidates x 12) grids of which semitones are in each scale of a list of candidate scales,
+# keyed by the candidates' pitch class masks (since hashing Scales themselves is relatively slow):
+cached_candidate_grids = Cache('scale_candidate_grids')
+
+def candidate_interval_grid(candidate_scales):
+    """returns a (candidates x 12) numpy array, with 1 where each candidate scale
+    contains the interval of that many semitones and 0 where it does not,
+    along with the list of (base index, extension index) pairs of candidates
+    that are related as in scale_extensions"""
+    import numpy as np # lazy import
+    key = tuple([cand.pitch_class_mask for cand in candidate_scales])
+    if key in cached_candidate_grids:
+        return cached_candidate_grids[key]
+    grid = np.asarray([[1  if i in cand else 0  for i in range(12)] for cand in candidate_scales])
+    grid.setflags(write=False) # (since it is shared through the cache)
+    candidate_idxs = {cand: i for i, cand in enumerate(candidate_scales)}
+    extension_pairs = [(candidate_idxs[base_scale], candidate_idxs[ext_scale])
+                       for base_scale, ext_scale in scale_extensions.items()
+                       if base_scale in candidate_idxs and ext_scale in candidate_idxs]
+    cached_candidate_grids[key] = grid, extension_pairs
+    return grid, extension_pairs
+
+def interval_row(intervals):
+    """returns a length-12 list with 1 for each semitone in an IntervalList and 0 otherwise"""
+    return [1  if i in intervals else 0  for i in range(12)]
+
+def score_candidate_grid(candidate_grid, input_rows):
+    """scores every (input, candidate) pair at once, for a (candidates x 12) candidate grid
+    and an (inputs x 12) array of input interval rows, and returns a pair of
+    (inputs x candidates) arrays of recall and precision scores"""
+    import numpy as np # lazy import
+    difference = candidate_grid[None,:,:] - np.asarray(input_rows)[:,None,:]
+    # here 0s are matches, 1s are where input not in candidate, -1s are mismatches
+    # or to put another way: (0,-1) are retrieved, (0) are relevant
+    matches = np.sum(difference == 0, axis=2)
+    spares = np.sum(difference == 1, axis=2)
+    num_retrieved = matches + spares
+    num_relevant = matches
+    # somewhere these became backwards relative to matching_keys etc...
+    rec, prec = precision_recall_scores(num_retrieved, num_relevant, 12, 12)
+    return np.round(rec, 3), np.round(prec, 3)
+
+def rank_candidate_scores(candidate_scales, extension_pairs, recalls, precisions,
+                          min_recall=0.85, min_precision=0.0, filter_redundancies=True):
+    """accepts a list of candidate scales and their recall and precision scores against some input,
+    filters and sorts them as described in matching_scales, and returns a dict mapping
+    the remaining candidates to their scores"""
+    recalls, precisions = list(recalls), list(precisions)
+    keep = [True] * len(candidate_scales)
+
+    # filter out extensions that are less precise than their bases
+    if filter_redundancies:
+        # (i.e. no need for extended minor if natural minor is a perfect fit,
+        # and likewise no need for full minor if extended minor is a perfect fit)
+        ### TBI: could this be generalised with Scale.is_subset type methods instead of hardcoding?
+        for base_idx, ext_idx in extension_pairs:
+            if precisions[base_idx] >= precisions[ext_idx]:
+                keep[ext_idx] = False
+
+    # filter scores by minimum precision:
+    kept_idxs = [i for i in range(len(candidate_scales))
+                 if keep[i] and recalls[i] >= min_recall and precisions[i] >= min_precision]
+
+    sorted_idxs = sorted(kept_idxs, key=lambda i: (-recalls[i], -precisions[i]))
+    return {candidate_scales[i]: {'precision': float(precisions[i]), 'recall': float(recalls[i])}
+            for i in sorted_idxs}
+
+def degree_chord_intervals(chords, major_roots=None):
+    """parses the 'chords' arg of matching_scales (see below), and returns a tuple of:
+    the root degree and AbstractChord of each chord, the resolved major_roots flag,
+    the interval from the tonic to each chord's root, and the IntervalList of
+    unique intervals from the tonic to all the chords' notes"""
+    split_numerals = None
+    if isinstance(chords, str):
+        # assume a string of roman numerals:
+        split_numerals = auto_split(chords)
+    elif isinstance(chords[0], str):
+        # assume a list of roman numerals
+        split_numerals = chords
+    else:
+        # assume degree, chord pairs
+        assert len(chords[0]) == 2, "expected input to matching_scales to be roman numerals or list of (degree, abs_chord) pairs"
+
+    if split_numerals is not None:
+        degrees, abs_chords = [], []
+        for num in split_numerals:
+            rn = RomanNumeral(num)
+            deg, ch = rn.degree, rn.chord
+            degrees.append(deg)
+            abs_chords.append(ch)
+    else:
+        degrees = [d for d,ch in chords]
+        abs_chords = [ch for d,ch in chords]
+
+    # determine if numeral degrees are relative to major or minor scale:
+    if (split_numerals is not None) and (major_roots is None):
+        # if any roots are flattened (e.g. bIII), we assume that those flats are relative to major scale:
+        contains_flats = True in [parsing.contains_flat(num) for num in split_numerals]
+        if contains_flats:
+            major_roots = True
+    if major_roots is None:
+        # otherwise, try and guess from tonic if present:
+        if 1 in degrees:
+            which_1 = [i for i,d in enumerate(degrees) if d==1][0]
+            tonic_chord = abs_chords[which_1]
+            major_roots = not tonic_chord.quality.minor_ish # assume major for maj/aug/ind tonic chords
+        else:
+            major_roots = True # assume major since not otherwise specified
+
+    # determine intervals to match against
+    # how far does each chord start from the scale tonic:
+    if major_roots:
+        root_intervals_from_tonic = [MajorScale._get_arbitrary_degree_interval(d) for d in degrees]
+    else:
+        root_intervals_from_tonic = [MinorScale._get_arbitrary_degree_interval(d) for d in degrees]
+    # how far is each note in each chord from the scale tonic:
+    all_intervals_from_tonic = IntervalList()
+    for ch, root_iv in zip(abs_chords, root_intervals_from_tonic):
+        chord_intervals_from_tonic = ch.intervals + root_iv
+        all_intervals_from_tonic.extend(chord_intervals_from_tonic.flatten())
+
+    unique_intervals_from_tonic = IntervalList(all_intervals_from_tonic.flatten().unique())
+    return degrees, abs_chords, major_roots, root_intervals_from_tonic, unique_intervals_from_tonic
+
 def matching_scales(chords=None, intervals=None, major_roots=None, min_recall=0.85, min_precision=0.0,
-                    candidate_scales = [MajorScale, MinorScale,
-                                        HarmonicMinor, MelodicMinor, ExtendedMinor, FullMinor,
-                                        HarmonicMajor, MelodicMajor, ExtendedMajor, FullMajor,
-                                        Lydian, Mixolydian, # note! these are the scales corresponding to adjacent major keys on the circle of fifths
-                                        Dorian, Phrygian, # and these correspond to adjacent Co5 scales for minor keys
-                                        Locrian],  # just for completeness although it will rarely turn up in practice
+                    candidate_scales = default_candidate_scales,
                     filter_redundancies = True,
                     max_results=None, display=True, **kwargs):
     """accepts either:
@@ -2862,44 +3227,7 @@ def matching_scales(chords=None, intervals=None, major_roots=None, min_recall=0.
         chords = None
 
     if chords is not None:
-        if isinstance(chords, str):
-            # assume a string of roman numerals:
-            split_numerals = auto_split(chords)
-            roman = True
-        elif isinstance(chords[0], str):
-            # assume a list of roman numerals
-            split_numerals = chords
-            roman = True
-        else:
-            # assume degree, chord pairs
-            assert len(chords[0]) == 2, "expected input to matching_scales to be roman numerals or list of (degree, abs_chord) pairs"
-            roman = False
-
-        if roman:
-            degrees, abs_chords = [], []
-            for num in split_numerals:
-                rn = RomanNumeral(num)
-                deg, ch = rn.degree, rn.chord
-                degrees.append(deg)
-                abs_chords.append(ch)
-        else:
-            degrees = [d for d,ch in chords]
-            abs_chords = [ch for d,ch in chords]
-
-        # determine if numeral degrees are relative to major or minor scale:
-        if roman and (major_roots is None):
-            # if any roots are flattened (e.g. bIII), we assume that those flats are relative to major scale:
-            contains_flats = True in [parsing.contains_flat(num) for num in split_numerals]
-            if contains_flats:
-                major_roots = True
-        if major_roots is None:
-            # otherwise, try and guess from tonic if present:
-            if 1 in degrees:
-                which_1 = [i for i,d in enumerate(degrees) if d==1][0]
-                tonic_chord = abs_chords[which_1]
-                major_roots = not tonic_chord.quality.minor_ish # assume major for maj/aug/ind tonic chords
-            else:
-                major_roots = True # assume major since not otherwise specified
+        degrees, abs_chords, major_roots, root_intervals_from_tonic, unique_intervals_from_tonic = degree_chord_intervals(chords, major_roots)
 
         if display: # expensively work out roman numerals of those pairs for table output
             root_scale = MajorScale if major_roots else MinorScale
@@ -2908,88 +3236,22 @@ def matching_scales(chords=None, intervals=None, major_roots=None, min_recall=0.
             scale_chords = [ch.in_scale(root_scale, degree=d) for d,ch in zip(degrees, abs_chords)]
             simple_numerals = [sch.simple_numeral for sch in scale_chords]
             mod_numerals = [sch.mod_numeral for sch in scale_chords]
-
-        # determine intervals to match against
-        # how far does each chord start from the scale tonic:
-        if major_roots:
-            root_intervals_from_tonic = [MajorScale._get_arbitrary_degree_interval(d) for d in degrees]
-            minor_assumed = False
-        else:
-            root_intervals_from_tonic = [MinorScale._get_arbitrary_degree_interval(d) for d in degrees]
-            minor_assumed = (3 in degrees or 6 in degrees or 7 in degrees)
-        # how far is each note in each chord from the scale tonic:
-        all_intervals_from_tonic = IntervalList()
-        for ch, root_iv in zip(abs_chords, root_intervals_from_tonic):
-            chord_intervals_from_tonic = ch.intervals + root_iv
-            all_intervals_from_tonic.extend(chord_intervals_from_tonic.flatten())
-
-        unique_intervals_from_tonic = IntervalList(all_intervals_from_tonic.flatten().unique())
+            minor_assumed = (not major_roots) and (3 in degrees or 6 in degrees or 7 in degrees)
 
     elif intervals is not None:
         # cast to IntervalList object if needed:
         intervals = IntervalList(intervals) if not isinstance(intervals, IntervalList) else intervals
         unique_intervals_from_tonic = intervals.unique()
 
-
-    # main matching loop
-    import numpy as np
-    candidate_interval_grid = np.zeros((len(candidate_scales), 12))
-    for i, cand in enumerate(candidate_scales):
-        grid_row = [1  if i in cand else 0  for i in range(12) ]
-        candidate_interval_grid[i] = grid_row
-    input_intervals_set = unique_intervals_from_tonic
-    input_interval_row = np.asarray([1  if i in input_intervals_set else 0  for i in range(12) ])
-
-    perfect_matches = []
-    candidate_scores = {}
-    for i, cand in enumerate(candidate_scales):
-        cand_interval_row = candidate_interval_grid[i]
-        difference = cand_interval_row - input_interval_row
-        # here 0s are matches, 1s are where input not in candidate, -1s are mismatches
-        # or to put another way: (0,-1) are retrieved, (0) are relevant
-        mismatches  = sum([d == -1 for d in difference])
-        # a 'perfect' match can be partial, it simply has no mismatches:
-        if mismatches == 0:
-            perfect_matches.append(cand)
-        # scores:
-        matches = sum([d == 0 for d in difference])
-        spares = sum([d == 1 for d in difference])
-        num_retrieved = matches + spares
-        num_relevant = matches
-        rec, prec = precision_recall_scores(num_retrieved, num_relevant, 12, 12)
-        # somewhere these became backwards relative to matching_keys etc...
-        score = {'precision': round(prec,3), 'recall': round(rec,3)}
-        candidate_scores[cand] = score
-
-    # filter out extensions that are less precise than their bases
-    if filter_redundancies:
-        redundant_scales = []
-        for base_scale, ext_scale in scale_extensions.items():
-            # (i.e. no need for extended minor if natural minor is a perfect fit,
-            # and likewise no need for full minor if extended minor is a perfect fit)
-            ### TBI: could this be generalised with Scale.is_subset type methods instead of hardcoding?
-            if base_scale in candidate_scores and ext_scale in candidate_scores:
-                base_prec, ext_prec = candidate_scores[base_scale]['precision'], candidate_scores[ext_scale]['precision']
-                if base_prec >= ext_prec:
-                    redundant_scales.append(ext_scale)
-        candidate_scores = {cand:score for cand,score in candidate_scores.items()
-                            if cand not in redundant_scales}
-
-
-    # filter scores by minimum precision:
-    if min_recall > 0 or min_precision > 0:
-        candidate_scores = {cand:score for cand,score in candidate_scores.items()
-                            if score['recall'] >= min_recall
-                            and score['precision'] >= min_precision}
-
-    sorted_cands = sorted(candidate_scores.keys(),
-                          key=lambda x: (-candidate_scores[x]['recall'],
-                                         -candidate_scores[x]['precision']))
-    sorted_scores = {cand:candidate_scores[cand] for cand in sorted_cands}
+    # score every candidate at once:
+    candidate_grid, extension_pairs = candidate_interval_grid(candidate_scales)
+    recalls, precisions = score_candidate_grid(candidate_grid, [interval_row(unique_intervals_from_tonic)])
+    sorted_scores = rank_candidate_scores(candidate_scales, extension_pairs, recalls[0].tolist(), precisions[0].tolist(),
+                                          min_recall, min_precision, filter_redundancies)
 
     # return matches and scores
     if not display:
-        return {cand: candidate_scores[cand] for cand in sorted_cands}
+        return sorted_scores
     else:
         from .display import DataFrame
 
@@ -3048,10 +3310,118 @@ def matching_scales(chords=None, intervals=None, major_roots=None, min_recall=0.
         df.show(max_rows=max_results, margin=' ', **kwargs)
 
 
+def batch_matching_scales(inputs, major_roots=None, min_recall=0.85, min_precision=0.0,
+                          candidate_scales=default_candidate_scales, filter_redundancies=True):
+    """batch form of matching_scales(display=False), for many inputs at once:
+    accepts a list whose items are each either an IntervalList (or list of Intervals/ints),
+    or chords in any of the forms accepted by matching_scales, e.g. 'i - V7 - VII'.
+    every input is scored against every candidate scale in a single array operation,
+    and a list is returned of the dict of matching scales and scores for each input."""
+    input_rows = []
+    for item in inputs:
+        if isinstance(item, IntervalList) or (not isinstance(item, str) and isinstance(item[0], (int, Interval))):
+            unique_intervals = IntervalList(item).unique()
+        else:
+            unique_intervals = degree_chord_intervals(item, major_roots)[-1]
+        input_rows.append(interval_row(unique_intervals))
+    if len(input_rows) == 0:
+        return []
+    candidate_grid, extension_pairs = candidate_interval_grid(candidate_scales)
+    recalls, precisions = score_candidate_grid(candidate_grid, input_rows)
+    return [rank_candidate_scores(candidate_scales, extension_pairs, rec, prec, min_recall, min_precision, filter_redundancies)
+            for rec, prec in zip(recalls.tolist(), precisions.tolist())]
+
 # print('')
 # degree_chord_pairs = [(1, AbstractChord('min')), (5, AbstractChord('7')), (7, AbstractChord('maj'))]
 # matching_scales(degree_chord_pairs, major_roots=True)
 
+#### table of valid chords on each scale degree, for Scale.valid_chords_on:
+# every registered chord (and each of its inversions, and its no5 version if it has one)
+# gets an integer id, in the order that valid_chords_on considers them. then the chords that fit
+# on a degree of a scale are stored as an array of ids, keyed by
+# (scale interval mask, chromatic interval mask, degree, inversions, no5s).
+# the table is filled lazily, and can be saved to (and is loaded from) an on-disk snapshot.
+valid_chord_table = Cache('valid_chords')
+_valid_chord_candidates = None
+_valid_chord_consonances = {} # consonance of each candidate, by temperament
+_valid_chord_table_loaded = False
+
+def valid_chord_candidates():
+    """returns a dict describing every candidate chord considered by valid_chords_on, as:
+    'ids': list of (chord name, inversion, no5) tuples, whose index is the id of each candidate
+        (where the names of no5 versions end in '(no5)'),
+    'chords': list of the corresponding AbstractChords (or None for no5 versions),
+    lists of each candidate's 'orders' and 'likelihoods' (None for no5 versions),
+    and numpy arrays of each candidate's interval 'masks' (see util.value_mask), 'inversions',
+    'no5s' (whether it is a no5 version), and 'no5_ids' (the id of its no5 version, or -1 if it has none)"""
+    global _valid_chord_candidates
+    if _valid_chord_candidates is not None:
+        return _valid_chord_candidates
+    import numpy as np # lazy import
+    ids, chords, no5_ids = [], [], []
+    for rarity, chord_names in chord_names_by_rarity.items():
+        for name in chord_names:
+            base_chord = AbstractChord(factors=chord_names_to_factors[name])
+            for inversion in range(len(chord_names_to_intervals[name])):
+                ids.append((name, inversion, False))
+                chords.append(base_chord if inversion == 0 else AbstractChord(factors=chord_names_to_factors[name], inversion=inversion))
+                no5_ids.append(-1)
+                # also add the no5 version of this chord if it is at least a tetrad (but not for inversions)
+                if (inversion == 0) and (base_chord.order >= 4) and (5 in base_chord):
+                    no5_ids[-1] = len(ids)
+                    ids.append((base_chord.suffix + '(no5)', 0, True))
+                    # (no5 chords are only instantiated when they are needed, because the name that
+                    # a no5 chord displays with can depend on which equivalent no5 chord was created first)
+                    chords.append(None)
+                    no5_ids.append(-1)
+    _valid_chord_candidates = {'ids': ids, 'chords': chords,
+                               'masks': np.array([c.intervals.value_mask if c is not None else 0 for c in chords], dtype=np.int64),
+                               'inversions': np.array([inversion for name, inversion, no5 in ids]),
+                               'orders': [c.order if c is not None else chords[i-1].order - 1 for i, c in enumerate(chords)],
+                               'likelihoods': [c.likelihood if c is not None else None for c in chords],
+                               'no5s': np.array([no5 for name, inversion, no5 in ids]),
+                               'no5_ids': np.array(no5_ids)}
+    return _valid_chord_candidates
+
+def valid_chord_consonances():
+    """returns the list of consonances of each of the valid_chord_candidates
+    (None for no5 versions), in the current consonance temperament"""
+    temperament = tuning.get_temperament('CONSONANCE')
+    if temperament not in _valid_chord_consonances:
+        _valid_chord_consonances[temperament] = [c.consonance if c is not None else None for c in valid_chord_candidates()['chords']]
+    return _valid_chord_consonances[temperament]
+
+def valid_chord_snapshot_key():
+    return snapshots.definitions_hash('_settings', 'util', 'parsing', 'qualities', 'intervals', 'notes', 'chords', 'scales')
+
+def load_valid_chord_table():
+    """fills valid_chord_table from its on-disk snapshot, if there is an up-to-date one
+    (only tried once, the first time the table is needed)"""
+    global _valid_chord_table_loaded
+    if not _valid_chord_table_loaded:
+        _valid_chord_table_loaded = True
+        saved_table = snapshots.load_snapshot('valid_chords', valid_chord_snapshot_key())
+        if saved_table is not None:
+            valid_chord_table.update(saved_table)
+
+def save_valid_chord_table():
+    """writes the current contents of valid_chord_table to an on-disk snapshot"""
+    load_valid_chord_table() # (so that we add to a saved table rather than replacing it)
+    return snapshots.save_snapshot('valid_chords', valid_chord_snapshot_key(), dict(valid_chord_table))
+
+def precompute_valid_chords(scales=None, save=True):
+    """fills valid_chord_table for every degree of the given scales (or all the common base scales
+    and their modes, by default), with and without inversions and no5s, and optionally saves it"""
+    if scales is None:
+        scales = {mode for base in common_base_scales for mode in base.get_modes()}
+    for scale in scales:
+        for degree in range(1, len(scale.factors)+1):
+            for inversions in [False, True]:
+                for no5s in [False, True]:
+                    scale._valid_chord_ids(degree, inversions, no5s)
+    if save:
+        save_valid_chord_table()
+
 # cached scale attributes for performance:
 if _settings.PRE_CACHE_SCALES:
     temperament = tuning.get_temperament('CONSONANCE')
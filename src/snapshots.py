@@ -0,0 +1,106 @@
+### on-disk snapshots of expensive module-level tables, like the chord registry,
+### so that importing the library does not have to rebuild them every time.
+
+### each snapshot is stored alongside a hash of the source files that define it
+### (plus any settings that affect it), and is quietly discarded and rebuilt
+### whenever that hash changes, i.e. whenever the definitions are edited.
+
+from . import _settings
+from .util import log
+
+import os
+import sys
+import pickle
+import hashlib
+
+package_dir = os.path.dirname(os.path.abspath(__file__))
+
+def get_snapshot_dir():
+    """returns the directory that snapshots are read from and written to,
+    as specified by _settings.SNAPSHOT_DIR (or a folder inside this package if None)"""
+    if _settings.SNAPSHOT_DIR is not None:
+        return _settings.SNAPSHOT_DIR
+    else:
+        return os.path.join(package_dir, '_snapshots')
+
+def snapshot_path(name):
+    return os.path.join(get_snapshot_dir(), f'{name}.pkl')
+
+def definitions_hash(*module_names, extra=None):
+    """returns a hex digest that identifies the current definitions of the named
+    modules in this package (by their source code), along with any 'extra' object
+    whose repr should also invalidate the snapshot when changed (such as settings)"""
+    hasher = hashlib.sha1()
+    # pickles are not guaranteed to be portable between python versions:
+    hasher.update(f'python {sys.version_info[0]}.{sys.version_info[1]}; pickle {pickle.HIGHEST_PROTOCOL}'.encode())
+    for module_name in module_names:
+        with open(os.path.join(package_dir, f'{module_name}.py'), 'rb') as file:
+            hasher.update(file.read())
+    if extra is not None:
+        hasher.update(repr(extra).encode())
+    return hasher.hexdigest()
+
+def load_snapshot(name, key):
+    """returns the data stored in the named snapshot if it exists and
+    was saved under the same definitions key, or None otherwise"""
+    if not _settings.SNAPSHOT_REGISTRIES:
+        return None
+    path = snapshot_path(name)
+    if not os.path.isfile(path):
+        log(f'No {name} snapshot found at {path}')
+        return None
+    try:
+        with open(path, 'rb') as file:
+            saved_key, data = pickle.load(file)
+    except Exception as e:
+        # corrupted file, or one that refers to classes that no longer exist:
+        log(f'Could not load {name} snapshot from {path} ({type(e).__name__}: {e})')
+        return None
+    if saved_key != key:
+        log(f'{name} snapshot at {path} is out of date, will be rebuilt')
+        return None
+    log(f'Loaded {name} snapshot from {path}')
+    return data
+
+def save_snapshot(name, key, data):
+    """writes data to the named snapshot under the given definitions key.
+    fails quietly (with a log message) if the snapshot dir is not writable,
+    since the library works just as well without snapshots, only slower to import"""
+    if not _settings.SNAPSHOT_REGISTRIES:
+        return False
+    path = snapshot_path(name)
+    # write to a temporary file first and move it into place afterwards,
+    # so that concurrent processes never read a half-written snapshot:
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as file:
+            pickle.dump((key, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except (OSError, pickle.PicklingError) as e:
+        log(f'Could not save {name} snapshot to {path} ({type(e).__name__}: {e})')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    log(f'Saved {name} snapshot to {path}')
+    return True
+
+def clear_snapshots():
+    """deletes all saved snapshots, so that they are rebuilt on next import"""
+    snapshot_dir = get_snapshot_dir()
+    if os.path.isdir(snapshot_dir):
+        for filename in os.listdir(snapshot_dir):
+            if filename.endswith('.pkl'):
+                os.remove(os.path.join(snapshot_dir, filename))
+
+
+if __name__ == '__main__':
+    # build step, e.g. for deployment: 'python -m src.snapshots' writes fresh snapshots.
+    # (by the time this runs, the package has already been imported, which loads
+    # any up-to-date snapshots and rebuilds any stale ones, so we just report on them,
+    # except for lazily-built tables like the valid chords table, which we fill and save here)
+    from . import chords, scales
+    scales.precompute_valid_chords(save=True)
+    for name in ['chords', 'valid_chords']:
+        status = 'ok' if os.path.isfile(snapshot_path(name)) else 'not written'
+        print(f'{name} snapshot: {snapshot_path(name)} ({status})')
@@ -0,0 +1,174 @@
+from ..audio import karplus_strong
+from .testing_tools import compare
+import numpy as np
+import time, sys, os, tempfile, wave
+
+def reference_karplus_strong(freq, duration, wave_table_reso=44100):
+    """the original per-sample implementation of audio.karplus_strong,
+    kept here to check the vectorised version against"""
+    freq = int(round(freq))
+    num_samples = int(duration * wave_table_reso)
+    table_len = int(wave_table_reso // freq)
+    wave_table = (np.random.randint(0, 2, table_len)*2 -1).astype(float)
+
+    pointer = 0
+    samples = np.zeros(num_samples)
+    for i in range(1, num_samples):
+        wave_table[pointer] = ((wave_table[pointer] + samples[i-1]) * 0.5)
+        samples[i] = (wave_table[pointer])
+        pointer = (pointer + 1) % table_len
+    return samples
+
+def unit_test():
+    # vectorised karplus-strong matches the per-sample loop exactly for a fixed seed,
+    # for both long tables (low notes) and short tables (high notes):
+    for freq, duration in [(55, 1), (261.6, 1), (440, 0.5), (3520, 0.5), (30, 0.01)]:
+        np.random.seed(0)
+        expected = reference_karplus_strong(freq, duration)
+        np.random.seed(0)
+        observed = karplus_strong(freq, duration)
+        compare(np.array_equal(observed, expected), True)
+    # including zero-length notes:
+    compare(karplus_strong(3520, 0).shape, (0,))
+
+    # benchmark for a 3-second note:
+    karplus_strong(440, 0.1) # warm up lazy imports
+    for freq in [110, 440, 1760]:
+        start = time.perf_counter()
+        reference_karplus_strong(freq, 3)
+        ref_time = time.perf_counter() - start
+        start = time.perf_counter()
+        karplus_strong(freq, 3)
+        new_time = time.perf_counter() - start
+        print(f'karplus_strong({freq}, 3): {ref_time*1000:.1f}ms per-sample, {new_time*1000:.1f}ms vectorised ({ref_time/new_time:.1f}x speedup)')
+
+    # offline rendering returns float32 buffers and writes WAV files, without a sound device:
+    from ..progressions import ChordProgression
+    from ..scales import Scale
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'prog.wav')
+        buffer = ChordProgression('C F G', key='C').render(path, chord_delay=0.5, duration=1)
+        compare(buffer.dtype, np.float32)
+        with wave.open(path, 'rb') as file:
+            compare((file.getnchannels(), file.getsampwidth(), file.getframerate()), (1, 2, 44100))
+            compare(file.getnframes(), len(buffer))
+
+        path = os.path.join(tmp_dir, 'scale.wav')
+        buffer = Scale('pentatonic').render(path, bit_depth=24, type='fast')
+        with wave.open(path, 'rb') as file:
+            compare((file.getsampwidth(), file.getnframes()), (3, len(buffer)))
+            frames = np.frombuffer(file.readframes(len(buffer)), dtype=np.uint8)
+        # check that the 24-bit samples read back as written (to within rounding):
+        read_back = (frames.reshape(-1,3) @ [1, 2**8, 2**16]).astype(np.int64)
+        read_back[read_back >= 2**23] -= 2**24
+        compare(np.allclose(read_back / (2**23-1), np.clip(buffer, -1, 1), atol=1e-6), True)
+    compare('sounddevice' in sys.modules, False)
+
+    # streaming synthesis mixes events into fixed-size blocks that match the arranged waves:
+    from ..audio import stream_events, write_wav_stream, arrange_melody
+    rng = np.random.default_rng(0)
+    waves = [rng.standard_normal(rng.integers(100, 5000)) for i in range(8)]
+    expected = arrange_melody(waves, delay=0.01, falloff=False)
+    blocks = list(stream_events([(i*int(0.01*44100)/44100, w) for i,w in enumerate(waves)], block_size=256))
+    compare(set([len(b) for b in blocks]), {256})
+    streamed = np.concatenate(blocks)
+    compare(np.allclose(streamed[:len(expected)], expected, atol=1e-6), True)
+    compare(np.all(streamed[len(expected):] == 0), True)
+
+    # including chord progressions, which are synthesised chord by chord:
+    progression = ChordProgression('C F G', key='C')
+    expected = progression.render(chord_delay=0.5, duration=1)
+    streamed = np.concatenate(list(progression.stream(chord_delay=0.5, duration=1)))
+    compare(np.array_equal(streamed[:len(expected)], expected), True)
+
+    # and metronomes, which can also stream endlessly:
+    from ..rhythm import SixEight
+    expected = SixEight.metronome(bars=3)
+    streamed = np.concatenate(list(SixEight.stream(bars=3, block_size=1000)))
+    compare(np.allclose(streamed[:len(expected)], expected, atol=1e-6), True)
+    endless = SixEight.stream(bars=None)
+    for i in range(500):
+        next(endless)
+
+    # blocks can be written straight to file:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'metronome.wav')
+        write_wav_stream(SixEight.stream(bars=3, block_size=1000), path)
+        with wave.open(path, 'rb') as file:
+            compare(file.getnframes(), len(streamed))
+
+    # the sample bank synthesises each pitch once, and serves shorter notes as views of it:
+    from ..audio import synth_wave, wave_bank
+    from ..notes import OctaveNote
+    wave_bank.clear()
+    short = synth_wave(261.63, 2.0, type='KS', falloff=False)
+    longer = OctaveNote('C4')._wave(duration=2.5, type='KS', falloff=False)
+    compare((len(short), len(longer), len(wave_bank)), (88200, 110250, 1))
+    compare(np.shares_memory(short, longer), True)
+    compare(short.flags.writeable, False)
+    # while falloff is applied to a fresh copy:
+    with_falloff = synth_wave(261.63, 2.0, type='KS', falloff=True)
+    compare(np.shares_memory(with_falloff, short), False)
+    compare(np.array_equal(with_falloff[:1000], short[:1000] * np.linspace(1, 0, 88200)[:1000]), True)
+    # notes longer than the bank duration are synthesised (and banked) at their own length:
+    long_note = synth_wave(261.63, 5, type='KS', falloff=False)
+    compare((len(long_note), len(wave_bank)), (220500, 1))
+    # including those from synthesis methods that produce slightly fewer samples than asked for:
+    fast_note = synth_wave(261.63, 5, type='fast', falloff=False)
+    compare((len(fast_note), np.shares_memory(fast_note, synth_wave(261.63, 5, type='fast', falloff=False))), (220500, True))
+
+    # parallel synthesis gives identical output to serial synthesis for the same seed:
+    from ..audio import synth_waves
+    freqs = [110, 138.59, 164.81, 220, 277.18]
+    for type, cache in [('KS', True), ('fast', False)]:
+        wave_bank.clear()
+        serial = synth_waves(freqs, 1, type=type, cache=cache, seed=1)
+        wave_bank.clear()
+        threaded = synth_waves(freqs, 1, type=type, cache=cache, seed=1, workers=3)
+        compare(all([np.array_equal(s, t) for s, t in zip(serial, threaded)]), True)
+    wave_bank.clear()
+    processed = synth_waves(freqs[:2], 1, cache=False, seed=1, workers=2, backend='process')
+    compare(np.array_equal(processed[1], synth_waves(freqs[:2], 1, cache=False, seed=1)[1]), True)
+    # unseeded parallel waves are banked under the unseeded key, and reused by later calls:
+    wave_bank.clear()
+    threaded = synth_waves(freqs[:3], 1, falloff=False, workers=3)
+    compare(len(wave_bank), 3)
+    compare(np.shares_memory(synth_waves(freqs[:3], 1, falloff=False, workers=3)[0], threaded[0]), True)
+    compare(np.shares_memory(synth_wave(freqs[0], 1, falloff=False), threaded[0]), True)
+    # and different seeds give different waves:
+    compare(np.array_equal(synth_wave(110, 1, cache=False, seed=1), synth_wave(110, 1, cache=False, seed=2)), False)
+
+    # chroma analysis detects the pitch classes of polyphonic audio:
+    from ..audio import chromagram, chroma_notes, transcribe, read_wav, write_wav
+    from ..chords import Chord
+    chord_wave = Chord('Am7').render(delay=None, duration=1, type='pure')
+    chroma = chromagram(chord_wave)
+    compare((chroma.shape[1], np.allclose(chroma.sum(axis=1), 1)), (12, True))
+    compare(set(chroma_notes(chroma.mean(axis=0))), set(Chord('Am7').notes))
+
+    # and transcribes recordings into chord progressions, also from WAV files:
+    progression = ChordProgression('Dm7 G7 Cmaj7 A7')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'prog.wav')
+        buffer = progression.render(path, chord_delay=1, duration=1, type='pure', bit_depth=24)
+        wave_from_file, sample_rate = read_wav(path)
+        compare((sample_rate, np.allclose(wave_from_file, np.clip(buffer, -1, 1), atol=1e-6)), (44100, True))
+        compare(transcribe(path, segment=1).chords, progression.chords)
+
+    # envelopes and falloffs multiply by cached gain curves, optionally in place:
+    from ..audio import lin_falloff, exp_falloff, HexEnv, gain_curves, find_peaks
+    signal = np.random.default_rng(0).standard_normal(1000)
+    faded = lin_falloff(signal)
+    compare(np.array_equal(faded, signal * np.linspace(1, 0, 1000)), True)
+    compare(('lin_falloff', 1000, 0) in gain_curves, True)
+    out = np.empty(1000)
+    compare(lin_falloff(signal, out=out) is out, True)
+    compare(np.array_equal(out, faded), True)
+    in_place = signal.copy()
+    HexEnv(in_place, out=in_place)
+    compare(np.array_equal(in_place, HexEnv(signal)), True)
+    compare(np.allclose(exp_falloff(signal, peak_at=0.001)[:44], signal[:44] * np.exp(np.linspace(0, 5, 44)) / np.exp(5)), True)
+
+    # peak finding:
+    num_peaks, peak_idxs = find_peaks(np.array([0, 1, 0, 2, 2, 1, 3, 0]), ret=True)
+    compare((num_peaks, list(peak_idxs)), (2, [1, 6]))
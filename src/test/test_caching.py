@@ -0,0 +1,80 @@
+from ..caching import Cache, registered_caches, cache_stats, reset_cache_stats
+from .testing_tools import compare
+
+def unit_test():
+    # LRU cache: the least recently used entry is evicted when over the limit
+    cache = Cache('test_lru', max_entries=3, policy='LRU')
+    for i in range(3):
+        cache[i] = str(i)
+    if 0 in cache:
+        cache[0] # touching 0 makes 1 the least recently used
+    cache[3] = '3'
+    compare(sorted(cache.keys()), [0, 2, 3])
+    compare((cache.hits, cache.misses, cache.evictions), (1, 0, 1))
+    compare(4 in cache, False)
+    compare(cache.misses, 1)
+    compare(cache.get(4, 'x'), 'x')
+    compare(cache.misses, 2)
+
+    # LFU cache: the least frequently used entry is evicted, oldest first if tied
+    cache = Cache('test_lfu', max_entries=3, policy='LFU')
+    for i in range(3):
+        cache[i] = str(i)
+    for i in [0, 0, 2]:
+        cache[i]
+    cache[3] = '3' # evicts 1, which has never been used
+    compare(sorted(cache.keys()), [0, 2, 3])
+    cache[4] = '4' # evicts 3, which is newer than 2 but used just as rarely
+    compare(sorted(cache.keys()), [0, 2, 4])
+    compare(cache.evictions, 2)
+    # in-place updates go through the same eviction:
+    cache |= {5: '5', 6: '6'}
+    compare((len(cache), cache.evictions, 6 in cache), (3, 4, True))
+
+    # caches can be limited by approximate memory use instead:
+    import numpy as np
+    cache = Cache('test_bytes', max_entries=None, max_bytes=1000)
+    for i in range(5):
+        cache[i] = np.zeros(50) # 400 bytes each
+    compare(sorted(cache.keys()), [3, 4])
+    compare(cache.num_bytes, 800)
+    del cache[3]
+    compare(cache.num_bytes, 400)
+    cache.resize(max_entries=None, max_bytes=100)
+    compare(len(cache), 0)
+
+    # overwriting a key does not count as an extra entry:
+    cache = Cache('test_overwrite', max_entries=2)
+    cache['a'] = 1
+    cache['a'] = 2
+    cache['b'] = 3
+    compare(dict(cache), {'a': 2, 'b': 3})
+    compare(cache.evictions, 0)
+
+    # caches register themselves, and the library's own caches are Caches:
+    compare(registered_caches['test_overwrite'] is cache, True)
+    from .. import chords, notes
+    compare(isinstance(chords.cached_chords, Cache), True)
+    compare(registered_caches['notes'] is notes.cached_notes, True)
+
+    # per-cache statistics, with the most frequently hit keys:
+    cache = Cache('test_stats', max_entries=10)
+    cache['a'], cache['b'] = 1, 2
+    for key in ['a', 'b', 'b', 'c']:
+        if key in cache:
+            cache[key]
+    stats = cache_stats(display=False)['test_stats']
+    compare((stats['entries'], stats['hits'], stats['misses']), (2, 3, 1))
+    compare(stats['top_keys'], [('b', 2), ('a', 1)])
+    reset_cache_stats()
+    compare((cache.hits, cache.misses, cache.top_keys()), (0, 0, []))
+    compare(len(cache), 2)
+
+    # the library's caches count hits when objects are retrieved from them:
+    from ..chords import Chord
+    Chord.from_cache('Cmaj7')
+    Chord.from_cache('Cmaj7')
+    compare(chords.cached_chords.hits >= 1, True)
+
+    for name in ['test_stats', 'test_lru', 'test_lfu', 'test_bytes', 'test_overwrite']:
+        del registered_caches[name]
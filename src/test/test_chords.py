@@ -1,4 +1,4 @@
-from ..chords import Chord, AbstractChord, ChordFactors, Interval, matching_chords, most_likely_chord
+from ..chords import Chord, AbstractChord, ChordFactors, Interval, matching_chords, most_likely_chord, fuzzy_matching_chords
 from .testing_tools import compare
 
 def unit_test():
@@ -44,6 +44,11 @@ def unit_test():
 
     # test chord matching by notes:
     print(matching_chords('CEA'))
+    compare(matching_chords('CEA', exact=True, display=False)[0], Chord('Am'))
+    # symmetric chords match on every possible root:
+    compare(len(matching_chords('C Eb Gb A', exact=True, display=False, min_consonance=0)), 4)
+    # no size cutoff on exact matching:
+    compare(Chord('C13') in matching_chords('C E G Bb D F A', exact=True, display=False, min_likelihood=0), True)
 
     # test chord abstraction:
     compare(Chord('Cmaj7sus2').abstract(), AbstractChord('maj7sus2'))
@@ -76,3 +81,18 @@ def unit_test():
 
     compare(most_likely_chord('CEAB', invert=True), Chord('Amadd9/C'))
     compare(most_likely_chord('CEAB', invert=False), Chord('Amadd9'))
+    # fuzzy matches are scored as they would be chord by chord:
+    fuzzy_matches = fuzzy_matching_chords('C E G B D', display=False, max_results=3)
+    compare(len(fuzzy_matches), 3)
+    compare(list(fuzzy_matches.values())[0]['recall'], 1.0)
+    compare(fuzzy_matching_chords('E G C', invert=True, display=False)[Chord('C/E')]['consonance'], Chord('C/E').abstract().consonance)
+
+    # test that the chord registry survives a round trip through its on-disk snapshot format:
+    import pickle
+    from .. import chords
+    registry = {'factors_to_chord_names': chords.factors_to_chord_names,
+                'cached_chords': chords.cached_chords}
+    reloaded = pickle.loads(pickle.dumps(registry, protocol=pickle.HIGHEST_PROTOCOL))
+    compare(reloaded['factors_to_chord_names'], chords.factors_to_chord_names)
+    compare(reloaded['cached_chords'][('Am7',None,None,None,None,None)], Chord('Am7'))
+    compare(reloaded['cached_chords'][('Am7',None,None,None,None,None)].notes, Chord('Am7').notes)
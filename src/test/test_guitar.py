@@ -1,5 +1,6 @@
-from ..guitar import Guitar, standard
-from ..notes import NoteList
+from ..guitar import Guitar, standard, standard_open_chords, cached_shape_chords
+from ..notes import Note, NoteList
+from ..chords import Chord, most_likely_chord
 from .testing_tools import compare
 
 def unit_test():
@@ -17,3 +18,41 @@ def unit_test():
 
     # standard.query('x1881x')
     # standard.query('x32010')
+
+    # voicing search finds the usual open chord shapes first:
+    compare(standard.voicings('C', num=1), [(None, 3, 2, 0, 1, 0)])
+    compare(standard.voicings('E', num=1), [(0, 2, 2, 1, 0, 0)])
+    compare(standard.voicings('Am', num=1), [(None, 0, 2, 2, 1, 0)])
+    # including shapes that leave out the fifth:
+    compare((None, 3, 2, 3, 1, 0) in standard.voicings('C7'), True)
+    compare((None, 3, 2, 3, 1, 0) in standard.voicings('C7', omit_fifth=False), False)
+    # inverted chords keep their bass note in the bass:
+    compare({min(standard[v], key=lambda n: n.value).chroma for v in standard.voicings('C/G')}, {'G'})
+    # and every voicing sounds the chord it was searched for:
+    compare({standard[v].pitch_class_mask for v in standard.voicings('Dm7')}, {Chord('Dm7').pitch_class_mask, Chord('Dm7').pitch_class_mask & ~(1 << Note('A').position)})
+    # which is fast across every common chord in a tuning:
+    compare(sum([len(Guitar('DADGAD').voicings(c)) > 0 for c in standard_open_chords]), len(standard_open_chords))
+
+    # batch analysis of fret shapes gives the same chords as analysing them one by one:
+    shapes = ['x32010', '022100', '320003', 'x02210', 'x32010', '022100', 'x-10-12-12-12-10']
+    compare(standard.analyse_shapes(shapes), [most_likely_chord(standard.fret(s) if len(s) == 6 else standard.fret([None, 10, 12, 12, 12, 10])) for s in shapes])
+    # and memoizes repeated shapes across calls:
+    hits = cached_shape_chords.hits
+    standard.analyse_shapes(shapes)
+    compare(cached_shape_chords.hits - hits, 5)
+    # but not across tunings or capos:
+    compare(Guitar(capo=2).analyse_shapes(['x32010']), [Chord('D')])
+
+    # fret grids give the note sounded at every fret, and follow changes of capo:
+    guitar = Guitar('standard')
+    values, pitch_classes = guitar.fret_grid(12)
+    compare(values.shape, (6, 13))
+    compare(values[1,3], (guitar.tuned_strings[1] + 3).value)
+    compare(guitar.locate_note(Note('C'), max_fret=12), [(1,8), (2,3), (3,10), (4,5), (5,1), (6,8)])
+    guitar.capo = 2
+    compare(guitar.fret_grid(12)[0][0,0], guitar.open_strings[0].value)
+    compare(guitar.locate_note(Note('C'), max_fret=12), [(1,8), (2,3), (3,10), (4,5), (6,8)])
+    # and all the notes of a chord are located in one query:
+    locs = standard.locate_notes(Chord('C').notes, max_fret=3)
+    compare(locs[(2,3)], Note('C'))
+    compare(set(locs), {(1,0), (1,3), (2,3), (3,2), (4,0), (5,1), (6,0), (6,3)})
@@ -1,6 +1,9 @@
-from ..keys import Key # , matching_keys
+from ..keys import Key, matching_keys, key_weight_table, score_key_candidates
 from ..scales import Scale
 from ..chords import Chord
+from ..notes import Note, NoteList
+from ..util import precision_recall
+from collections import Counter
 from .testing_tools import compare
 
 def unit_test():
@@ -63,6 +66,28 @@ def unit_test():
     compare(Key('C').extended_contains('Fm'), True)
     compare(Key('C').extended_contains('Gm'), True)
 
+    # vectorised key scoring agrees with precision_recall:
+    input_weights = Counter(NoteList('C E G Bb C'))
+    table = key_weight_table([Scale('major')], scale_factor_weights={}, scale_chord_weights={})
+    scores = score_key_candidates(table, input_weights)
+    f_major_weights = Counter({n:1 for n in Key('F').notes})
+    f_major_weights.update(input_weights)
+    expected = precision_recall(list(input_weights), Key('F').notes, weights=f_major_weights)
+    compare(float(scores['recall'][0, 5]), expected['recall'])
+    compare(float(scores['precision'][0, 5]), expected['precision'])
+    compare(matching_keys(notes='C D E F G A B', display=False)[Key('C')]['recall'], 1.0)
+
+    # interned keys are shared between names, scale names and factors:
+    compare(Key.from_cache('C major') is Key.from_cache('C'), True)
+    compare(Key.from_cache('major', tonic='C') is Key.from_cache(factors=Scale('major').factors, tonic='C'), True)
+    compare(Key.from_cache('F#') == Key('F#'), True)
+    compare(Key.from_cache('Bb minor').scale is Scale.from_cache('minor'), True)
+    # but enharmonic requests keep their own spelling, whichever is requested first:
+    for names in [('Cb egyptian pentatonic', 'B egyptian pentatonic'), ('Db rock minor dorian', 'C# rock minor dorian')]:
+        for name in names + names[::-1]:
+            compare([n.chroma for n in Key.from_cache(name).notes], [n.chroma for n in Key(name).notes])
+    compare([n.chroma for n in Scale('major').on_tonic(Note('Cb')).notes], [n.chroma for n in Key(factors=Scale('major').factors, tonic=Note('Cb')).notes])
+
     # matching_keys(['C', Chord('F'), 'G7', 'Bdim'], upweight_pentatonics=False)
     #
     # matching_keys(['Dm', 'Dsus4', 'Am', 'Asus4', 'E', 'E7', 'Asus4', 'Am7'], upweight_pentatonics=True)
@@ -0,0 +1,46 @@
+from ..midi import NoteEvent, note_events, encode_varlen, decode_varlen, export_midi, decode_midi, read_midi, write_midi
+from ..notes import NoteList, OctaveNote
+from ..progressions import ChordProgression
+from ..scales import Scale
+from ..rhythm import SixEight
+from .testing_tools import compare
+import os, tempfile
+
+def unit_test():
+    # variable-length quantities, as in the examples of the SMF spec:
+    for value, encoded in [(0, b'\x00'), (0x7F, b'\x7f'), (0x80, b'\x81\x00'),
+                           (0x2000, b'\xc0\x00'), (0x0FFFFFFF, b'\xff\xff\xff\x7f')]:
+        compare(encode_varlen(value), encoded)
+        compare(decode_varlen(encoded, 0), (value, len(encoded)))
+
+    # note lists round-trip as octave notes with the same timings:
+    notes = NoteList([OctaveNote(n) for n in ['C4', 'E4', 'G4', 'C5']], strip_octave=False)
+    midi = decode_midi(notes.to_midi(delay=0.5, duration=1, tempo=90))
+    compare(midi.tempo, 90)
+    compare([e.note.name for e in midi.notes], ['C4', 'E4', 'G4', 'C5'])
+    compare([round(e.start, 3) for e in midi.notes], [0, 0.5, 1, 1.5])
+    compare([round(e.duration, 3) for e in midi.notes], [1]*4)
+    compare(midi.notes[0].midi_note, 60)
+
+    # chord progressions round-trip as the same chords:
+    prog = ChordProgression('Dm7 G7 Cmaj7 A7')
+    midi = decode_midi(prog.to_midi())
+    compare(len(midi.notes), 16)
+    compare([c.name for c in midi.chords()], [c.name for c in prog.chords])
+
+    # scales play ascending and then descending:
+    midi = decode_midi(Scale('major').to_midi(on='C4'))
+    compare([e.note.name for e in midi.notes][:8], ['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4', 'C5'])
+    compare(midi.notes[-1].note.name, 'C4')
+
+    # time signatures write a metronome on the percussion channel:
+    midi = decode_midi(SixEight.to_midi(bars=2))
+    compare(midi.time_signature, (6,8))
+    compare(len(midi.notes), 12)
+    compare({e.channel for e in midi.notes}, {9})
+
+    # and files on disk read back the same as bytes in memory:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.mid')
+        write_midi([note_events(notes)], path)
+        compare(read_midi(path).notes, decode_midi(export_midi([note_events(notes)])).notes)
@@ -34,6 +34,11 @@ def unit_test():
     compare(ChordProgression('Am', 'Bdim', 'C', 'Dm'), ChordProgression([Chord('Am'), 'Bdim', Chord('C'), Chord('Dm')]))
     compare(ChordProgression('F#-C-Am-G-C'), ChordProgression(['F#', 'C', 'Am', 'G', 'C']))
 
+    # batch key detection agrees with ChordProgression, including on repeated inputs:
+    charts = ['Em B7 Em Am', 'C F G Am', 'Em B7 Em Am', 'Bbm Gb Db Ab']
+    batch_keys = [key for key, scores in find_keys_batch(charts)]
+    compare(batch_keys, [ChordProgression(chart).key for chart in charts])
+
 
     ### experimenting with ChordMotion and chromatic_lines
 
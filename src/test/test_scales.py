@@ -1,6 +1,6 @@
 from ..intervals import *
 from ..scales import *
-from ..chords import AbstractChord
+from ..chords import AbstractChord, Chord
 from .testing_tools import compare
 from ..display import DataFrame
 
@@ -83,7 +83,63 @@ def unit_test():
         neighbours = sc.neighbouring_scales
         # print(f'{name} scale has {len(neighbours)} neighbours')
 
+    # test bitmask-based membership:
+    compare(Scale('major pentatonic').is_subscale_of('major'), True)
+    compare(Scale('minor pentatonic').is_subscale_of('major'), False)
+    compare('natural major' in Scale('major pentatonic').find_possible_parent_scale_names(of_length=7), True)
+    compare(Scale('dorian').is_mode_of('major'), True)
+    compare(Scale('harmonic minor').is_mode_of('major'), False)
+    compare(Scale('major').contains_degree_chord(5, AbstractChord('7')), True)
+    compare(Scale('major').contains_degree_chord(4, AbstractChord('7')), False)
+
+    # test scale catalogue queries:
+    catalogue = scale_catalogue()
+    compare(catalogue.row('dorian')['family'], catalogue.row('natural major')['family'])
+    compare(catalogue.row('harmonic minor')['rarity'], 2)
+    compare(set(Scale('major').find_possible_subscale_names()), {'major pentatonic', 'blues major pentatonic', 'suspended', 'okinawan', 'yo', 'kumoi'})
+    compare('natural minor' in catalogue.names_of(catalogue.query(length=7, rarity=1, contains=Scale('minor pentatonic').intervals.pitch_class_mask)), True)
+    compare(set([str(f) for f in Scale('major').get_neighbouring_scale_names()]) >= {str(Scale('lydian').factors), str(Scale('mixolydian').factors)}, True)
+
+    # test interned scales:
+    compare(Scale.from_cache('major') is MajorScale, True)
+    compare(Scale.from_cache('ionian') is Scale.from_cache(factors=ScaleFactors('1,2,3,4,5,6,7')), True)
+    compare(Scale.from_cache('nat min') == Scale('natural minor'), True)
+
+    # test memoized mode family graph:
+    compare(Scale('major').mode(2) is Scale('major').mode(2), True)
+    compare(Scale('major').modes, [Dorian, Phrygian, Lydian, Mixolydian, Aeolian, Locrian])
+    compare(Scale('major').mode(2) is Dorian, True)
+    compare(catalogue.mode_names('natural major'), ['dorian', 'phrygian', 'lydian', 'mixolydian', 'natural minor', 'locrian'])
+    compare(Scale('major pentatonic').find_possible_parent_scales(heptatonic_only=True)[0] is catalogue.scales_named(['natural major'])[0], True)
+
     print('Valid chords from scale degrees:')
     Scale('major').valid_chords_on(4, inversions=True)
 
     Scale('harmonic minor').valid_chords_on(4, order=6)
+
+    # scale matching scores every candidate at once:
+    matches = matching_scales('i - V7 - VII', display=False)
+    compare(list(matches)[:2], [Scale('extended minor'), Scale('natural minor')])
+    compare(matches[Scale('natural minor')], {'precision': 0.833, 'recall': 0.917})
+    # and batch matching gives the same results for many inputs:
+    inputs = ['i - V7 - VII', 'I IV V', IntervalList([0,2,4,7,9]), [0,3,7,10]]
+    single = [matching_scales(inputs[0], display=False), matching_scales(inputs[1], display=False),
+              matching_scales(intervals=inputs[2], display=False), matching_scales(intervals=inputs[3], display=False)]
+    compare(batch_matching_scales(inputs), single)
+
+    # valid chords come from a table of chord ids that is shared across keys with the same scale:
+    from .. import scales
+    from ..keys import Key
+    compare([c.suffix for c in Scale('major').valid_chords_on(5, display=False)][:4], ['', 'sus4', 'sus2', '7'])
+    hits = scales.valid_chord_table.hits
+    compare(Key('D').valid_chords_on(5, display=False)[3], Chord('A7'))
+    compare(scales.valid_chord_table.hits - hits, 1)
+    # and inversions that duplicate the intervals of an uninverted chord are pruned:
+    inverted = Scale('major').valid_chords_on(1, inversions=True, display=False)
+    uninverted_intervals = {c.intervals for c in inverted if c.inversion == 0}
+    compare([c for c in inverted if c.inversion != 0 and c.intervals in uninverted_intervals], [])
+    # and the table survives a round trip through its on-disk snapshot format:
+    import pickle
+    table = dict(scales.valid_chord_table)
+    reloaded = pickle.loads(pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL))
+    compare({k: list(v) for k,v in reloaded.items()}, {k: list(v) for k,v in table.items()})
@@ -0,0 +1,36 @@
+from .testing_tools import compare
+import subprocess, sys, os
+
+# the modules that make up the audio stack, which the music theory modules should never import:
+audio_modules = ['sounddevice', 'matplotlib', 'scipy', 'audio', 'rhythm']
+
+def time_import(statement):
+    """runs an import statement in a fresh interpreter, and returns a tuple of
+    its wall time (in seconds) and the set of audio stack modules it loaded"""
+    package = __package__.split('.')[0]
+    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    code = (f'import sys, time\n'
+            f't = time.perf_counter()\n'
+            f'{statement.format(package=package)}\n'
+            f'print(time.perf_counter() - t)\n'
+            f'print(" ".join(sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=root_dir, capture_output=True, text=True, check=True)
+    wall_time, module_names = result.stdout.strip().split('\n')[-2:]
+    loaded = {name.split('.')[-1] if name.startswith(package) else name.split('.')[0]
+              for name in module_names.split(' ')}
+    return float(wall_time), loaded.intersection(audio_modules)
+
+def unit_test():
+    # importing the package itself should be near-instant, since submodules are lazy:
+    wall_time, loaded = time_import('import {package}')
+    print(f'import package: {wall_time*1000:.1f}ms')
+    compare(loaded, set())
+
+    # and importing the core music theory classes should not touch audio at all:
+    for statement in ['from {package}.chords import Chord',
+                      'from {package}.keys import matching_keys',
+                      'from {package}.progressions import ChordProgression',
+                      'from {package}.guitar import Guitar']:
+        wall_time, loaded = time_import(statement)
+        print(f'{statement.format(package="")}: {wall_time*1000:.1f}ms')
+        compare(loaded, set())
@@ -1,5 +1,5 @@
-from ..util import precision_recall, reduce_aliases
-# from .testing_tools import compare
+from ..util import precision_recall, reduce_aliases, pitch_class_mask, value_mask, mask_values, is_submask, rotate_mask, mask_transpositions
+from .testing_tools import compare
 
 def unit_test():
     # some tests on membership evaluation
@@ -28,3 +28,14 @@ def unit_test():
     # test alias reduction:
     aliases = {'hdim': ['half diminished', 'halfdim'], 'fdim': ['diminished', 'fully diminished']}
     print(''.join(reduce_aliases('half diminished diminished chord', aliases)))
+
+    # test pitch class bitmasks:
+    major_triad = pitch_class_mask([0, 4, 7])
+    compare(mask_values(major_triad), [0, 4, 7])
+    compare(pitch_class_mask([0, 16, 19, -5]), major_triad) # wraps around octaves
+    compare(mask_values(value_mask([0, 4, 14])), [0, 4, 14]) # but value masks do not
+    compare(is_submask(major_triad, pitch_class_mask([0, 2, 4, 5, 7, 9, 11])), True)
+    compare(is_submask(pitch_class_mask([0, 3, 7]), pitch_class_mask([0, 2, 4, 5, 7, 9, 11])), False)
+    compare(mask_values(rotate_mask(major_triad, 7)), [2, 7, 11]) # transposed up a fifth
+    compare(mask_transpositions(pitch_class_mask([0, 3, 8]), major_triad), [4]) # first inversion
+    compare(mask_transpositions(pitch_class_mask([0, 3, 7]), major_triad), [])
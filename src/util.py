@@ -134,6 +134,73 @@ def precision_recall_scores(retrieved, relevant, total_retrieved, total_relevant
     rec = relevant / total_relevant
     return prec, rec
 
+#### pitch-class sets as bitmasks:
+# a collection of notes or intervals can be summarised as a 12-bit integer,
+# where bit N is set if the collection contains the pitch class N semitones above C
+# (for notes) or above the root/tonic (for intervals). then subset, overlap and
+# transposition checks are just integer operations instead of list lookups.
+chromatic_mask = (1 << 12) - 1 # i.e. all 12 pitch classes
+
+def pitch_class_mask(values):
+    """accepts an iterable of integers (like note positions or interval values)
+    and returns the 12-bit mask of the pitch classes they fall on"""
+    mask = 0
+    for v in values:
+        mask |= 1 << (v % 12)
+    return mask
+
+def value_mask(values):
+    """as pitch_class_mask, but does not wrap around the octave, so that e.g. an interval
+    of 14 semitones (a major 9th) sets a different bit to one of 2 (a major 2nd).
+    only defined for non-negative values"""
+    mask = 0
+    for v in values:
+        if v < 0:
+            raise ValueError(f'value_mask only defined for non-negative values, but got: {v}')
+        mask |= 1 << v
+    return mask
+
+def mask_values(mask):
+    """inverse of pitch_class_mask/value_mask: returns the sorted list of bits set in a mask"""
+    values = []
+    v = 0
+    while mask:
+        if mask & 1:
+            values.append(v)
+        mask >>= 1
+        v += 1
+    return values
+
+def popcount(mask):
+    """number of pitch classes in a mask"""
+    return bin(mask).count('1')
+
+def is_submask(mask, other_mask):
+    """returns True if every bit set in mask is also set in other_mask,
+    i.e. if mask represents a subset of other_mask"""
+    return (mask & ~other_mask) == 0
+
+def rotate_mask(mask, steps):
+    """transposes a pitch-class mask up by some number of semitones,
+    wrapping around the octave"""
+    steps = steps % 12
+    return ((mask << steps) | (mask >> (12 - steps))) & chromatic_mask
+
+def mask_transpositions(mask, other_mask):
+    """returns the list of semitone offsets that transpose mask onto other_mask
+    (empty if they are not transpositions of each other)"""
+    if popcount(mask) != popcount(other_mask):
+        return []
+    return [steps for steps in range(12) if rotate_mask(mask, steps) == other_mask]
+
+def mask_normal_form(mask):
+    """returns the transposition-normalised form of a pitch-class mask (its lowest
+    rotation as an integer), along with the list of semitone offsets that rotate
+    mask onto it. (there is more than one offset for symmetric sets like dim7 chords)"""
+    rotations = [rotate_mask(mask, steps) for steps in range(12)]
+    normal_mask = min(rotations)
+    return normal_mask, [steps for steps, rotated in enumerate(rotations) if rotated == normal_mask]
+
 def reverse_dict(dct):
     """accepts a dict whose values and keys are both unique,
     and returns the reversed dict where keys are values and vice versa"""
@@ -412,3 +479,12 @@ class ModDict(dict):
     def __repr__(self):
         # like dict.__repr__, just indicates that this is a mod dict:
         return f'M[{self.index}/{self.max_key}].' + super().__repr__()
+
+def unpickle_list(cls, items, state):
+    """rebuilds a pickled list subclass (NoteList, IntervalList etc.)
+    whose append/extend methods rely on instance attributes, which the
+    default pickle protocol would only restore *after* appending the items"""
+    obj = list.__new__(cls)
+    obj.__dict__.update(state)
+    list.extend(obj, items)
+    return obj
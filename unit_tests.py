@@ -17,7 +17,7 @@ from src.guitar import Guitar, standard
 # individual test modules:
 from src.test import test_util, test_parsing, test_qualities, test_intervals, test_notes
 from src.test import test_chords, test_numerals, test_scales, test_keys, test_guitar, test_display
-from src.test import test_progressions #, test_matching
+from src.test import test_progressions, test_caching, test_audio, test_midi, test_startup #, test_matching
 
 from src import util
 if PROFILE_INIT:
@@ -46,6 +46,10 @@ modules_to_test = [
                   test_scales,
                   test_keys,
                   test_progressions,
+                  test_caching,
+                  test_audio,
+                  test_midi,
+                  test_startup,
                   # test_matching,
                   ]
 